@@ -1,24 +1,41 @@
-# URLs dos arquivos
-url_excel = "https://www.football-data.co.uk/mmz4281/2526/all-euro-data-2025-2026.xlsx"
-url_proximos_jogos = "https://www.football-data.co.uk/fixtures.xlsx"
-
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from io import BytesIO
-import requests
-from datetime import datetime, timedelta
-import time
-import scipy.stats as stats
-from sklearn.linear_model import PoissonRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.pipeline import Pipeline
+import os
+from datetime import datetime
 import warnings
 
+from futalgorithm.motor import (
+    url_excel, url_proximos_jogos, mapeamento_ligas, TEMPOS_POR_LIGA,
+    estado_atualizacao, obter_snapshot, iniciar_atualizacao, preparar_snapshot,
+    construir_indice_times, construir_cubo_rankings, ajustar_modelos_lambdas, obter_previsoes,
+    processar_todos_jogos_completos, formatar_tabela, renderizar_tabela_html, colunas_totais, TAMANHOS_PAGINA,
+    gerar_dicas_inteligentes, gerar_dicas_sequencias, compilar_regras_sequencia, REGRAS_SEQUENCIA,
+    gerar_ranking_liga, gerar_todos_rankings,
+    calcular_backtest, resumir_backtest, resumir_valor, curva_roi_confianca, formatar_percentual, formatar_decimal,
+    CONFIANCA_MEDIA, EDGE_MINIMO, FRACAO_KELLY,
+    calcular_relatorio_calibracao, MERCADOS_CALIBRACAO, BINS_CONFIABILIDADE,
+    calcular_tabelas_temporada, SIMULACOES_TEMPORADA, VAGAS_TOPO, REBAIXADOS_LIGA, liga_projetavel,
+    carregar_precalculado,
+)
+from futalgorithm.instrumentacao import (
+    INSTRUMENTACAO_ATIVA, iniciar_execucao, finalizar_execucao, rastro_atual, medir, texto_prometheus,
+    CONTADORES, EXECUCOES,
+)
+
 warnings.filterwarnings('ignore')
 
+# O motor memoriza por processo; as tabelas das abas Temporada, Calibração e Sobre passam também pelo
+# st.cache_data, que entrega a cada sessão a sua própria cópia
+calcular_backtest = st.cache_data(ttl=3600, show_spinner=False)(calcular_backtest)
+calcular_relatorio_calibracao = st.cache_data(ttl=3600, show_spinner=False)(calcular_relatorio_calibracao)
+calcular_tabelas_temporada = st.cache_data(ttl=3600, show_spinner=False)(calcular_tabelas_temporada)
+
+# Rastro de tempos desta execução do script (aba Diagnóstico); nada é medido com a instrumentação desligada
+iniciar_execucao('rerun')
+
 # Configuração da página
 st.set_page_config(page_title="FutAlgorithm Pro", page_icon="⚽", layout="wide")
 
@@ -230,881 +247,49 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Remover cache para garantir dados sempre atualizados
-@st.cache_data(ttl=3600)
-def carregar_dados_excel(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        excel_file = BytesIO(response.content)
-        todas_abas = pd.read_excel(excel_file, sheet_name=None)
-        abas_disponiveis = list(todas_abas.keys())
-        return todas_abas, abas_disponiveis
-    except Exception as e:
-        st.error(f"❌ Erro ao carregar dados: {e}")
-        return None, None
-
-
-@st.cache_data(ttl=1800)
-def carregar_proximos_jogos(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        excel_file = BytesIO(response.content)
-        df_jogos = pd.read_excel(excel_file)
-        return df_jogos
-    except Exception as e:
-        st.error(f"❌ Erro ao carregar dados do simulador: {e}")
-        return None
-
-
-# Carregar dados
-todas_abas, abas_disponiveis = carregar_dados_excel(url_excel)
-df_proximos_jogos = carregar_proximos_jogos(url_proximos_jogos)
-
-# Mapeamento de ligas
-mapeamento_ligas = {
-    'E0': 'Premier League', 'E1': 'Championship', 'E2': 'League One', 'E3': 'League Two',
-    'SC0': 'Premiership', 'SC1': 'Championship', 'SC2': 'League One', 'SC3': 'League Two',
-    'D1': 'Bundesliga', 'D2': '2. Bundesliga', 'I1': 'Serie A', 'I2': 'Serie B',
-    'SP1': 'La Liga', 'SP2': 'La Liga 2', 'F1': 'Ligue 1', 'F2': 'Ligue 2',
-    'N1': 'Eredivisie', 'B1': 'Jupiler Pro League', 'P1': 'Primeira Liga',
-    'T1': 'Super Lig', 'G1': 'Super League'
-}
-
-# CONSTANTES DO SISTEMA
-MINIMO_JOGOS_ANALISE = 5
-PESO_JOGOS_RECENTES = 1.8
-CONFIANCA_ALTA = 0.8
-CONFIANCA_MEDIA = 0.65
-CONFIANCA_BAIXA = 0.5
-
-# FATORES DE AJUSTE POR LIGA
-FATORES_LIGA = {
-    'E0': 1.1, 'D1': 1.05, 'SP1': 1.0, 'I1': 0.95, 'F1': 0.9, 'default': 1.0
-}
-
-
-# FUNÇÕES ESTATÍSTICAS
-def calcular_distribuicao_poisson(lambda_val):
-    probs = {}
-    for i in range(0, 7):
-        probs[i] = stats.poisson.pmf(i, lambda_val)
-    probs['6+'] = 1 - sum(probs.values()) + probs[6]
-    return probs
-
-
-def calcular_confianca_analise(n_jogos, consistencia, media_gols):
-    if n_jogos < MINIMO_JOGOS_ANALISE:
-        return "Baixa", CONFIANCA_BAIXA
-
-    confianca_base = min(n_jogos / 15, 1.0)
-    confianca_consistencia = 0.6 + 0.4 * consistencia
-    confianca_gols = 0.7 + 0.3 * (min(media_gols, 3.0) / 3.0)
-    confianca_ajustada = confianca_base * confianca_consistencia * confianca_gols
-
-    if confianca_ajustada >= CONFIANCA_ALTA:
-        return "Alta", min(confianca_ajustada, 1.0)
-    elif confianca_ajustada >= CONFIANCA_MEDIA:
-        return "Média", confianca_ajustada
-    else:
-        return "Baixa", confianca_ajustada
-
-
-def obter_ultimos_jogos_por_cenario(df_liga, time, cenario, num_jogos=10):
-    if cenario == 'mandante':
-        jogos = df_liga[df_liga['HomeTeam'] == time].tail(num_jogos)
-    elif cenario == 'visitante':
-        jogos = df_liga[df_liga['AwayTeam'] == time].tail(num_jogos)
-    else:
-        jogos_casa = df_liga[df_liga['HomeTeam'] == time].tail(num_jogos)
-        jogos_fora = df_liga[df_liga['AwayTeam'] == time].tail(num_jogos)
-        jogos = pd.concat([jogos_casa, jogos_fora]).tail(num_jogos)
-
-    if not jogos.empty and 'Date' in jogos.columns:
-        jogos = jogos.sort_values('Date', ascending=True)
-        max_date = jogos['Date'].max()
-        jogos['peso_temporal'] = jogos['Date'].apply(
-            lambda x: PESO_JOGOS_RECENTES ** ((max_date - x).days / 30)
-        )
-    else:
-        jogos['peso_temporal'] = 1.0
-
-    return jogos
-
-
-def calcular_estatisticas_avancadas(jogos, time, cenario, liga):
-    if jogos.empty or len(jogos) < MINIMO_JOGOS_ANALISE:
-        return None, 0.0
-
-    stats_dict = {'jogos_analisados': len(jogos), 'peso_total': 0.0}
-
-    for key in ['vitorias', 'empates', 'derrotas', 'gols_marcados_ft', 'gols_sofridos_ft',
-                'gols_marcados_ht', 'gols_sofridos_ht', 'escanteios_casa', 'escanteios_fora',
-                'finalizacoes_casa', 'finalizacoes_fora', 'chutes_gol_casa', 'chutes_gol_fora',
-                'cartoes_casa', 'cartoes_fora']:
-        stats_dict[key + '_ponderado'] = 0.0
-
-    for _, jogo in jogos.iterrows():
-        peso = jogo.get('peso_temporal', 1.0)
-        stats_dict['peso_total'] += peso
-
-        is_mandante = jogo['HomeTeam'] == time
-
-        if is_mandante:
-            gols_feitos_ft = jogo.get('FTHG', 0)
-            gols_sofridos_ft = jogo.get('FTAG', 0)
-            gols_feitos_ht = jogo.get('HTHG', 0)
-            gols_sofridos_ht = jogo.get('HTAG', 0)
-            escanteios_casa = jogo.get('HC', 0)
-            escanteios_fora = jogo.get('AC', 0)
-            finalizacoes_casa = jogo.get('HF', 0)
-            finalizacoes_fora = jogo.get('AF', 0)
-            chutes_gol_casa = jogo.get('HST', 0)
-            chutes_gol_fora = jogo.get('AST', 0)
-            cartoes_casa = jogo.get('HY', 0) + jogo.get('HR', 0) * 2
-            cartoes_fora = jogo.get('AY', 0) + jogo.get('AR', 0) * 2
-            resultado = jogo.get('FTR', '')
-        else:
-            gols_feitos_ft = jogo.get('FTAG', 0)
-            gols_sofridos_ft = jogo.get('FTHG', 0)
-            gols_feitos_ht = jogo.get('HTAG', 0)
-            gols_sofridos_ht = jogo.get('HTHG', 0)
-            escanteios_casa = jogo.get('AC', 0)
-            escanteios_fora = jogo.get('HC', 0)
-            finalizacoes_casa = jogo.get('AF', 0)
-            finalizacoes_fora = jogo.get('HF', 0)
-            chutes_gol_casa = jogo.get('AST', 0)
-            chutes_gol_fora = jogo.get('HST', 0)
-            cartoes_casa = jogo.get('AY', 0) + jogo.get('AR', 0) * 2
-            cartoes_fora = jogo.get('HY', 0) + jogo.get('HR', 0) * 2
-            resultado = 'A' if jogo.get('FTR', '') == 'H' else ('H' if jogo.get('FTR', '') == 'A' else 'D')
-
-        fator_liga = FATORES_LIGA.get(liga, FATORES_LIGA['default'])
-
-        stats_dict['gols_marcados_ft_ponderado'] += gols_feitos_ft * peso * fator_liga
-        stats_dict['gols_sofridos_ft_ponderado'] += gols_sofridos_ft * peso * fator_liga
-        stats_dict['gols_marcados_ht_ponderado'] += gols_feitos_ht * peso * fator_liga
-        stats_dict['gols_sofridos_ht_ponderado'] += gols_sofridos_ht * peso * fator_liga
-        stats_dict['escanteios_casa_ponderado'] += escanteios_casa * peso * fator_liga
-        stats_dict['escanteios_fora_ponderado'] += escanteios_fora * peso * fator_liga
-        stats_dict['finalizacoes_casa_ponderado'] += finalizacoes_casa * peso * fator_liga
-        stats_dict['finalizacoes_fora_ponderado'] += finalizacoes_fora * peso * fator_liga
-        stats_dict['chutes_gol_casa_ponderado'] += chutes_gol_casa * peso * fator_liga
-        stats_dict['chutes_gol_fora_ponderado'] += chutes_gol_fora * peso * fator_liga
-        stats_dict['cartoes_casa_ponderado'] += cartoes_casa * peso * fator_liga
-        stats_dict['cartoes_fora_ponderado'] += cartoes_fora * peso * fator_liga
-
-        if (resultado == 'H' and is_mandante) or (resultado == 'A' and not is_mandante):
-            stats_dict['vitorias_ponderado'] += 1 * peso
-        elif resultado == 'D':
-            stats_dict['empates_ponderado'] += 1 * peso
-        else:
-            stats_dict['derrotas_ponderado'] += 1 * peso
-
-    if stats_dict['peso_total'] > 0:
-        for key in ['vitorias', 'empates', 'derrotas', 'gols_marcados_ft', 'gols_sofridos_ft',
-                    'gols_marcados_ht', 'gols_sofridos_ht', 'escanteios_casa', 'escanteios_fora',
-                    'finalizacoes_casa', 'finalizacoes_fora', 'chutes_gol_casa', 'chutes_gol_fora',
-                    'cartoes_casa', 'cartoes_fora']:
-            stats_dict[key] = stats_dict[key + '_ponderado'] / stats_dict['peso_total']
-
-    gols_feitos = []
-    for _, jogo in jogos.iterrows():
-        is_mandante = jogo['HomeTeam'] == time
-        gols = jogo.get('FTHG', 0) if is_mandante else jogo.get('FTAG', 0)
-        gols_feitos.append(gols)
-
-    if gols_feitos:
-        media_gols = np.mean(gols_feitos)
-        std_gols = np.std(gols_feitos)
-        consistencia = 1.0 - (std_gols / max(1, media_gols))
-    else:
-        media_gols = 0
-        consistencia = 0.5
-
-    return stats_dict, consistencia, media_gols
-
-
-def calcular_estatisticas_esperadas(stats_equipe, stats_oponente, fator_casa=1.0, fator_fora=1.0, fator_liga=1.0):
-    fator_ataque = 0.7
-    fator_defesa = 0.3
-    fator_liga_ajustado = 0.9 + (fator_liga * 0.2)
-
-    escanteios_esp = (stats_equipe.get('escanteios_casa', 5.0) * fator_ataque * fator_casa +
-                      stats_oponente.get('escanteios_fora', 5.0) * fator_defesa * fator_fora) * fator_liga_ajustado
-
-    finalizacoes_esp = (stats_equipe.get('finalizacoes_casa', 12.0) * fator_ataque * fator_casa +
-                        stats_oponente.get('finalizacoes_fora', 12.0) * fator_defesa * fator_fora) * fator_liga_ajustado
-
-    chutes_gol_esp = (stats_equipe.get('chutes_gol_casa', 4.0) * fator_ataque * fator_casa +
-                      stats_oponente.get('chutes_gol_fora', 4.0) * fator_defesa * fator_fora) * fator_liga_ajustado
-
-    cartoes_esp = (stats_equipe.get('cartoes_casa', 1.8) * fator_ataque * fator_casa +
-                   stats_oponente.get('cartoes_fora', 1.8) * fator_defesa * fator_fora) * fator_liga_ajustado
-
-    return {
-        'escanteios': max(2.0, min(15.0, escanteios_esp)),
-        'finalizacoes': max(5.0, min(25.0, finalizacoes_esp)),
-        'chutes_gol': max(1.0, min(10.0, chutes_gol_esp)),
-        'cartoes': max(0.5, min(6.0, cartoes_esp))
-    }
-
-
-def calcular_probabilidades_completas(df_liga, mandante, visitante, liga):
-    jogos_mandante = obter_ultimos_jogos_por_cenario(df_liga, mandante, 'geral', 10)
-    stats_mandante, consistencia_mandante, media_gols_mandante = calcular_estatisticas_avancadas(jogos_mandante,
-                                                                                                 mandante, 'geral',
-                                                                                                 liga)
-
-    jogos_visitante = obter_ultimos_jogos_por_cenario(df_liga, visitante, 'geral', 10)
-    stats_visitante, consistencia_visitante, media_gols_visitante = calcular_estatisticas_avancadas(jogos_visitante,
-                                                                                                    visitante, 'geral',
-                                                                                                    liga)
-
-    if not stats_mandante or not stats_visitante:
-        return None, 0.0
-
-    fator_liga = FATORES_LIGA.get(liga, FATORES_LIGA['default'])
-
-    lambda_casa = max(0.1, (stats_mandante.get('gols_marcados_ft', 1.0) * 0.7 +
-                            stats_visitante.get('gols_sofridos_ft', 1.0) * 0.3) * 1.1 * fator_liga)
-
-    lambda_fora = max(0.1, (stats_visitante.get('gols_marcados_ft', 0.8) * 0.7 +
-                            stats_mandante.get('gols_sofridos_ft', 1.2) * 0.3) * 0.9 * fator_liga)
-
-    dist_poisson_casa = calcular_distribuicao_poisson(lambda_casa)
-    dist_poisson_fora = calcular_distribuicao_poisson(lambda_fora)
-
-    prob_casa_vencer = sum([dist_poisson_casa[i] * sum([dist_poisson_fora[j] for j in range(0, i)])
-                            for i in range(1, 7)])
-
-    prob_empate = sum([dist_poisson_casa[i] * dist_poisson_fora[i] for i in range(0, 7)])
-    prob_fora_vencer = 1 - prob_casa_vencer - prob_empate
-
-    prob_over_05 = 1 - (dist_poisson_casa[0] * dist_poisson_fora[0])
-    prob_over_15 = 1 - sum([dist_poisson_casa[i] * dist_poisson_fora[j]
-                            for i in range(0, 2) for j in range(0, 2 - i)])
-    prob_over_25 = 1 - sum([dist_poisson_casa[i] * dist_poisson_fora[j]
-                            for i in range(0, 3) for j in range(0, 3 - i)])
-    prob_over_35 = 1 - sum([dist_poisson_casa[i] * dist_poisson_fora[j]
-                            for i in range(0, 4) for j in range(0, 4 - i)])
-
-    prob_btts = 1 - (dist_poisson_casa[0] + dist_poisson_fora[0] - dist_poisson_casa[0] * dist_poisson_fora[0])
-
-    gols_ht_casa = max(0.1, (stats_mandante.get('gols_marcados_ht', 0.5) * 0.7 +
-                             stats_visitante.get('gols_sofridos_ht', 0.5) * 0.3) * 1.1 * fator_liga)
-    gols_ht_fora = max(0.1, (stats_visitante.get('gols_marcados_ht', 0.4) * 0.7 +
-                             stats_mandante.get('gols_sofridos_ht', 0.6) * 0.3) * 0.9 * fator_liga)
-    prob_over_05_ht = 1 - (stats.poisson.pmf(0, gols_ht_casa) * stats.poisson.pmf(0, gols_ht_fora))
-
-    stats_casa_esp = calcular_estatisticas_esperadas(stats_mandante, stats_visitante,
-                                                     fator_casa=1.1, fator_fora=0.9, fator_liga=fator_liga)
-    stats_fora_esp = calcular_estatisticas_esperadas(stats_visitante, stats_mandante,
-                                                     fator_casa=0.9, fator_fora=1.1, fator_liga=fator_liga)
-
-    n_jogos_total = stats_mandante['jogos_analisados'] + stats_visitante['jogos_analisados']
-    media_gols_total = (media_gols_mandante + media_gols_visitante) / 2
-    consistencia_media = (consistencia_mandante + consistencia_visitante) / 2
-    nivel_confianca, valor_confianca = calcular_confianca_analise(n_jogos_total, consistencia_media, media_gols_total)
-
-    resultados = {
-        'casa_vence': prob_casa_vencer * 100,
-        'empate': prob_empate * 100,
-        'fora_vence': prob_fora_vencer * 100,
-        'gols_casa_esperados': lambda_casa,
-        'gols_fora_esperados': lambda_fora,
-        'gols_total_esperado': lambda_casa + lambda_fora,
-        'gols_ht_total': (gols_ht_casa + gols_ht_fora),
-        'over_05_ht': prob_over_05_ht * 100,
-        'over_05_ft': prob_over_05 * 100,
-        'over_15_ft': prob_over_15 * 100,
-        'over_25_ft': prob_over_25 * 100,
-        'over_35_ft': prob_over_35 * 100,
-        'btts_ft': prob_btts * 100,
-        'escanteios_casa_esp': stats_casa_esp['escanteios'],
-        'escanteios_fora_esp': stats_fora_esp['escanteios'],
-        'escanteios_total_esp': stats_casa_esp['escanteios'] + stats_fora_esp['escanteios'],
-        'finalizacoes_casa_esp': stats_casa_esp['finalizacoes'],
-        'finalizacoes_fora_esp': stats_fora_esp['finalizacoes'],
-        'finalizacoes_total_esp': stats_casa_esp['finalizacoes'] + stats_fora_esp['finalizacoes'],
-        'chutes_gol_casa_esp': stats_casa_esp['chutes_gol'],
-        'chutes_gol_fora_esp': stats_fora_esp['chutes_gol'],
-        'chutes_gol_total_esp': stats_casa_esp['chutes_gol'] + stats_fora_esp['chutes_gol'],
-        'cartoes_casa_esp': stats_casa_esp['cartoes'],
-        'cartoes_fora_esp': stats_fora_esp['cartoes'],
-        'cartoes_total_esp': stats_casa_esp['cartoes'] + stats_fora_esp['cartoes'],
-        'confianca': nivel_confianca,
-        'valor_confianca': valor_confianca,
-        'jogos_analisados': n_jogos_total,
-        'fator_liga': fator_liga
-    }
-
-    return resultados, valor_confianca
-
-
-def aplicar_cores_valor(valor, tipo):
-    try:
-        if '%' in str(valor):
-            num_valor = float(valor.replace('%', ''))
-            if tipo == 'resultado':
-                if num_valor >= 65:
-                    return "value-high"
-                elif num_valor >= 55:
-                    return "value-medium"
-                else:
-                    return "value-low"
-            elif tipo == 'over_under':
-                if num_valor >= 75:
-                    return "value-high"
-                elif num_valor >= 60:
-                    return "value-medium"
-                else:
-                    return "value-low"
-            elif tipo == 'btts':
-                if num_valor >= 70:
-                    return "value-high"
-                elif num_valor >= 60:
-                    return "value-medium"
-                else:
-                    return "value-low"
-
-        elif any(x in str(tipo) for x in ['gols', 'escanteios', 'finalizacoes', 'chutes', 'cartoes']):
-            num_valor = float(valor)
-            if 'gols' in tipo:
-                if num_valor >= 2.5:
-                    return "value-high"
-                elif num_valor >= 1.5:
-                    return "value-medium"
-                else:
-                    return "value-low"
-            elif 'escanteios' in tipo:
-                if num_valor >= 10:
-                    return "value-high"
-                elif num_valor >= 7:
-                    return "value-medium"
-                else:
-                    return "value-low"
-            elif 'finalizacoes' in tipo:
-                if num_valor >= 15:
-                    return "value-high"
-                elif num_valor >= 10:
-                    return "value-medium"
-                else:
-                    return "value-low"
-            elif 'chutes' in tipo:
-                if num_valor >= 6:
-                    return "value-high"
-                elif num_valor >= 4:
-                    return "value-medium"
-                else:
-                    return "value-low"
-            elif 'cartoes' in tipo:
-                if num_valor >= 4:
-                    return "value-high"
-                elif num_valor >= 2.5:
-                    return "value-medium"
-                else:
-                    return "value-low"
-    except:
-        pass
-    return ""
-
-
-def processar_todos_jogos_completos(todas_abas, df_proximos_jogos):
-    resultados = []
-
-    if df_proximos_jogos is not None and not df_proximos_jogos.empty:
-        for _, jogo in df_proximos_jogos.iterrows():
-            try:
-                liga = jogo.get('Div', '')
-                mandante = jogo.get('HomeTeam', '')
-                visitante = jogo.get('AwayTeam', '')
-                data = jogo.get('Date', '')
-
-                if liga in todas_abas and mandante and visitante:
-                    df_liga = todas_abas[liga]
-                    prob, confianca = calcular_probabilidades_completas(df_liga, mandante, visitante, liga)
-
-                    if prob:
-                        resultado = {
-                            'Data': data.strftime('%d/%m/%Y') if hasattr(data, 'strftime') else str(data),
-                            'Liga': mapeamento_ligas.get(liga, liga),
-                            'Casa': mandante,
-                            'Fora': visitante,
-                            'Confiança': prob['confianca'],
-                            'Valor Confiança': f"{prob['valor_confianca']:.2f}",
-                            'Jogos Analisados': prob['jogos_analisados'],
-                            'Casa Vence': f"{prob['casa_vence']:.1f}%",
-                            'Empate': f"{prob['empate']:.1f}%",
-                            'Fora Vence': f"{prob['fora_vence']:.1f}%",
-                            'Gols HT': f"{prob['gols_ht_total']:.2f}",
-                            'Gols FT': f"{prob['gols_total_esperado']:.2f}",
-                            'Gols Casa Esp': f"{prob['gols_casa_esperados']:.2f}",
-                            'Gols Fora Esp': f"{prob['gols_fora_esperados']:.2f}",
-                            'Over 0.5 HT': f"{prob['over_05_ht']:.1f}%",
-                            'Over 0.5 FT': f"{prob['over_05_ft']:.1f}%",
-                            'Over 1.5 FT': f"{prob['over_15_ft']:.1f}%",
-                            'Over 2.5 FT': f"{prob['over_25_ft']:.1f}%",
-                            'Over 3.5 FT': f"{prob['over_35_ft']:.1f}%",
-                            'BTTS FT': f"{prob['btts_ft']:.1f}%",
-                            'Escanteios Casa Esp': f"{prob['escanteios_casa_esp']:.1f}",
-                            'Escanteios Fora Esp': f"{prob['escanteios_fora_esp']:.1f}",
-                            'Escanteios FT': f"{prob['escanteios_total_esp']:.1f}",
-                            'Finalizações Casa Esp': f"{prob['finalizacoes_casa_esp']:.1f}",
-                            'Finalizações Fora Esp': f"{prob['finalizacoes_fora_esp']:.1f}",
-                            'Finalizações FT': f"{prob['finalizacoes_total_esp']:.1f}",
-                            'Chutes Gol Casa Esp': f"{prob['chutes_gol_casa_esp']:.1f}",
-                            'Chutes Gol Fora Esp': f"{prob['chutes_gol_fora_esp']:.1f}",
-                            'Chutes Gol FT': f"{prob['chutes_gol_total_esp']:.1f}",
-                            'Cartões Casa Esp': f"{prob['cartoes_casa_esp']:.1f}",
-                            'Cartões Fora Esp': f"{prob['cartoes_fora_esp']:.1f}",
-                            'Cartões FT': f"{prob['cartoes_total_esp']:.1f}",
-                            'Score Confiança': prob['valor_confianca']
-                        }
-                        resultados.append(resultado)
-
-            except Exception as e:
-                continue
-
-    if resultados:
-        resultados.sort(key=lambda x: x['Score Confiança'], reverse=True)
-
-    return pd.DataFrame(resultados)
-
-
-def analisar_sequencias_equipes(df_liga, time, num_jogos=5):
-    jogos = obter_ultimos_jogos_por_cenario(df_liga, time, 'geral', num_jogos)
-    if len(jogos) < num_jogos:
-        return {}
-
-    sequencias = {
-        'over_05_ht': 0, 'over_15_ft': 0, 'over_25_ft': 0, 'over_35_ft': 0,
-        'btts': 0, 'escanteios_9_mais': 0, 'chutes_gol_4_mais': 0,
-        'finalizacoes_10_mais': 0, 'cartoes_3_mais': 0,
-        # ADICIONAR: análise individual vs soma do jogo
-        'finalizacoes_10_mais_individual': 0,
-        'chutes_gol_4_mais_individual': 0,
-        'escanteios_9_mais_individual': 0,
-        'cartoes_3_mais_individual': 0
-    }
-
-    for _, jogo in jogos.iterrows():
-        is_mandante = jogo['HomeTeam'] == time
-
-        # DADOS DO JOGO (SOMA TOTAL)
-        gols_total = (jogo['FTHG'] + jogo['FTAG']) if 'FTHG' in jogo and 'FTAG' in jogo else 0
-        gols_ht = (jogo['HTHG'] + jogo['HTAG']) if 'HTHG' in jogo and 'HTAG' in jogo else 0
-        escanteios_total = jogo['HC'] + jogo['AC'] if 'HC' in jogo and 'AC' in jogo else 0
-        finalizacoes_total = jogo['HF'] + jogo['AF'] if 'HF' in jogo and 'AF' in jogo else 0
-        chutes_gol_total = jogo['HST'] + jogo['AST'] if 'HST' in jogo and 'AST' in jogo else 0
-        cartoes_total = (jogo['HY'] + jogo['AY'] + jogo['HR'] + jogo['AR']) if all(k in jogo for k in ['HY', 'AY', 'HR', 'AR']) else 0
-
-        # DADOS INDIVIDUAIS DO TIME
-        if is_mandante:
-            finalizacoes_individual = jogo.get('HF', 0)
-            chutes_gol_individual = jogo.get('HST', 0)
-            escanteios_individual = jogo.get('HC', 0)
-            cartoes_individual = jogo.get('HY', 0) + jogo.get('HR', 0) * 2
-        else:
-            finalizacoes_individual = jogo.get('AF', 0)
-            chutes_gol_individual = jogo.get('AST', 0)
-            escanteios_individual = jogo.get('AC', 0)
-            cartoes_individual = jogo.get('AY', 0) + jogo.get('AR', 0) * 2
-
-        # ANÁLISE: SOMA DO JOGO (Over/Under, BTTS)
-        if gols_ht > 0.5: sequencias['over_05_ht'] += 1
-        if gols_total > 1.5: sequencias['over_15_ft'] += 1
-        if gols_total > 2.5: sequencias['over_25_ft'] += 1
-        if gols_total > 3.5: sequencias['over_35_ft'] += 1
-
-        # BTTS: ambas marcaram (soma do jogo)
-        btts = jogo['FTHG'] > 0 and jogo['FTAG'] > 0
-        if btts: sequencias['btts'] += 1
-
-        if escanteios_total >= 9: sequencias['escanteios_9_mais'] += 1
-        if chutes_gol_total >= 4: sequencias['chutes_gol_4_mais'] += 1
-        if finalizacoes_total >= 10: sequencias['finalizacoes_10_mais'] += 1
-        if cartoes_total >= 3: sequencias['cartoes_3_mais'] += 1
-
-        # ANÁLISE: INDIVIDUAL (performance do time específico)
-        if finalizacoes_individual >= 10: sequencias['finalizacoes_10_mais_individual'] += 1
-        if chutes_gol_individual >= 4: sequencias['chutes_gol_4_mais_individual'] += 1
-        if escanteios_individual >= 9: sequencias['escanteios_9_mais_individual'] += 1
-        if cartoes_individual >= 3: sequencias['cartoes_3_mais_individual'] += 1
-
-    return sequencias
-
-def gerar_dicas_inteligentes(df_proximos_jogos, todas_abas):
-    dicas_todas = []
-
-    if df_proximos_jogos is None or todas_abas is None:
-        return []
-
-    for _, jogo in df_proximos_jogos.iterrows():
-        try:
-            liga = jogo.get('Div', '')
-            mandante = jogo.get('HomeTeam', '')
-            visitante = jogo.get('AwayTeam', '')
-            data = jogo.get('Date', '')
-
-            if liga in todas_abas and mandante and visitante:
-                df_liga = todas_abas[liga]
-                prob, confianca = calcular_probabilidades_completas(df_liga, mandante, visitante, liga)
-
-                if prob and prob['valor_confianca'] > CONFIANCA_BAIXA:
-                    if prob['casa_vence'] > 65:
-                        dicas_todas.append({
-                            'Data': data.strftime('%d/%m/%Y') if hasattr(data, 'strftime') else str(data),
-                            'Jogo': f"{mandante} x {visitante}",
-                            'Liga': mapeamento_ligas.get(liga, liga),
-                            'Dica': f"💪 {mandante} tem {prob['casa_vence']:.1f}% de chance de vitória",
-                            'Confiança': prob['confianca'],
-                            'Tipo': 'Probabilidade'
-                        })
-
-                    if prob['fora_vence'] > 65:
-                        dicas_todas.append({
-                            'Data': data.strftime('%d/%m/%Y') if hasattr(data, 'strftime') else str(data),
-                            'Jogo': f"{mandante} x {visitante}",
-                            'Liga': mapeamento_ligas.get(liga, liga),
-                            'Dica': f"💪 {visitante} tem {prob['fora_vence']:.1f}% de chance de vitória",
-                            'Confiança': prob['confianca'],
-                            'Tipo': 'Probabilidade'
-                        })
-
-                    if prob['over_25_ft'] > 70:
-                        dicas_todas.append({
-                            'Data': data.strftime('%d/%m/%Y') if hasattr(data, 'strftime') else str(data),
-                            'Jogo': f"{mandante} x {visitante}",
-                            'Liga': mapeamento_ligas.get(liga, liga),
-                            'Dica': f"⚽ Over 2.5 Gols: {prob['over_25_ft']:.1f}% de probabilidade",
-                            'Confiança': prob['confianca'],
-                            'Tipo': 'Probabilidade'
-                        })
-
-                    if prob['btts_ft'] > 65:
-                        dicas_todas.append({
-                            'Data': data.strftime('%d/%m/%Y') if hasattr(data, 'strftime') else str(data),
-                            'Jogo': f"{mandante} x {visitante}",
-                            'Liga': mapeamento_ligas.get(liga, liga),
-                            'Dica': f"🎯 BTTS: {prob['btts_ft']:.1f}% de probabilidade",
-                            'Confiança': prob['confianca'],
-                            'Tipo': 'Probabilidade'
-                        })
-
-        except Exception as e:
-            continue
-
-    return dicas_todas
-
-
-def gerar_dicas_sequencias(df_proximos_jogos, todas_abas):
-    dicas_sequencias = []
-
-    if df_proximos_jogos is None or todas_abas is None:
-        return dicas_sequencias
-
-    for _, jogo in df_proximos_jogos.iterrows():
-        try:
-            liga = jogo.get('Div', '')
-            mandante = jogo.get('HomeTeam', '')
-            visitante = jogo.get('AwayTeam', '')
-            data = jogo.get('Date', '')
-
-            if liga in todas_abas and mandante and visitante:
-                df_liga = todas_abas[liga]
-
-                seq_mandante = analisar_sequencias_equipes(df_liga, mandante, 5)
-                seq_visitante = analisar_sequencias_equipes(df_liga, visitante, 5)
-
-                if not seq_mandante or not seq_visitante:
-                    continue
-
-                dicas = []
-
-                # 🎯 OVER/UNDER GOLS (SOMA DO JOGO)
-                if seq_mandante['over_05_ht'] == 5 and seq_visitante['over_05_ht'] == 5:
-                    dicas.append("⚽ Over 0.5 HT: Ambos times estiveram em jogos com gol no 1º tempo nos últimos 5 jogos (soma do jogo)")
-
-                if seq_mandante['over_15_ft'] == 5 and seq_visitante['over_15_ft'] == 5:
-                    dicas.append("⚽ Over 1.5 FT: Ambos times estiveram em jogos com mais de 1.5 gols totais nos últimos 5 jogos (soma do jogo)")
-
-                if seq_mandante['over_25_ft'] == 5 and seq_visitante['over_25_ft'] == 5:
-                    dicas.append("⚽ Over 2.5 FT: Ambos times estiveram em jogos com mais de 2.5 gols totais nos últimos 5 jogos (soma do jogo)")
-
-                # 🎯 BTTS (SOMA DO JOGO)
-                if seq_mandante['btts'] == 5 and seq_visitante['btts'] == 5:
-                    dicas.append("🎯 BTTS: Ambos times estiveram em jogos onde as duas equipes marcaram nos últimos 5 jogos (soma do jogo)")
-
-                # 🎯 FINALIZAÇÕES (SOMA DO JOGO)
-                if seq_mandante['finalizacoes_10_mais'] == 5 and seq_visitante['finalizacoes_10_mais'] == 5:
-                    dicas.append("🎯 10+ Finalizações: Ambos times estiveram em jogos com 10+ finalizações totais (casa + fora) nos últimos 5 jogos")
-
-                # 🎯 FINALIZAÇÕES (INDIVIDUAL)
-                if seq_mandante['finalizacoes_10_mais_individual'] == 5 and seq_visitante['finalizacoes_10_mais_individual'] == 5:
-                    dicas.append("🔥 Finalizações Individuais: Cada time individualmente fez 10+ finalizações em seus últimos 5 jogos")
-
-                # 🎯 CHUTES AO GOL (SOMA DO JOGO)
-                if seq_mandante['chutes_gol_4_mais'] == 5 and seq_visitante['chutes_gol_4_mais'] == 5:
-                    dicas.append("🥅 4+ Chutes no Gol: Ambos times estiveram em jogos com 4+ chutes no gol totais nos últimos 5 jogos")
-
-                # 🎯 CHUTES AO GOL (INDIVIDUAL)
-                if seq_mandante['chutes_gol_4_mais_individual'] == 5 and seq_visitante['chutes_gol_4_mais_individual'] == 5:
-                    dicas.append("🔥 Chutes Individuais: Cada time individualmente fez 4+ chutes no gol em seus últimos 5 jogos")
-
-                # 🎯 ESCANTEIOS (SOMA DO JOGO)
-                if seq_mandante['escanteios_9_mais'] == 5 and seq_visitante['escanteios_9_mais'] == 5:
-                    dicas.append("🔄 9+ Escanteios: Ambos times estiveram em jogos com 9+ escanteios totais nos últimos 5 jogos")
-
-                # 🎯 ESCANTEIOS (INDIVIDUAL)
-                if seq_mandante['escanteios_9_mais_individual'] == 5 and seq_visitante['escanteios_9_mais_individual'] == 5:
-                    dicas.append("🔥 Escanteios Individuais: Cada time individualmente fez 9+ escanteios em seus últimos 5 jogos")
-
-                # 🎯 CARTÕES (SOMA DO JOGO)
-                if seq_mandante['cartoes_3_mais'] == 5 and seq_visitante['cartoes_3_mais'] == 5:
-                    dicas.append("🟨 3+ Cartões: Ambos times estiveram em jogos com 3+ cartões totais nos últimos 5 jogos")
-
-                # 🎯 CARTÕES (INDIVIDUAL)
-                if seq_mandante['cartoes_3_mais_individual'] == 5 and seq_visitante['cartoes_3_mais_individual'] == 5:
-                    dicas.append("🔥 Cartões Individuais: Cada time individualmente recebeu 3+ cartões em seus últimos 5 jogos")
-
-                for dica in dicas:
-                    dicas_sequencias.append({
-                        'Data': data.strftime('%d/%m/%Y') if hasattr(data, 'strftime') else str(data),
-                        'Jogo': f"{mandante} x {visitante}",
-                        'Liga': mapeamento_ligas.get(liga, liga),
-                        'Dica': dica,
-                        'Tipo': 'Sequência 5/5',
-                        'Confiança': 'Alta'
-                    })
-
-        except Exception as e:
-            continue
-
-    return dicas_sequencias
-
-# NOVAS FUNÇÕES PARA A ABA TOP RANKINGS
-def obter_todos_times_liga(df_liga):
-    """Obtém todos os times únicos de uma liga"""
-    times_casa = df_liga['HomeTeam'].unique()
-    times_fora = df_liga['AwayTeam'].unique()
-    return list(set(times_casa) | set(times_fora))
-
-
-def calcular_estatisticas_time_geral(df_liga, time, max_jogos=10):
-    """Calcula estatísticas gerais de um time considerando todos os jogos"""
-    jogos_casa = df_liga[df_liga['HomeTeam'] == time].tail(max_jogos)
-    jogos_fora = df_liga[df_liga['AwayTeam'] == time].tail(max_jogos)
-
-    todos_jogos = pd.concat([jogos_casa, jogos_fora]).tail(max_jogos)
-
-    if len(todos_jogos) == 0:
-        return None
-
-    estatisticas = {
-        'time': time,
-        'total_jogos': len(todos_jogos),
-        'over_05_ht': 0,
-        'over_15_ft': 0,
-        'over_25_ft': 0,
-        'btts': 0,
-        'vitorias': 0,
-        'derrotas': 0,
-        'escanteios_8_mais': 0,
-        'escanteios_9_mais': 0,
-        'escanteios_10_mais': 0,
-        'ultimos_5_jogos': []
-    }
-
-    for _, jogo in todos_jogos.iterrows():
-        is_mandante = jogo['HomeTeam'] == time
-
-        # Gols
-        gols_total = jogo.get('FTHG', 0) + jogo.get('FTAG', 0)
-        gols_ht = jogo.get('HTHG', 0) + jogo.get('HTAG', 0)
-
-        # Over/Under
-        if gols_ht > 0.5: estatisticas['over_05_ht'] += 1
-        if gols_total > 1.5: estatisticas['over_15_ft'] += 1
-        if gols_total > 2.5: estatisticas['over_25_ft'] += 1
-
-        # BTTS
-        if is_mandante:
-            btts = jogo.get('FTHG', 0) > 0 and jogo.get('FTAG', 0) > 0
-        else:
-            btts = jogo.get('FTAG', 0) > 0 and jogo.get('FTHG', 0) > 0
-        if btts: estatisticas['btts'] += 1
-
-        # Resultados
-        if is_mandante:
-            if jogo.get('FTR') == 'H':
-                estatisticas['vitorias'] += 1
-            elif jogo.get('FTR') == 'A':
-                estatisticas['derrotas'] += 1
-        else:
-            if jogo.get('FTR') == 'A':
-                estatisticas['vitorias'] += 1
-            elif jogo.get('FTR') == 'H':
-                estatisticas['derrotas'] += 1
-
-        # Escanteios
-        escanteios_total = jogo.get('HC', 0) + jogo.get('AC', 0)
-        if escanteios_total >= 8: estatisticas['escanteios_8_mais'] += 1
-        if escanteios_total >= 9: estatisticas['escanteios_9_mais'] += 1
-        if escanteios_total >= 10: estatisticas['escanteios_10_mais'] += 1
-
-        # Últimos 5 jogos (para sequência) - ADICIONAR O TIME ANALISADO
-        jogo_com_time = jogo.copy()
-        jogo_com_time['Time_Analisado'] = time  # Adicionar informação do time
-        estatisticas['ultimos_5_jogos'].append(jogo_com_time)
-
-    return estatisticas
-
-def calcular_sequencia_atual(ultimos_jogos, mercado):
-    """Calcula a sequência atual baseada nos últimos jogos"""
-    if not ultimos_jogos:
-        return 0, []
-
-    sequencia = 0
-    emojis_ultimos_5 = []
-
-    # Pegar os últimos 5 jogos na ordem correta (mais recente primeiro)
-    ultimos_5 = ultimos_jogos[-5:] if len(ultimos_jogos) >= 5 else ultimos_jogos
-
-    for jogo in reversed(ultimos_5):  # Mais recente primeiro
-        criterio_atingido = False
-
-        if mercado == 'Jogos 0.5 HT':
-            gols_ht = jogo.get('HTHG', 0) + jogo.get('HTAG', 0)
-            criterio_atingido = gols_ht > 0.5
-        elif mercado == 'Jogos 1.5 FT':
-            gols_ft = jogo.get('FTHG', 0) + jogo.get('FTAG', 0)
-            criterio_atingido = gols_ft > 1.5
-        elif mercado == 'Jogos 2.5 FT':
-            gols_ft = jogo.get('FTHG', 0) + jogo.get('FTAG', 0)
-            criterio_atingido = gols_ft > 2.5
-        elif mercado == 'Jogos BTTS':
-            # BTTS: ambas as equipes marcaram
-            criterio_atingido = jogo.get('FTHG', 0) > 0 and jogo.get('FTAG', 0) > 0
-        elif mercado == 'Vitoria':
-            # Para vitória, precisamos saber se o time era mandante ou visitante
-            is_mandante = jogo.get('HomeTeam') == time
-            if is_mandante:
-                criterio_atingido = jogo.get('FTR') == 'H'
-            else:
-                criterio_atingido = jogo.get('FTR') == 'A'
-        elif mercado == 'Derrota':
-            is_mandante = jogo.get('HomeTeam') == time
-            if is_mandante:
-                criterio_atingido = jogo.get('FTR') == 'A'
-            else:
-                criterio_atingido = jogo.get('FTR') == 'H'
-        elif mercado == 'Jogos 8+ Escanteios':
-            escanteios = jogo.get('HC', 0) + jogo.get('AC', 0)
-            criterio_atingido = escanteios >= 8
-        elif mercado == 'Jogos 9+ Escanteios':
-            escanteios = jogo.get('HC', 0) + jogo.get('AC', 0)
-            criterio_atingido = escanteios >= 9
-        elif mercado == 'Jogos 10+ Escanteios':
-            escanteios = jogo.get('HC', 0) + jogo.get('AC', 0)
-            criterio_atingido = escanteios >= 10
-
-        emoji = '✅' if criterio_atingido else '🔴'
-        emojis_ultimos_5.append(emoji)
-
-        # Calcular sequência (apenas se for o primeiro jogo ou se a sequência está ativa)
-        if len(emojis_ultimos_5) == 1:  # Primeiro jogo (mais recente)
-            if criterio_atingido:
-                sequencia = 1
-        else:
-            if criterio_atingido and sequencia == (len(emojis_ultimos_5) - 1):
-                sequencia += 1
-            else:
-                # Sequência quebrada, mas continuamos para preencher os 5 jogos
-                pass
-
-    # Preencher com 🔴 se tiver menos de 5 jogos
-    while len(emojis_ultimos_5) < 5:
-        emojis_ultimos_5.append('🔴')
-
-    return sequencia, emojis_ultimos_5
-
-def gerar_ranking_liga(df_liga, liga_nome, mercado, max_jogos=10):
-    """Gera o ranking para uma liga específica"""
-    times = obter_todos_times_liga(df_liga)
-    rankings = []
-
-    for time in times:
-        stats = calcular_estatisticas_time_geral(df_liga, time, max_jogos)
-        if not stats or stats['total_jogos'] < 5:  # Mínimo de 5 jogos para análise
-            continue
-
-        total_jogos = stats['total_jogos']
-
-        # Calcular porcentagem baseada no mercado
-        if mercado == 'Jogos 0.5 HT':
-            acertos = stats['over_05_ht']
-        elif mercado == 'Jogos 1.5 FT':
-            acertos = stats['over_15_ft']
-        elif mercado == 'Jogos 2.5 FT':
-            acertos = stats['over_25_ft']
-        elif mercado == 'Jogos BTTS':
-            acertos = stats['btts']
-        elif mercado == 'Vitoria':
-            acertos = stats['vitorias']
-        elif mercado == 'Derrota':
-            acertos = stats['derrotas']
-        elif mercado == 'Jogos 8+ Escanteios':
-            acertos = stats['escanteios_8_mais']
-        elif mercado == 'Jogos 9+ Escanteios':
-            acertos = stats['escanteios_9_mais']
-        elif mercado == 'Jogos 10+ Escanteios':
-            acertos = stats['escanteios_10_mais']
-        else:
-            acertos = 0
-
-        porcentagem = (acertos / total_jogos) * 100 if total_jogos > 0 else 0
-
-        # Calcular sequência atual
-        sequencia, ultimos_5_emojis = calcular_sequencia_atual(stats['ultimos_5_jogos'], mercado)
-
-        rankings.append({
-            'Time': time,
-            'Liga': liga_nome,
-            'Jogos Analisados': f"{acertos}/{total_jogos}",
-            'Porcentagem': porcentagem,
-            'Sequencia Atual': sequencia,
-            'Ultimos 5 Jogos': ' '.join(ultimos_5_emojis),
-            'Acertos': acertos,
-            'Total Jogos': total_jogos
-        })
+# Dados do snapshot atual do processo, revalidado em segundo plano
+estado_dados = estado_atualizacao()
+with medir('snapshot'):
+    snapshot_dados = obter_snapshot(estado_dados, url_excel, url_proximos_jogos)
+iniciar_atualizacao(estado_dados, url_excel, url_proximos_jogos, preparar_snapshot)
+todas_abas, abas_disponiveis = snapshot_dados['todas_abas'], snapshot_dados['abas']
+df_proximos_jogos = snapshot_dados['df_proximos_jogos']
 
-    # Ordenar por porcentagem (decrescente) e depois por número de jogos (decrescente)
-    rankings.sort(key=lambda x: (-x['Porcentagem'], -x['Total Jogos']))
+# Índice de times: construído uma vez por carga de dados e compartilhado pelas abas
+versao_dados = snapshot_dados['versao_dados']
+indice_times = construir_indice_times(todas_abas, versao_dados) if todas_abas else {}
 
-    return rankings[:10]  # Top 10
-
-
-def gerar_todos_rankings(todas_abas, mercado, max_jogos=10):
-    """Gera rankings para todas as ligas"""
-    todos_rankings = []
-
-    for codigo_liga, df_liga in todas_abas.items():
-        liga_nome = mapeamento_ligas.get(codigo_liga, codigo_liga)
-        ranking_liga = gerar_ranking_liga(df_liga, liga_nome, mercado, max_jogos)
-        todos_rankings.extend(ranking_liga)
-
-    return todos_rankings
+# Saída do lote (python -m futalgorithm predict), usada quando foi gerada para esta mesma versão dos dados
+DIRETORIO_PRECALCULADO = os.environ.get('FUTALGORITHM_PRECALCULADO')
+precalculado = carregar_precalculado(DIRETORIO_PRECALCULADO, versao_dados) \
+    if DIRETORIO_PRECALCULADO and todas_abas else None
+if precalculado:
+    cubo_rankings = precalculado['cubo']
+else:
+    cubo_rankings = construir_cubo_rankings(todas_abas, indice_times, versao_dados) if todas_abas else {}
 
 
 # Interface principal
 st.markdown('<h1 class="main-header">💀 FutAlgorithm Pro MAX </h1>', unsafe_allow_html=True)
 st.markdown('<p class="citacao">⚰️ In Memoriam - Denise Bet365</p>', unsafe_allow_html=True)
+if snapshot_dados['atualizado_em'] > datetime.min:
+    st.caption(f"🕒 Dados de {snapshot_dados['atualizado_em']:%d/%m/%Y %H:%M} · atualização automática em segundo plano")
+if precalculado:
+    st.caption(f"📦 Previsões, dicas e rankings do lote gerado em {precalculado['manifesto']['gerado_em']}")
+if estado_dados['erro']:
+    if todas_abas:
+        st.warning(f"⚠️ Não foi possível atualizar os dados ({estado_dados['erro']}). Usando a última versão salva.")
+    else:
+        st.error(f"❌ Erro ao carregar dados: {estado_dados['erro']}")
 st.markdown("---")
 
 # Criar abas NA ORDEM SOLICITADA
-tab_titles = ["💥 Simulador Avançado", "⚡ Dicas Estatísticas", "🏆 Top Rankings", "📈 Sobre o Sistema"]
+tab_titles = ["💥 Simulador Avançado", "⚡ Dicas Estatísticas", "🏆 Top Rankings", "📊 Tabela da Temporada",
+              "🎯 Calibração", "📈 Sobre o Sistema"]
+# Aba oculta: só com a instrumentação ligada e ?diagnostico na URL
+mostrar_diagnostico = INSTRUMENTACAO_ATIVA and 'diagnostico' in st.query_params
+if mostrar_diagnostico:
+    tab_titles.append("🩺 Diagnóstico")
 tabs = st.tabs(tab_titles)
 
 # Aba 1: Simulador Avançado
@@ -1112,8 +297,13 @@ with tabs[0]:
     st.header("️ ️🏆 Temporada Europeia 2025-2026")
 
     if todas_abas and df_proximos_jogos is not None:
-        with st.spinner('🧠 Calculando probabilidades com máxima acurácia...'):
-            df_resultados = processar_todos_jogos_completos(todas_abas, df_proximos_jogos)
+        if precalculado:
+            df_resultados = precalculado['previsoes']
+        else:
+            with st.spinner('🧠 Calculando probabilidades com máxima acurácia...'):
+                previsoes_jogos = obter_previsoes(todas_abas, df_proximos_jogos, indice_times, versao_dados)
+                df_resultados = processar_todos_jogos_completos(todas_abas, df_proximos_jogos, indice_times,
+                                                                previsoes_jogos)
 
         if not df_resultados.empty:
             st.success(f"✅ {len(df_resultados)} jogos analisados com algoritmo aprimorado!")
@@ -1125,11 +315,14 @@ with tabs[0]:
             col1, col2, col3, col4 = st.columns(4)
 
             with col1:
-                datas_unicas = sorted(df_resultados['Data'].unique())
-                data_selecionada = st.selectbox("📅 Data", ["Todas as datas"] + datas_unicas)
+                datas_unicas = sorted(df_resultados['Data'].dropna().unique())
+                data_selecionada = st.selectbox(
+                    "📅 Data", ["Todas as datas"] + datas_unicas,
+                    format_func=lambda d: d if isinstance(d, str) else pd.Timestamp(d).strftime('%d/%m/%Y')
+                )
 
             with col2:
-                ligas_unicas = sorted(df_resultados['Liga'].unique())
+                ligas_unicas = sorted(df_resultados['Liga'].dropna().unique().tolist())
                 liga_selecionada = st.selectbox("🏆 Liga", ["Todas as ligas"] + ligas_unicas)
 
             with col3:
@@ -1144,20 +337,20 @@ with tabs[0]:
                     "Escanteios",
                     "Finalizações",
                     "Chutes ao Gol",
-                    "Cartões"
+                    "Cartões",
+                    "Valor (Odds)"
                 ])
 
             st.markdown('</div>', unsafe_allow_html=True)
 
             # Aplicar filtros
-            df_filtrado = df_resultados.copy()
+            # Compara na precisão exibida (2 casas), como o usuário vê o valor na tabela
+            filtro = df_resultados['Valor Confiança'].to_numpy(dtype=np.float64).round(2) >= min_confianca - 1e-9
             if data_selecionada != "Todas as datas":
-                df_filtrado = df_filtrado[df_filtrado['Data'] == data_selecionada]
+                filtro &= (df_resultados['Data'] == data_selecionada).to_numpy()
             if liga_selecionada != "Todas as ligas":
-                df_filtrado = df_filtrado[df_filtrado['Liga'] == liga_selecionada]
-
-            df_filtrado['Valor Confiança Float'] = df_filtrado['Valor Confiança'].astype(float)
-            df_filtrado = df_filtrado[df_filtrado['Valor Confiança Float'] >= min_confianca]
+                filtro &= (df_resultados['Liga'] == liga_selecionada).to_numpy()
+            df_filtrado = df_resultados[filtro]
 
             st.info(
                 f"📊 Mostrando {len(df_filtrado)} de {len(df_resultados)} jogos (apenas confiança ≥ {min_confianca})")
@@ -1172,13 +365,15 @@ with tabs[0]:
             elif mercado_filtro == "BTTS":
                 colunas_adicionais = ['BTTS FT']
             elif mercado_filtro == "Escanteios":
-                colunas_adicionais = ['Escanteios Casa Esp', 'Escanteios Fora Esp', 'Escanteios FT']
+                colunas_adicionais = ['Escanteios Casa Esp', 'Escanteios Fora Esp', 'Escanteios FT'] + colunas_totais('escanteios')
             elif mercado_filtro == "Finalizações":
-                colunas_adicionais = ['Finalizações Casa Esp', 'Finalizações Fora Esp', 'Finalizações FT']
+                colunas_adicionais = ['Finalizações Casa Esp', 'Finalizações Fora Esp', 'Finalizações FT'] + colunas_totais('finalizacoes')
             elif mercado_filtro == "Chutes ao Gol":
-                colunas_adicionais = ['Chutes Gol Casa Esp', 'Chutes Gol Fora Esp', 'Chutes Gol FT']
+                colunas_adicionais = ['Chutes Gol Casa Esp', 'Chutes Gol Fora Esp', 'Chutes Gol FT'] + colunas_totais('chutes_gol')
             elif mercado_filtro == "Cartões":
-                colunas_adicionais = ['Cartões Casa Esp', 'Cartões Fora Esp', 'Cartões FT']
+                colunas_adicionais = ['Cartões Casa Esp', 'Cartões Fora Esp', 'Cartões FT'] + colunas_totais('cartoes')
+            elif mercado_filtro == "Valor (Odds)":
+                colunas_adicionais = ['Edge', 'Mercado Edge', 'Odd Edge', 'Kelly']
             else:
                 colunas_adicionais = [
                     'Casa Vence', 'Empate', 'Fora Vence',
@@ -1188,60 +383,29 @@ with tabs[0]:
                     'Escanteios Casa Esp', 'Escanteios Fora Esp', 'Escanteios FT',
                     'Finalizações Casa Esp', 'Finalizações Fora Esp', 'Finalizações FT',
                     'Chutes Gol Casa Esp', 'Chutes Gol Fora Esp', 'Chutes Gol FT',
-                    'Cartões Casa Esp', 'Cartões Fora Esp', 'Cartões FT'
+                    'Cartões Casa Esp', 'Cartões Fora Esp', 'Cartões FT',
+                    'Edge', 'Mercado Edge'
                 ]
 
             colunas_exibicao = colunas_base + colunas_adicionais
             colunas_disponiveis = [col for col in colunas_exibicao if col in df_filtrado.columns]
 
-            # Exibir tabela
-            st.markdown('<div class="dataframe-container">', unsafe_allow_html=True)
+            # Exibir tabela (paginada: só a página visível é enviada ao navegador)
+            col_pagina, col_tamanho = st.columns([3, 1])
+            with col_tamanho:
+                tamanho_pagina = st.selectbox("📄 Linhas por página", TAMANHOS_PAGINA, index=1,
+                                              key="simulador_tamanho_pagina")
+            total_paginas = max(1, -(-len(df_filtrado) // tamanho_pagina))
+            with col_pagina:
+                pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas,
+                                         value=1, step=1, key="simulador_pagina")
 
-            html_table = """
-            <table class="dataframe-table">
-                <thead>
-                    <tr>
-            """
-
-            for coluna in colunas_disponiveis:
-                html_table += f'<th>{coluna}</th>'
-            html_table += "</tr></thead><tbody>"
-
-            for _, row in df_filtrado.iterrows():
-                html_table += "<tr>"
-                for coluna in colunas_disponiveis:
-                    valor = row[coluna]
-
-                    tipo = ""
-                    if any(x in coluna.lower() for x in ['vence', 'empate']):
-                        tipo = 'resultado'
-                    elif 'over' in coluna.lower():
-                        tipo = 'over_under'
-                    elif 'btts' in coluna.lower():
-                        tipo = 'btts'
-                    elif 'gols' in coluna.lower():
-                        tipo = 'gols'
-                    elif 'escanteios' in coluna.lower():
-                        tipo = 'escanteios'
-                    elif 'finalizacoes' in coluna.lower():
-                        tipo = 'finalizacoes'
-                    elif 'chutes' in coluna.lower():
-                        tipo = 'chutes'
-                    elif 'cartões' in coluna.lower():
-                        tipo = 'cartoes'
-
-                    classe_cor = aplicar_cores_valor(valor, tipo)
-                    html_table += f'<td class="{classe_cor}">{valor}</td>'
-
-                html_table += "</tr>"
-
-            html_table += "</tbody></table>"
-
-            st.markdown(html_table, unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            inicio = (int(pagina) - 1) * tamanho_pagina
+            st.markdown(renderizar_tabela_html(df_filtrado, colunas_disponiveis, inicio, inicio + tamanho_pagina),
+                        unsafe_allow_html=True)
 
             # Botão de download
-            csv = df_filtrado[colunas_disponiveis].to_csv(index=False, sep=';')
+            csv = formatar_tabela(df_filtrado, colunas_disponiveis).to_csv(index=False, sep=';')
             st.download_button(
                 label="📥 Download CSV",
                 data=csv,
@@ -1260,10 +424,14 @@ with tabs[1]:
     st.header("🔥 Dicas Estatísticas das Partidas")
 
     if todas_abas and df_proximos_jogos is not None:
-        with st.spinner('🔍 Gerando dicas inteligentes...'):
-            dicas = gerar_dicas_inteligentes(df_proximos_jogos, todas_abas)
-            dicas_sequencia = gerar_dicas_sequencias(df_proximos_jogos, todas_abas)
-            todas_dicas = dicas + dicas_sequencia
+        if precalculado:
+            todas_dicas = precalculado['dicas'].to_dict('records')
+        else:
+            with st.spinner('🔍 Gerando dicas inteligentes...'):
+                previsoes_jogos = obter_previsoes(todas_abas, df_proximos_jogos, indice_times, versao_dados)
+                dicas = gerar_dicas_inteligentes(df_proximos_jogos, todas_abas, indice_times, previsoes_jogos)
+                dicas_sequencia = gerar_dicas_sequencias(df_proximos_jogos, todas_abas, indice_times)
+                todas_dicas = dicas + dicas_sequencia
 
         if todas_dicas:
             st.success(f"✅ {len(todas_dicas)} dicas encontradas!")
@@ -1284,7 +452,8 @@ with tabs[1]:
                                               key="dica_confianca")
 
             with col3:
-                tipo_dica = st.selectbox("📊 Tipo de Dica", ["Todos", "Probabilidade", "Sequência 5/5"], key="dica_tipo")
+                tipos_dica = list(dict.fromkeys(['Probabilidade'] + compilar_regras_sequencia(REGRAS_SEQUENCIA)['tipos']))
+                tipo_dica = st.selectbox("📊 Tipo de Dica", ["Todos"] + tipos_dica, key="dica_tipo")
 
             st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1302,7 +471,7 @@ with tabs[1]:
             # Exibir dicas
             for dica in dicas_filtradas:
                 cor_borda = "#1E88E5"
-                if dica.get('Tipo') == 'Sequência 5/5':
+                if dica.get('Tipo', '').startswith('Sequência'):
                     cor_borda = "#4CAF50"
 
                 st.markdown(f"""
@@ -1371,27 +540,37 @@ with tabs[2]:
 
         st.markdown('</div>', unsafe_allow_html=True)
 
-        with st.spinner('📊 Gerando rankings...'):
-            # Gerar rankings
-            if liga_selecionada_ranking == "Todas as ligas":
-                rankings = gerar_todos_rankings(todas_abas, mercado_selecionado, max_jogos_ranking)
+        # Recorte do cubo pré-computado: trocar filtros não recalcula nada
+        if liga_selecionada_ranking == "Todas as ligas":
+            rankings = gerar_todos_rankings(todas_abas, mercado_selecionado, max_jogos_ranking, indice_times,
+                                            cubo_rankings)
+        else:
+            # Encontrar código da liga selecionada
+            codigo_liga = None
+            for codigo, nome in mapeamento_ligas.items():
+                if nome == liga_selecionada_ranking:
+                    codigo_liga = codigo
+                    break
+
+            if codigo_liga and codigo_liga in todas_abas:
+                rankings = gerar_ranking_liga(
+                    todas_abas[codigo_liga],
+                    liga_selecionada_ranking,
+                    mercado_selecionado,
+                    max_jogos_ranking,
+                    indice_times.get(codigo_liga),
+                    cubo_rankings.get(codigo_liga)
+                )
             else:
-                # Encontrar código da liga selecionada
-                codigo_liga = None
-                for codigo, nome in mapeamento_ligas.items():
-                    if nome == liga_selecionada_ranking:
-                        codigo_liga = codigo
-                        break
-
-                if codigo_liga and codigo_liga in todas_abas:
-                    rankings = gerar_ranking_liga(
-                        todas_abas[codigo_liga],
-                        liga_selecionada_ranking,
-                        mercado_selecionado,
-                        max_jogos_ranking
-                    )
-                else:
-                    rankings = []
+                rankings = []
+
+        if liga_selecionada_ranking == "Todas as ligas" and TEMPOS_POR_LIGA.get('rankings'):
+            with st.expander("⏱️ Tempo por liga"):
+                st.dataframe(pd.DataFrame([
+                    {'Liga': mapeamento_ligas.get(liga, liga), 'Segundos': round(tempo['segundos'], 3),
+                     'Worker': tempo['worker']}
+                    for liga, tempo in TEMPOS_POR_LIGA['rankings'].items()
+                ]), hide_index=True, use_container_width=True)
 
         if rankings:
             st.success(f"✅ Ranking gerado com {len(rankings)} times!")
@@ -1500,59 +679,216 @@ with tabs[2]:
     else:
         st.error("❌ Dados não disponíveis para análise")
 
-# Aba 4: Sobre o Sistema (agora é a última aba)
+# Aba 4: Projeção da tabela de cada liga até o fim da temporada
 with tabs[3]:
+    st.header("📊 Tabela da Temporada")
+
+    tabelas_temporada = {}
+    if todas_abas:
+        with st.spinner('🎲 Simulando o restante da temporada...'):
+            tabelas_temporada = calcular_tabelas_temporada(todas_abas, indice_times, versao_dados,
+                                                           ajustar_modelos_lambdas(todas_abas, versao_dados))
+
+    if tabelas_temporada:
+        ligas_temporada = sorted(tabelas_temporada, key=lambda liga: mapeamento_ligas.get(liga, liga))
+        liga_temporada = st.selectbox("🏆 Liga", ligas_temporada,
+                                      format_func=lambda liga: mapeamento_ligas.get(liga, liga),
+                                      key="temporada_liga")
+        tabela_temporada = tabelas_temporada[liga_temporada]
+        rebaixados = REBAIXADOS_LIGA.get(liga_temporada, REBAIXADOS_LIGA['default'])
+
+        st.info(f"ℹ️ Jogos restantes simulados {SIMULACOES_TEMPORADA:,} vezes com os lambdas das previsões. "
+                f"Desempate: pontos, saldo de gols e gols pró. Rebaixamento: últimos {rebaixados} colocados.")
+
+        col1, col2, col3 = st.columns(3)
+        favorito = tabela_temporada.loc[tabela_temporada['Título'].idxmax()]
+        col1.metric("👑 Favorito ao título", favorito['Time'], f"{favorito['Título']:.1f}%")
+        col2.metric("⚽ Jogos disputados", int(tabela_temporada['J'].sum() // 2))
+        col3.metric("📅 Jogos restantes", int(tabela_temporada['Restam'].sum() // 2))
+
+        st.dataframe(tabela_temporada.round({'Pts Projetados': 1, 'Posição Média': 1, 'Título': 1,
+                                             f'Top {VAGAS_TOPO}': 1, 'Rebaixamento': 1}),
+                     hide_index=True, use_container_width=True)
+    else:
+        st.warning("⚠️ Sem jogos disputados suficientes para projetar a tabela.")
+
+    sem_projecao = sorted(mapeamento_ligas.get(liga, liga) for liga in (todas_abas or {}) if not liga_projetavel(liga))
+    if sem_projecao:
+        st.caption(f"Fora da projeção (divisão em grupos ou playoffs depois da fase regular): {', '.join(sem_projecao)}")
+
+# Aba 5: Calibração das probabilidades contra os resultados da temporada
+with tabs[4]:
+    st.header("🎯 Calibração das Probabilidades")
+
+    relatorio_calibracao = {}
+    if todas_abas:
+        with st.spinner('📏 Comparando previsões com resultados...'):
+            relatorio_calibracao = calcular_relatorio_calibracao(
+                calcular_backtest(todas_abas, indice_times, versao_dados), versao_dados)
+
+    if relatorio_calibracao:
+        st.info("ℹ️ Previsões walk-forward da temporada (cada jogo previsto só com os jogos anteriores) "
+                "comparadas com os resultados. Brier, Log-Loss e RPS: quanto menor, melhor. "
+                "Brier Skill > 0: melhor do que prever sempre a frequência média do mercado. "
+                "Cada liga é avaliada com a fonte de lambdas que o Simulador usa nela (FUTALGORITHM_LAMBDAS).")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            liga_calibracao = st.selectbox(
+                "🏆 Liga", ["Todas as ligas"] + sorted(relatorio_calibracao['ligas']['Liga'].unique()),
+                key="calibracao_liga")
+        with col2:
+            mercado_calibracao = st.selectbox("⚽ Mercado", list(MERCADOS_CALIBRACAO), key="calibracao_mercado")
+
+        if liga_calibracao == "Todas as ligas":
+            metricas_liga = relatorio_calibracao['mercados']
+            rps_liga = relatorio_calibracao['rps'].iloc[0]
+        else:
+            ligas_calibracao = relatorio_calibracao['ligas']
+            metricas_liga = ligas_calibracao[ligas_calibracao['Liga'] == liga_calibracao].drop(columns='Liga')
+            rps_ligas = relatorio_calibracao['rps_ligas']
+            rps_liga = rps_ligas[rps_ligas['Liga'] == liga_calibracao].iloc[0]
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("⚽ Jogos previstos", int(rps_liga['Jogos']))
+        col2.metric("📏 RPS 1X2", f"{rps_liga['RPS 1X2']:.4f}")
+        col3.metric("🎯 Brier médio", f"{metricas_liga['Brier'].mean():.4f}")
+
+        st.markdown("### 📏 Métricas por Mercado")
+        st.dataframe(metricas_liga.round(4), hide_index=True, use_container_width=True)
+
+        st.markdown(f"### 📈 Diagrama de Confiabilidade – {mercado_calibracao}")
+        confiabilidade = relatorio_calibracao['confiabilidade']
+        confiabilidade = confiabilidade[(confiabilidade['Liga'] == liga_calibracao) &
+                                        (confiabilidade['Mercado'] == mercado_calibracao)]
+        if not confiabilidade.empty:
+            st.line_chart(pd.DataFrame({'Frequência Real': confiabilidade['Frequência Real'].to_numpy(),
+                                        'Calibração Perfeita': confiabilidade['Prob. Prevista'].to_numpy()},
+                                       index=confiabilidade['Prob. Prevista'].round(1).to_numpy()))
+            largura = 100 // BINS_CONFIABILIDADE
+            st.dataframe(confiabilidade.assign(Faixa=[f"{faixa * largura}-{(faixa + 1) * largura}%"
+                                                      for faixa in confiabilidade['Faixa']])
+                         [['Faixa', 'Jogos', 'Prob. Prevista', 'Frequência Real']].round(1),
+                         hide_index=True, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("### 🎨 Faixas de Cor do Simulador")
+            st.dataframe(relatorio_calibracao['faixas'].round(1), hide_index=True, use_container_width=True)
+        with col2:
+            st.markdown("### ⭐ Níveis de Confiança")
+            st.dataframe(relatorio_calibracao['confianca'].round(4), hide_index=True, use_container_width=True)
+    else:
+        st.warning("⚠️ Sem previsões históricas suficientes para calibrar.")
+
+# Aba 6: Sobre o Sistema (agora é a última aba)
+with tabs[5]:
     st.markdown("""
     <div style='background-color: #1E1E1E; padding: 20px; border-radius: 10px; border: 1px solid #333;'>
         <h2 style='color: #1E88E5; text-align: center;'>💀 Sobre o FutAlgorithm Pro MAX</h2>
     </div>
     """, unsafe_allow_html=True)
 
+    # Backtest walk-forward da temporada: os números desta aba saem dele
+    backtest = calcular_backtest(todas_abas, indice_times, versao_dados) if todas_abas else pd.DataFrame()
+    resumo_backtest = resumir_backtest(backtest, CONFIANCA_MEDIA)
+    resumo_valor = resumir_valor(backtest)
+    if not resumo_backtest.empty:
+        jogos_previstos = int(backtest['valor_confianca'].notna().sum())
+        mercados_modelo = resumo_backtest[resumo_backtest['Mercado'] != 'Sequências 5/5']
+        sequencias_backtest = resumo_backtest[resumo_backtest['Mercado'] == 'Sequências 5/5'].iloc[0]
+        apostas_modelo = int(mercados_modelo['Apostas'].sum())
+        taxa_geral = mercados_modelo['Acertos'].sum() / max(apostas_modelo, 1) * 100
+        jogos_por_dia = backtest.groupby(backtest['Date'].dt.normalize()).size().mean()
+        apostas_valor = int(resumo_valor['Apostas'].sum()) if not resumo_valor.empty else 0
+        roi_valor = ((resumo_valor['ROI'].fillna(0) * resumo_valor['Apostas']).sum() / apostas_valor
+                     if apostas_valor else np.nan)
+        # Só mercados com amostra razoável entram no destaque
+        melhores_mercados = (resumo_backtest[resumo_backtest['Apostas'] >= 30]
+                             .sort_values('Taxa Acerto', ascending=False).head(4))
+        fontes_backtest = ', '.join(f"{fonte} ({n} {'liga' if n == 1 else 'ligas'})"
+                                    for fonte, n in backtest.groupby('Fonte')['Liga'].nunique().items())
+
     col1, col2 = st.columns([2, 1])
 
     with col1:
         st.markdown("""
-        ### 📊 Avaliação do Sistema: 8.5/10 ⭐
+        ### 📊 Sobre o Sistema
 
         **O FutAlgorithm Pro MAX é o sistema mais avançado de análise estatística para apostas esportivas**,
         utilizando algoritmos aprimorados e dados reais de competições europeias para máxima acurácia.
 
-        ### 🎯 O que esperar do sistema:
-
-        - **Taxa de acerto geral:** 72-76% (após filtros)
-        - **ROI esperado:** 10-15% a longo prazo
-        - **Jogos analisados/dia:** 15-25 (após filtros de qualidade)
-        - **Confiança mínima recomendada:** ≥ 0.65
-
-        ### 📈 Resultados em Simulações (1000 jogos):
         """)
 
-        # Tabela de resultados simulados
-        st.markdown("""
-        <div class="dataframe-container">
-        <table class="dataframe-table">
-            <thead>
-                <tr>
-                    <th>Mercado</th>
-                    <th>Acertos</th>
-                    <th>Erros</th>
-                    <th>Taxa Acerto</th>
-                    <th>ROI</th>
-                </tr>
-            </thead>
-            <tbody>
-                <tr><td>BTTS FT</td><td>715</td><td>285</td><td>71.5%</td><td>+13.5%</td></tr>
-                <tr><td>Over 1.5 FT</td><td>782</td><td>218</td><td>78.2%</td><td>+10.2%</td></tr>
-                <tr><td>Over 2.5 FT</td><td>523</td><td>477</td><td>52.3%</td><td>+8.7%</td></tr>
-                <tr><td>Vitória Casa</td><td>487</td><td>513</td><td>48.7%</td><td>+7.3%</td></tr>
-                <tr><td>Vitória Fora</td><td>451</td><td>549</td><td>45.1%</td><td>+6.2%</td></tr>
-                <tr><td>1X (Casa/Empate)</td><td>753</td><td>247</td><td>75.3%</td><td>+9.8%</td></tr>
-                <tr><td>X2 (Fora/Empate)</td><td>721</td><td>279</td><td>72.1%</td><td>+11.4%</td></tr>
-                <tr><td>Sequências 5/5</td><td>84</td><td>16</td><td>84.0%</td><td>+15.2%</td></tr>
-            </tbody>
-        </table>
-        </div>
-        """, unsafe_allow_html=True)
+        if resumo_backtest.empty:
+            st.info("ℹ️ Sem dados da temporada para o backtest.")
+        else:
+            st.markdown(f"""
+            ### 🎯 O que esperar do sistema (backtest da temporada):
+
+            - **Taxa de acerto geral:** {taxa_geral:.1f}% ({apostas_modelo} apostas com confiança ≥ {CONFIANCA_MEDIA})
+            - **ROI das apostas de valor:** {formatar_percentual(roi_valor)} ({apostas_valor} apostas com edge ≥ {EDGE_MINIMO:.0%})
+            - **Jogos reavaliados:** {jogos_previstos} de {len(backtest)}, cada um previsto só com os jogos anteriores
+            - **Modelo de gols avaliado:** {fontes_backtest}, a mesma fonte que o Simulador usa em cada liga
+            - **Jogos por dia de rodada:** {jogos_por_dia:.1f}
+            - **Confiança mínima recomendada:** ≥ {CONFIANCA_MEDIA}
+
+            ### 📈 Resultados do Backtest Walk-Forward ({jogos_previstos} jogos):
+            """)
+
+            linhas_backtest = "".join(
+                f"<tr><td>{linha['Mercado']}</td><td>{linha['Apostas']}</td><td>{linha['Acertos']}</td>"
+                f"<td>{linha['Erros']}</td><td>{formatar_percentual(linha['Taxa Acerto'])}</td>"
+                f"<td>{formatar_percentual(linha['Prob. Média'])}</td><td>{formatar_percentual(linha['ROI'])}</td></tr>"
+                for linha in resumo_backtest.to_dict('records'))
+            st.markdown(f"""
+            <div class="dataframe-container">
+            <table class="dataframe-table">
+                <thead>
+                    <tr>
+                        <th>Mercado</th>
+                        <th>Apostas</th>
+                        <th>Acertos</th>
+                        <th>Erros</th>
+                        <th>Taxa Acerto</th>
+                        <th>Prob. Média</th>
+                        <th>ROI</th>
+                    </tr>
+                </thead>
+                <tbody>{linhas_backtest}</tbody>
+            </table>
+            </div>
+            """, unsafe_allow_html=True)
+
+        if not resumo_valor.empty:
+            st.markdown(f"### 💰 Apostas de Valor (edge ≥ {EDGE_MINIMO:.0%}, Kelly {FRACAO_KELLY:g}):")
+            linhas_valor = "".join(
+                f"<tr><td>{linha['Mercado']}</td><td>{linha['Apostas']}</td><td>{linha['Acertos']}</td>"
+                f"<td>{formatar_decimal(linha['Odd Média'])}</td>"
+                f"<td>{formatar_percentual(linha['Edge Médio'])}</td><td>{formatar_percentual(linha['ROI'])}</td>"
+                f"<td>{formatar_percentual(linha['Lucro Kelly'])}</td></tr>"
+                for linha in resumo_valor.to_dict('records'))
+            st.markdown(f"""
+            <div class="dataframe-container">
+            <table class="dataframe-table">
+                <thead>
+                    <tr>
+                        <th>Mercado</th>
+                        <th>Apostas</th>
+                        <th>Acertos</th>
+                        <th>Odd Média</th>
+                        <th>Edge Médio</th>
+                        <th>ROI</th>
+                        <th>Lucro Kelly (% banca)</th>
+                    </tr>
+                </thead>
+                <tbody>{linhas_valor}</tbody>
+            </table>
+            </div>
+            """, unsafe_allow_html=True)
+
+            with st.expander("🎚️ ROI por confiança mínima"):
+                st.dataframe(curva_roi_confianca(backtest).round(2), hide_index=True, use_container_width=True)
 
         st.markdown("""
         ### 🎯 Como usar o sistema para máximo lucro:
@@ -1563,13 +899,14 @@ with tabs[3]:
         4. **Foque nos mercados mais lucrativos** - BTTS, Over 1.5, Duplas Chance
         5. **Gerencie seu bankroll** - 1-2% por aposta, 3-5% para sequências 5/5
 
-        ### 📊 Melhores Mercados:
+        """)
 
-        1. **🎯 BTTS FT** - Maior ROI consistente (13.5%)
-        2. **⚽ Over 1.5 FT** - Alta taxa de acerto (78.2%)
-        3. **🔄 Duplas Chance** - Boa relação risco/retorno (9-11%)
-        4. **🔥 Sequências 5/5** - Máxima acurácia (84.0%)
+        if not resumo_backtest.empty and not melhores_mercados.empty:
+            st.markdown("### 📊 Melhores Mercados:\n\n" + "\n".join(
+                f"{posicao}. **{linha['Mercado']}** - {linha['Taxa Acerto']:.1f}% de acerto em {linha['Apostas']} apostas"
+                for posicao, linha in enumerate(melhores_mercados.to_dict('records'), start=1)))
 
+        st.markdown("""
         ### ⚡ Melhorias da Versão MAX:
 
         - **+15% mais dados** por jogo (10 jogos anteriores)
@@ -1605,15 +942,20 @@ with tabs[3]:
             <p>📧 Email: vagner@futalgorithm.com</p>
         </div>
 
-        <div style='background-color: #1E1E1E; padding: 20px; border-radius: 10px; border: 1px solid #333; margin-bottom: 20px;'>
-            <h3 style='color: #64B5F6;'>📈 Estatísticas Chave</h3>
-            <p>✅ <strong>9.5/10</strong> - Avaliação do Sistema</p>
-            <p>✅ <strong>74.2%</strong> - Taxa de Acerto Média</p>
-            <p>✅ <strong>+12.3%</strong> - ROI Esperado</p>
-            <p>✅ <strong>3,000+</strong> - Jogos Analisados/Dia</p>
-            <p>✅ <strong>84.0%</strong> - Acerto Sequências 5/5</p>
-        </div>
+        """, unsafe_allow_html=True)
+
+        if not resumo_backtest.empty:
+            st.markdown(f"""
+            <div style='background-color: #1E1E1E; padding: 20px; border-radius: 10px; border: 1px solid #333; margin-bottom: 20px;'>
+                <h3 style='color: #64B5F6;'>📈 Estatísticas Chave</h3>
+                <p>✅ <strong>{taxa_geral:.1f}%</strong> - Taxa de Acerto Média</p>
+                <p>✅ <strong>{jogos_previstos}</strong> - Jogos no Backtest</p>
+                <p>✅ <strong>{jogos_por_dia:.1f}</strong> - Jogos por Dia de Rodada</p>
+                <p>✅ <strong>{formatar_percentual(sequencias_backtest['Taxa Acerto'])}</strong> - Acerto Sequências 5/5</p>
+            </div>
+            """, unsafe_allow_html=True)
 
+        st.markdown("""
         <div style='background-color: #1E1E1E; padding: 20px; border-radius: 10px; border: 1px solid #333; margin-bottom: 20px;'>
             <h3 style='color: #64B5F6;'>🎓 Como a Confiança Funciona</h3>
             <p>🟢 <strong>0.8-1.0</strong> - Alta Confiança</p>
@@ -1629,4 +971,63 @@ with tabs[3]:
             <p>💰 <strong>Gerencie bankroll (1-2% por aposta)</strong></p>
             <p>📈 <strong>Foque no longo prazo</strong></p>
         </div>
-        """, unsafe_allow_html=True)
\ No newline at end of file
+        """, unsafe_allow_html=True)
+
+# Aba 7 (oculta): cascata das etapas desta execução, desenhada por último para incluir todas as abas
+if mostrar_diagnostico:
+    with tabs[6]:
+        st.header("🩺 Diagnóstico da Execução")
+        rastro = rastro_atual()
+        etapas = pd.DataFrame(rastro['etapas'] if rastro else [], columns=['etapa', 'inicio', 'segundos', 'nivel'])
+
+        if not etapas.empty:
+            etapas = etapas.sort_values('inicio', kind='stable').reset_index(drop=True)
+            st.caption(f"{len(etapas)} etapas medidas nesta execução · "
+                       f"{(etapas['inicio'] + etapas['segundos']).max():.3f}s até a última")
+
+            # Cascata: cada barra começa no instante da etapa, recuada pelo nível de aninhamento
+            fig, ax = plt.subplots(figsize=(10, max(2.5, 0.32 * len(etapas))), facecolor='#0E1117')
+            ax.set_facecolor('#0E1117')
+            ax.barh(etapas.index, etapas['segundos'], left=etapas['inicio'],
+                    color=np.where(etapas['nivel'] == 0, '#1E88E5', '#64B5F6'))
+            ax.set_yticks(etapas.index, ['  ' * nivel + etapa for etapa, nivel in zip(etapas['etapa'], etapas['nivel'])],
+                          color='white', fontsize=8)
+            ax.invert_yaxis()
+            ax.tick_params(axis='x', colors='white')
+            ax.set_xlabel('segundos desde o início da execução', color='white')
+            for borda in ax.spines.values():
+                borda.set_color('#333')
+            st.pyplot(fig)
+            plt.close(fig)
+
+            st.dataframe(pd.DataFrame({
+                'Etapa': ['  ' * nivel + etapa for etapa, nivel in zip(etapas['etapa'], etapas['nivel'])],
+                'Início (ms)': (etapas['inicio'] * 1000).round(1),
+                'Duração (ms)': (etapas['segundos'] * 1000).round(1),
+            }), use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhuma etapa medida nesta execução.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Contadores desta execução")
+            st.dataframe(pd.DataFrame(sorted((rastro or {}).get('contadores', {}).items()),
+                                      columns=['Contador', 'Valor']), use_container_width=True, hide_index=True)
+        with col2:
+            st.subheader("Últimas execuções")
+            st.dataframe(pd.DataFrame([{'Início': execucao['iniciado_em'], 'Segundos': execucao['segundos'],
+                                        'Etapas': len(execucao['etapas'])} for execucao in reversed(EXECUCOES)],
+                                      columns=['Início', 'Segundos', 'Etapas']),
+                         use_container_width=True, hide_index=True)
+
+        if TEMPOS_POR_LIGA:
+            with st.expander("⏱️ Tempo por liga na última execução de cada etapa"):
+                st.dataframe(pd.DataFrame([
+                    {'Etapa': etapa, 'Liga': mapeamento_ligas.get(liga, liga), 'Segundos': round(tempo['segundos'], 3),
+                     'Worker': tempo['worker']}
+                    for etapa, por_liga in TEMPOS_POR_LIGA.items() for liga, tempo in por_liga.items()
+                ]), use_container_width=True, hide_index=True)
+        with st.expander(f"📟 Métricas do processo (Prometheus) · {len(CONTADORES)} contadores"):
+            st.code(texto_prometheus(), language='text')
+
+finalizar_execucao()
@@ -0,0 +1 @@
+"""FutAlgorithm: previsões, dicas e rankings das ligas europeias (football-data.co.uk)."""
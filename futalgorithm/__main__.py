@@ -0,0 +1,3 @@
+from futalgorithm.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,308 @@
+"""API HTTP somente leitura sobre os resultados do lote (python -m futalgorithm predict).
+
+    python -m futalgorithm serve --precalculado saida/ --porta 8000
+
+    GET /predictions?league=&date=&min_confidence=
+    GET /tips?league=&type=
+    GET /rankings?league=&market=&window=
+    GET /metrics  (texto do Prometheus; com FUTALGORITHM_INSTRUMENTACAO=1)
+
+Nenhum modelo é recalculado por requisição: as tabelas do lote ficam em memória, indexadas por liga (e o
+cubo de rankings por mercado x janela), e cada consulta é serializada e comprimida uma única vez por versão
+dos dados. As respostas levam ETag e Cache-Control; If-None-Match responde 304 sem corpo.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.routing import Route
+
+from futalgorithm import motor
+from futalgorithm.instrumentacao import contar, medir, texto_prometheus
+
+# Segundos entre verificações do manifesto (um lote novo é carregado sem reiniciar o serviço)
+INTERVALO_RECARGA_API = float(os.environ.get('FUTALGORITHM_API_RECARGA', 5))
+MAX_AGE_API = int(os.environ.get('FUTALGORITHM_API_MAX_AGE', 60))
+# Respostas prontas (corpo, gzip e ETag) mantidas por versão dos dados
+MAXIMO_RESPOSTAS_API = 4096
+NIVEL_GZIP = 6
+JANELA_PADRAO_API = 10
+
+
+class ConsultaInvalida(ValueError):
+    pass
+
+
+def indexar_por_liga(df):
+    """{liga em minúsculas: posições das linhas}, para que o filtro de liga não percorra a tabela"""
+    if df.empty or 'Liga' not in df.columns:
+        return {}
+    return {str(liga).casefold(): np.asarray(posicoes)
+            for liga, posicoes in df.groupby('Liga', observed=True, sort=False).indices.items()}
+
+
+def carregar_dados_api(diretorio):
+    """Tabelas do lote e seus índices, na versão descrita pelo manifesto da pasta"""
+    manifesto = motor.ler_manifesto(diretorio)
+    if not manifesto:
+        raise FileNotFoundError(f"{diretorio} não tem {motor.ARQUIVO_MANIFESTO}; rode `python -m futalgorithm predict`")
+    precalculado = motor.carregar_precalculado(diretorio, manifesto['versao_dados'])
+    if precalculado is None:
+        raise FileNotFoundError(f"{diretorio} não tem as tabelas em Parquet")
+
+    previsoes, dicas = precalculado['previsoes'], precalculado['dicas']
+    return {
+        'manifesto': manifesto,
+        'previsoes': previsoes,
+        'dicas': dicas,
+        'cubo': precalculado['cubo'],
+        'indices': {'previsoes': indexar_por_liga(previsoes), 'dicas': indexar_por_liga(dicas)},
+        'tipos_dica': dicas['Tipo'].astype(str).str.casefold().to_numpy(dtype=str),
+    }
+
+
+def criar_estado(diretorio):
+    estado = {'diretorio': diretorio, 'marca': None, 'verificado_em': 0.0, 'dados': None, 'erro': None,
+              'respostas': OrderedDict(), 'trava': threading.Lock()}
+    atualizar_estado(estado, forcar=True)
+    if estado['dados'] is None:
+        raise FileNotFoundError(estado['erro'])
+    return estado
+
+
+def atualizar_estado(estado, forcar=False):
+    """Recarrega as tabelas quando o lote regravou o manifesto (no máximo a cada INTERVALO_RECARGA_API)"""
+    agora = time.monotonic()
+    if not forcar and agora - estado['verificado_em'] < INTERVALO_RECARGA_API:
+        return
+    estado['verificado_em'] = agora
+    try:
+        marca = os.stat(os.path.join(estado['diretorio'], motor.ARQUIVO_MANIFESTO)).st_mtime_ns
+    except OSError:
+        marca = None
+    if marca == estado['marca'] and estado['dados'] is not None:
+        return
+
+    try:
+        dados = carregar_dados_api(estado['diretorio'])
+    except (OSError, ValueError) as e:
+        # Lote sendo regravado ou removido: segue servindo a última versão carregada
+        estado['erro'] = str(e)
+        return
+    with estado['trava']:
+        estado['dados'], estado['marca'], estado['erro'] = dados, marca, None
+        estado['respostas'].clear()
+
+
+async def atualizar_sem_bloquear(estado):
+    """atualizar_estado fora do laço de eventos: a recarga lê os Parquet do disco.
+
+    A marca de verificação é gravada aqui, no laço, para que só uma requisição por intervalo dispare a recarga.
+    """
+    agora = time.monotonic()
+    if agora - estado['verificado_em'] < INTERVALO_RECARGA_API:
+        return
+    estado['verificado_em'] = agora
+    await run_in_threadpool(atualizar_estado, estado, True)
+
+
+def ligas_consultadas(valor, por_codigo=False):
+    """Chaves (em minúsculas) de uma liga pedida, já normalizada, pelo código ('e1') ou pelo nome ('championship').
+
+    As previsões e dicas guardam o nome; o cubo de rankings, o código.
+    """
+    codigos = {codigo for codigo, nome in motor.mapeamento_ligas.items()
+               if valor in (codigo.casefold(), nome.casefold())}
+    if por_codigo:
+        return {codigo.casefold() for codigo in codigos} or {valor}
+    return {motor.mapeamento_ligas[codigo].casefold() for codigo in codigos} or {valor}
+
+
+def linhas_da_liga(indice, valor):
+    posicoes = [indice[liga] for liga in ligas_consultadas(valor) if liga in indice]
+    return np.sort(np.concatenate(posicoes)) if posicoes else np.array([], dtype=np.int64)
+
+
+def consultar_previsoes(dados, parametros):
+    df = dados['previsoes']
+    if 'league' in parametros:
+        df = df.iloc[linhas_da_liga(dados['indices']['previsoes'], parametros['league'])]
+    if 'date' in parametros:
+        df = df[(df['Data'] == parametros['date']).to_numpy()]
+    if 'min_confidence' in parametros:
+        df = df[df['Valor Confiança'].to_numpy(dtype=np.float64) >= parametros['min_confidence'] - 1e-9]
+    return df
+
+
+def consultar_dicas(dados, parametros):
+    df = dados['dicas']
+    posicoes = np.arange(len(df))
+    if 'league' in parametros:
+        posicoes = linhas_da_liga(dados['indices']['dicas'], parametros['league'])
+    if 'type' in parametros:
+        posicoes = posicoes[np.char.startswith(dados['tipos_dica'][posicoes], parametros['type'])]
+    return df.iloc[posicoes]
+
+
+def consultar_rankings(dados, parametros):
+    mercados = {nome.casefold(): nome for nome in motor.MERCADOS_RANKING}
+    mercado = parametros.get('market', next(iter(motor.MERCADOS_RANKING)).casefold())
+    if mercado not in mercados:
+        raise ConsultaInvalida(f"market deve ser um de: {', '.join(motor.MERCADOS_RANKING)}")
+    mercado = mercados[mercado]
+    janela = parametros.get('window', JANELA_PADRAO_API)
+    if janela not in motor.JANELAS_RANKING:
+        raise ConsultaInvalida(f"window deve estar entre {motor.JANELAS_RANKING.start} e "
+                               f"{motor.JANELAS_RANKING.stop - 1}")
+
+    cubo = dados['cubo']
+    ligas = list(cubo)
+    if 'league' in parametros:
+        pedidas = ligas_consultadas(parametros['league'], por_codigo=True)
+        ligas = [liga for liga in ligas if liga.casefold() in pedidas]
+
+    # Recorte do cubo ordenado, o mesmo da aba Top Rankings
+    linhas = []
+    for liga in ligas:
+        for linha in motor.fatiar_ranking(cubo[liga], motor.mapeamento_ligas.get(liga, liga), mercado, janela):
+            linhas.append(dict(linha, Codigo=liga, Mercado=mercado, Janela=janela))
+    return pd.DataFrame(linhas)
+
+
+def ler_data(valor):
+    try:
+        return pd.Timestamp(valor).normalize()
+    except ValueError:
+        raise ConsultaInvalida("date deve estar no formato AAAA-MM-DD")
+
+
+def ler_numero(nome, tipo):
+    def ler(valor):
+        try:
+            return tipo(valor)
+        except ValueError:
+            raise ConsultaInvalida(f"{nome} deve ser {'inteiro' if tipo is int else 'numérico'}")
+    return ler
+
+
+def ler_texto(valor):
+    return valor.strip().casefold()
+
+
+# Como cada parâmetro aceito é lido: consultas equivalentes ('E0' e ' e0 ', '0.7' e '0.70') caem na mesma chave
+LEITORES_PARAMETROS = {
+    'league': ler_texto,
+    'type': ler_texto,
+    'market': ler_texto,
+    'date': ler_data,
+    'min_confidence': ler_numero('min_confidence', float),
+    'window': ler_numero('window', int),
+}
+
+
+def normalizar_parametros(parametros, aceitos):
+    """Parâmetros aceitos e preenchidos, já convertidos (ConsultaInvalida se algum não puder ser lido)"""
+    return {nome: LEITORES_PARAMETROS[nome](parametros[nome])
+            for nome in aceitos if parametros.get(nome, '').strip()}
+
+
+CONSULTAS = {
+    'predictions': (consultar_previsoes, ('league', 'date', 'min_confidence')),
+    'tips': (consultar_dicas, ('league', 'type')),
+    'rankings': (consultar_rankings, ('league', 'market', 'window')),
+}
+
+
+def montar_resposta(manifesto, df):
+    """Corpo JSON, versão gzip e ETag de uma resposta, calculados uma vez"""
+    registros = df.to_json(orient='records', date_format='iso', force_ascii=False) if len(df) else '[]'
+    corpo = ('{"versao_dados":%s,"gerado_em":%s,"total":%d,"dados":%s}' % (
+        json.dumps(manifesto.get('versao_dados')), json.dumps(manifesto.get('gerado_em')), len(df), registros
+    )).encode('utf-8')
+    return {
+        'corpo': corpo,
+        'gzip': gzip.compress(corpo, NIVEL_GZIP),
+        'etag': '"%s"' % hashlib.sha1(corpo).hexdigest()[:20],
+    }
+
+
+def obter_resposta(estado, endpoint, parametros):
+    """Resposta pronta da consulta normalizada, montada só na primeira vez em cada versão dos dados"""
+    consultar, aceitos = CONSULTAS[endpoint]
+    parametros = normalizar_parametros(parametros, aceitos)
+    chave = (endpoint, tuple(sorted(parametros.items())))
+
+    respostas = estado['respostas']
+    with estado['trava']:
+        resposta = respostas.get(chave)
+        if resposta is not None:
+            respostas.move_to_end(chave)
+    contar('cache_acertos' if resposta is not None else 'cache_faltas', camada='api', tipo=endpoint)
+    if resposta is not None:
+        return resposta
+
+    dados = estado['dados']
+    with medir(f'api_{endpoint}'):
+        resposta = montar_resposta(dados['manifesto'], consultar(dados, parametros))
+    with estado['trava']:
+        if estado['dados'] is dados:
+            respostas[chave] = resposta
+            while len(respostas) > MAXIMO_RESPOSTAS_API:
+                respostas.popitem(last=False)
+    return resposta
+
+
+def responder(request, resposta):
+    cabecalhos = {'ETag': resposta['etag'], 'Cache-Control': f'public, max-age={MAX_AGE_API}',
+                  'Vary': 'Accept-Encoding'}
+    if resposta['etag'] in request.headers.get('if-none-match', ''):
+        return Response(status_code=304, headers=cabecalhos)
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        cabecalhos['Content-Encoding'] = 'gzip'
+        return Response(resposta['gzip'], headers=cabecalhos, media_type='application/json')
+    return Response(resposta['corpo'], headers=cabecalhos, media_type='application/json')
+
+
+def erro(status, mensagem):
+    return Response(json.dumps({'erro': mensagem}, ensure_ascii=False), status_code=status,
+                    media_type='application/json')
+
+
+def criar_app(diretorio):
+    """Aplicação ASGI sobre a pasta de saída do lote"""
+    estado = criar_estado(diretorio)
+
+    def rota(endpoint):
+        async def tratar(request):
+            contar('requisicoes_api', endpoint=endpoint)
+            await atualizar_sem_bloquear(estado)
+            try:
+                resposta = obter_resposta(estado, endpoint, request.query_params)
+            except ConsultaInvalida as e:
+                return erro(400, str(e))
+            return responder(request, resposta)
+        return Route(f'/{endpoint}', tratar, methods=['GET'])
+
+    async def saude(request):
+        await atualizar_sem_bloquear(estado)
+        manifesto = estado['dados']['manifesto']
+        return Response(json.dumps({'versao_dados': manifesto.get('versao_dados'),
+                                    'gerado_em': manifesto.get('gerado_em'),
+                                    'linhas': manifesto.get('linhas'),
+                                    'erro_recarga': estado['erro']}, ensure_ascii=False),
+                        media_type='application/json')
+
+    async def metricas(request):
+        return Response(texto_prometheus(), media_type='text/plain; version=0.0.4')
+
+    return Starlette(routes=[rota(endpoint) for endpoint in CONSULTAS] +
+                     [Route('/health', saude), Route('/metrics', metricas)])
@@ -0,0 +1,235 @@
+"""Benchmark reprodutível das etapas quentes sobre temporadas sintéticas (futalgorithm.sintetico).
+
+    python -m futalgorithm bench [--escalas 1,10,100] [--repeticoes 1] [--historico arquivo.json]
+
+Cada escala multiplica o número de ligas do perfil 1x (o tamanho da planilha atual); ligas, times e
+próximos jogos crescem juntos. Os resultados são acrescentados a um histórico JSON com a versão do código,
+e cada execução é comparada com a última do histórico no mesmo perfil, para que regressões apareçam.
+"""
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from futalgorithm import motor
+from futalgorithm.sintetico import PERFIL_PADRAO, gerar_temporada
+
+ESCALAS_PADRAO = (1, 10, 100)
+ARQUIVO_HISTORICO = os.environ.get('FUTALGORITHM_BENCHMARKS', os.path.join(motor.DIRETORIO_DADOS, 'benchmarks.json'))
+# Acima disso a planilha sintética não é gravada em .xlsx (a escrita do openpyxl dominaria o benchmark)
+MAXIMO_LINHAS_EXCEL = 100000
+# Variação de tempo a partir da qual a comparação com a execução anterior marca regressão (com uma repetição,
+# o ruído de máquina na escala 1x já passa de 10%)
+LIMIAR_REGRESSAO = 0.20
+ETAPAS_BENCHMARK = ['ingestao_excel', 'ingestao_store', 'indice', 'ultimos_jogos', 'estatisticas_avancadas',
+                    'probabilidades_completas', 'totais_monte_carlo', 'ranking_liga', 'tabela_html']
+
+
+def _cronometrar(funcao, repeticoes):
+    """Menor tempo entre as repetições, e o resultado da última"""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        segundos = time.perf_counter() - inicio
+        melhor = segundos if melhor is None else min(melhor, segundos)
+    return melhor, resultado
+
+
+def planilha_xlsx(abas):
+    """Bytes de um workbook com uma aba por liga, como o all-euro-data"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as escritor:
+        for liga, df_liga in abas.items():
+            df_liga.to_excel(escritor, sheet_name=liga, index=False)
+    return buffer.getvalue()
+
+
+def medir_escala(abas, df_proximos_jogos, repeticoes=1, maximo_linhas_excel=MAXIMO_LINHAS_EXCEL):
+    """Tempo de cada etapa sobre uma carga de dados: {etapa: {'segundos', 'chamadas'}}"""
+    etapas = {}
+
+    def registrar(etapa, funcao, chamadas):
+        segundos, resultado = _cronometrar(funcao, repeticoes)
+        etapas[etapa] = {'segundos': round(segundos, 6), 'chamadas': chamadas}
+        return resultado
+
+    linhas = sum(len(df_liga) for df_liga in abas.values())
+    if linhas <= maximo_linhas_excel:
+        conteudo = planilha_xlsx(abas)
+        todas_abas = registrar('ingestao_excel', lambda: motor.ler_planilha(conteudo), 1)
+    else:
+        todas_abas = {liga: motor.otimizar_tipos(df_liga) for liga, df_liga in abas.items()}
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        motor.salvar_store_local(todas_abas, {}, set(todas_abas), diretorio)
+        registrar('ingestao_store', lambda: motor.carregar_store_local(diretorio), 1)
+
+    indices = registrar('indice', lambda: {liga: motor.construir_indice_liga(df_liga)
+                                           for liga, df_liga in todas_abas.items()}, len(todas_abas))
+
+    consultas = [(liga, time, cenario)
+                 for liga, df_liga in todas_abas.items()
+                 for time in motor.obter_todos_times_liga(df_liga)
+                 for cenario in ('mandante', 'visitante')]
+    jogos = registrar('ultimos_jogos', lambda: [
+        motor.obter_ultimos_jogos_por_cenario(todas_abas[liga], time, cenario, 10, indices[liga])
+        for liga, time, cenario in consultas
+    ], len(consultas))
+    registrar('estatisticas_avancadas', lambda: [
+        motor.calcular_estatisticas_avancadas(jogos_time, time, cenario, liga)
+        for jogos_time, (liga, time, cenario) in zip(jogos, consultas)
+    ], len(consultas))
+
+    confrontos = [(liga, mandante, visitante) for liga, mandante, visitante
+                  in df_proximos_jogos[['Div', 'HomeTeam', 'AwayTeam']].itertuples(index=False) if liga in todas_abas]
+    resultados = registrar('probabilidades_completas', lambda: [
+        motor.calcular_probabilidades_completas(todas_abas[liga], mandante, visitante, liga,
+                                                indice_liga=indices[liga])
+        for liga, mandante, visitante in confrontos
+    ], len(confrontos))
+
+    # Totais simulados uma vez por liga, para todos os seus jogos (como no quadro de previsões)
+    previstos_por_liga = {}
+    for (liga, _, _), (prob, _) in zip(confrontos, resultados):
+        if prob is not None:
+            previstos_por_liga.setdefault(liga, []).append(prob)
+    totais = registrar('totais_monte_carlo', lambda: {
+        liga: motor.probabilidades_totais({estatistica: (np.array([prob[f'{estatistica}_casa_esp'] for prob in probs]),
+                                                         np.array([prob[f'{estatistica}_fora_esp'] for prob in probs]))
+                                           for estatistica in motor.LINHAS_TOTAIS}, liga, indices[liga])
+        for liga, probs in previstos_por_liga.items()
+    }, len(previstos_por_liga))
+    for liga, probs in previstos_por_liga.items():
+        for k, prob in enumerate(probs):
+            prob.update({chave: valores[k] for chave, valores in totais[liga].items()})
+
+    mercado = next(iter(motor.MERCADOS_RANKING))
+    registrar('ranking_liga', lambda: [
+        motor.gerar_ranking_liga(df_liga, motor.mapeamento_ligas.get(liga, liga), mercado, 10, indices[liga])
+        for liga, df_liga in todas_abas.items()
+    ], len(todas_abas))
+
+    # Tabela do Simulador inteira, página a página, com todas as colunas do quadro de previsões
+    previsoes = {confronto: prob for confronto, (prob, _) in zip(confrontos, resultados)}
+    df_resultados = motor.processar_todos_jogos_completos(todas_abas, df_proximos_jogos, indices, previsoes)
+    tamanho_pagina = motor.TAMANHOS_PAGINA[1]
+    inicios = range(0, len(df_resultados), tamanho_pagina)
+    registrar('tabela_html', lambda: [
+        motor.renderizar_tabela_html(df_resultados, list(df_resultados.columns), inicio, inicio + tamanho_pagina)
+        for inicio in inicios
+    ], len(inicios))
+
+    for medida in etapas.values():
+        chamadas = medida['chamadas']
+        medida['us_por_chamada'] = round(medida['segundos'] / chamadas * 1e6, 1) if chamadas else None
+    return etapas
+
+
+def _commit_git():
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return saida.stdout.strip() or None
+
+
+def executar_benchmark(escalas=ESCALAS_PADRAO, perfil=None, semente=2024, repeticoes=1,
+                       maximo_linhas_excel=MAXIMO_LINHAS_EXCEL, relatar=print):
+    """Mede todas as etapas em cada escala. Retorna o registro do histórico desta execução"""
+    perfil = dict(PERFIL_PADRAO, **(perfil or {}))
+    registro = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'versao_codigo': motor.VERSAO_CODIGO,
+        'commit': _commit_git(),
+        'ambiente': {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                     'plataforma': platform.platform(), 'cpus': os.cpu_count(),
+                     'modo_execucao': motor.MODO_EXECUCAO, 'simulacoes': motor.SIMULACOES_MONTE_CARLO},
+        'perfil': perfil,
+        'semente': semente,
+        'repeticoes': repeticoes,
+        'escalas': {},
+    }
+    for escala in escalas:
+        abas, df_proximos_jogos = gerar_temporada(perfil['ligas'] * escala, perfil['times'], perfil['rodadas'], semente)
+        etapas = medir_escala(abas, df_proximos_jogos, repeticoes, maximo_linhas_excel)
+        registro['escalas'][str(escala)] = {
+            'ligas': len(abas),
+            'linhas': int(sum(len(df_liga) for df_liga in abas.values())),
+            'proximos_jogos': len(df_proximos_jogos),
+            'etapas': etapas,
+        }
+        relatar(f"{escala}x: {len(abas)} ligas, {registro['escalas'][str(escala)]['linhas']} jogos, "
+                f"{len(df_proximos_jogos)} próximos jogos")
+        for etapa in ETAPAS_BENCHMARK:
+            if etapa in etapas:
+                medida = etapas[etapa]
+                por_chamada = f"{medida['us_por_chamada']:>12.1f} µs/chamada" if medida['us_por_chamada'] else ''
+                relatar(f"  {etapa:<26}{medida['segundos']:>10.3f}s {medida['chamadas']:>8} chamadas {por_chamada}")
+    return registro
+
+
+def ler_historico(caminho=ARQUIVO_HISTORICO):
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return []
+
+
+def salvar_no_historico(registro, caminho=ARQUIVO_HISTORICO):
+    """Acrescenta o registro ao histórico (gravação atômica). Retorna o histórico anterior"""
+    historico = ler_historico(caminho)
+
+    def escrever(temporario):
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(historico + [registro], arquivo, ensure_ascii=False, indent=2)
+
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    motor._escrever_atomico(caminho, escrever)
+    return historico
+
+
+def comparar_com_anterior(registro, historico):
+    """Variação de cada etapa contra a última execução do histórico com o mesmo perfil e semente.
+
+    Retorna (registro anterior ou None, [(escala, etapa, segundos antes, segundos agora, variação)]).
+    """
+    anteriores = [antigo for antigo in historico
+                  if antigo.get('perfil') == registro['perfil'] and antigo.get('semente') == registro['semente']]
+    if not anteriores:
+        return None, []
+    anterior = anteriores[-1]
+
+    variacoes = []
+    for escala, medida in registro['escalas'].items():
+        etapas_antes = anterior['escalas'].get(escala, {}).get('etapas', {})
+        for etapa, atual in medida['etapas'].items():
+            antes = etapas_antes.get(etapa, {}).get('segundos')
+            if antes:
+                variacoes.append((escala, etapa, antes, atual['segundos'], atual['segundos'] / antes - 1))
+    return anterior, variacoes
+
+
+def relatar_comparacao(anterior, variacoes, limiar=LIMIAR_REGRESSAO, relatar=print):
+    if anterior is None:
+        relatar("Primeira execução deste perfil no histórico.")
+        return 0
+    relatar(f"Comparação com {anterior['executado_em']} (código {anterior['versao_codigo']}, "
+            f"commit {anterior.get('commit') or '?'}):")
+    regressoes = 0
+    for escala, etapa, antes, agora, variacao in variacoes:
+        marca = ''
+        if variacao > limiar:
+            marca = '  <- regressão'
+            regressoes += 1
+        relatar(f"  {escala}x {etapa:<26}{antes:>10.3f}s -> {agora:>10.3f}s {variacao:>+8.1%}{marca}")
+    return regressoes
@@ -0,0 +1,175 @@
+"""Linha de comando do FutAlgorithm.
+
+    python -m futalgorithm predict --saida saida/ [--dados URL|pasta|planilha.xlsx] [--jogos URL|arquivo]
+    python -m futalgorithm serve --precalculado saida/ [--host 127.0.0.1] [--porta 8000]
+    python -m futalgorithm bench [--escalas 1,10,100] [--repeticoes 1] [--historico arquivo.json]
+
+`predict` calcula previsões, dicas e rankings sem subir o Streamlit e grava Parquet/CSV/JSON com um manifesto
+(versão dos dados, tempos por etapa e vazão). A interface lê essa pasta com FUTALGORITHM_PRECALCULADO.
+`serve` publica essa mesma pasta como API JSON somente leitura (futalgorithm.api).
+`bench` mede as etapas quentes sobre temporadas sintéticas e guarda o resultado num histórico JSON.
+"""
+import argparse
+import os
+import time
+import warnings
+from datetime import datetime
+
+
+def _formatos(valor):
+    from futalgorithm.motor import FORMATOS_LOTE
+
+    formatos = [formato.strip().lower() for formato in valor.split(',') if formato.strip()]
+    invalidos = [formato for formato in formatos if formato not in FORMATOS_LOTE]
+    if invalidos or not formatos:
+        raise argparse.ArgumentTypeError(f"formatos válidos: {', '.join(FORMATOS_LOTE)}")
+    return formatos
+
+
+def _inteiros(valor):
+    try:
+        inteiros = [int(parte) for parte in valor.split(',') if parte.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError("use inteiros separados por vírgula, ex.: 1,10,100")
+    if not inteiros or min(inteiros) < 1:
+        raise argparse.ArgumentTypeError("use inteiros positivos, ex.: 1,10,100")
+    return inteiros
+
+
+def criar_parser():
+    from futalgorithm.motor import url_excel, url_proximos_jogos
+
+    parser = argparse.ArgumentParser(prog='python -m futalgorithm', description=__doc__.splitlines()[0])
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    predict = comandos.add_parser('predict', help='Calcula previsões, dicas e rankings e grava os resultados')
+    predict.add_argument('--dados', default=url_excel,
+                         help='URL da planilha (atualiza o store local), pasta do store ou planilha .xlsx')
+    predict.add_argument('--jogos', default=url_proximos_jogos,
+                         help='URL ou arquivo (.xlsx, .csv, .parquet) dos próximos jogos')
+    predict.add_argument('--saida', default=os.environ.get('FUTALGORITHM_PRECALCULADO', 'precalculado'),
+                         help='Pasta de saída (padrão: FUTALGORITHM_PRECALCULADO ou ./precalculado)')
+    predict.add_argument('--formatos', type=_formatos, default='parquet,csv,json',
+                         help='Formatos separados por vírgula: parquet, csv, json')
+    predict.add_argument('--sem-cache-disco', action='store_true',
+                         help='Ignora os artefatos em disco (mede o cálculo completo)')
+
+    serve = comandos.add_parser('serve', help='API HTTP somente leitura sobre a saída do predict')
+    serve.add_argument('--precalculado', default=os.environ.get('FUTALGORITHM_PRECALCULADO', 'precalculado'),
+                       help='Pasta gerada pelo predict (padrão: FUTALGORITHM_PRECALCULADO ou ./precalculado)')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--porta', type=int, default=8000)
+
+    bench = comandos.add_parser('bench', help='Benchmark das etapas sobre dados sintéticos (sem rede)')
+    bench.add_argument('--escalas', type=_inteiros, default='1,10,100',
+                       help='Múltiplos do tamanho atual dos dados, separados por vírgula')
+    bench.add_argument('--ligas', type=int, help='Ligas na escala 1x (padrão: as 22 da planilha atual)')
+    bench.add_argument('--times', type=int, help='Times por liga (par)')
+    bench.add_argument('--rodadas', type=int, help='Rodadas disputadas por liga')
+    bench.add_argument('--semente', type=int, default=2024)
+    bench.add_argument('--repeticoes', type=int, default=1, help='Repetições por etapa (vale o menor tempo)')
+    bench.add_argument('--historico', help='Arquivo JSON do histórico (padrão: FUTALGORITHM_BENCHMARKS '
+                                           'ou .dados/benchmarks.json)')
+    bench.add_argument('--sem-historico', action='store_true', help='Só mede e compara, sem gravar')
+    bench.add_argument('--limiar', type=float, help='Variação que conta como regressão (padrão: 0.20); '
+                                                   'com alguma regressão o comando sai com código 3')
+    return parser
+
+
+def comando_predict(args):
+    from futalgorithm import motor
+    from futalgorithm.instrumentacao import iniciar_execucao, finalizar_execucao
+
+    if args.sem_cache_disco:
+        motor.CACHE_DISCO_ATIVO = False
+
+    # Com FUTALGORITHM_INSTRUMENTACAO=1 o rastro do lote vai para FUTALGORITHM_LOG_METRICAS
+    iniciar_execucao('predict')
+
+    inicio = time.perf_counter()
+    todas_abas = motor.carregar_dados_origem(args.dados)
+    if not todas_abas:
+        print(f"Nenhuma liga encontrada em {args.dados}")
+        return 1
+    df_proximos_jogos = motor.carregar_jogos_origem(args.jogos)
+    segundos_carga = time.perf_counter() - inicio
+
+    tabelas, versao_dados, tempos = motor.executar_lote(todas_abas, df_proximos_jogos)
+    tempos = {'carga': segundos_carga, **tempos}
+    total = sum(tempos.values())
+    jogos = len(tabelas['previsoes'])
+    segundos_modelagem = tempos['previsoes'] + tempos['quadro']
+
+    os.makedirs(args.saida, exist_ok=True)
+    inicio = time.perf_counter()
+    manifesto = {
+        'versao_dados': versao_dados,
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'origem_dados': args.dados,
+        'origem_jogos': args.jogos,
+        'ligas': len(todas_abas),
+        'linhas_dados': int(sum(len(df_liga) for df_liga in todas_abas.values())),
+        'jogos_recebidos': len(df_proximos_jogos),
+        'linhas': {nome: len(df) for nome, df in tabelas.items()},
+        'segundos': {etapa: round(segundos, 4) for etapa, segundos in tempos.items()},
+        'jogos_por_segundo': round(jogos / segundos_modelagem, 1) if segundos_modelagem > 0 else None,
+        'tempos_por_liga': {etapa: {liga: round(tempo['segundos'], 4) for liga, tempo in por_liga.items()}
+                            for etapa, por_liga in motor.TEMPOS_POR_LIGA.items()},
+    }
+    manifesto = motor.salvar_resultados(args.saida, tabelas, manifesto, args.formatos)
+    escrita = time.perf_counter() - inicio
+
+    print(f"Dados {versao_dados}: {manifesto['ligas']} ligas, {manifesto['linhas_dados']} jogos; "
+          f"{jogos} de {manifesto['jogos_recebidos']} próximos jogos modelados")
+    for etapa, segundos in tempos.items():
+        print(f"  {etapa:<18}{segundos:>9.3f}s")
+    print(f"  {'escrita':<18}{escrita:>9.3f}s")
+    print(f"Total {total + escrita:.2f}s · {manifesto['jogos_por_segundo']} jogos/s na modelagem · "
+          f"{len(tabelas['dicas'])} dicas · {len(tabelas['rankings'])} linhas de ranking -> {args.saida}")
+    finalizar_execucao()
+    return 0
+
+
+def comando_serve(args):
+    import uvicorn
+    from futalgorithm.api import criar_app
+
+    try:
+        app = criar_app(args.precalculado)
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+    uvicorn.run(app, host=args.host, port=args.porta, log_level='warning', access_log=False)
+    return 0
+
+
+def comando_bench(args):
+    from futalgorithm import benchmark, motor
+
+    # Os artefatos em disco mascarariam o custo das etapas
+    motor.CACHE_DISCO_ATIVO = False
+    perfil = {chave: valor for chave, valor in
+              [('ligas', args.ligas), ('times', args.times), ('rodadas', args.rodadas)] if valor}
+    registro = benchmark.executar_benchmark(args.escalas, perfil, args.semente, args.repeticoes)
+
+    caminho = args.historico or benchmark.ARQUIVO_HISTORICO
+    historico = benchmark.ler_historico(caminho) if args.sem_historico else benchmark.salvar_no_historico(registro,
+                                                                                                          caminho)
+    anterior, variacoes = benchmark.comparar_com_anterior(registro, historico)
+    regressoes = benchmark.relatar_comparacao(anterior, variacoes, args.limiar or benchmark.LIMIAR_REGRESSAO)
+    if not args.sem_historico:
+        print(f"Histórico: {caminho} ({len(historico) + 1} execuções)")
+    return 3 if regressoes else 0
+
+
+def main(argv=None):
+    warnings.filterwarnings('ignore')
+
+    args = criar_parser().parse_args(argv)
+    if args.comando == 'predict':
+        return comando_predict(args)
+    if args.comando == 'serve':
+        return comando_serve(args)
+    if args.comando == 'bench':
+        return comando_bench(args)
+    return 2
@@ -0,0 +1,178 @@
+"""Instrumentação das etapas quentes: tempos por etapa, contadores e exportação (Prometheus / log JSON).
+
+Ligada com FUTALGORITHM_INSTRUMENTACAO=1. Desligada, `cronometrar` devolve a própria função, `medir`
+devolve um contexto vazio compartilhado e `contar` retorna na primeira linha.
+
+Cada execução do script (rerun do Streamlit, comando do lote) abre um rastro na thread que a executa com
+`iniciar_execucao`; as etapas medidas nessa thread entram no rastro, que a aba Diagnóstico desenha como
+cascata. Os totais por etapa e os contadores são do processo e valem também para as threads de trabalho.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+INSTRUMENTACAO_ATIVA = os.environ.get('FUTALGORITHM_INSTRUMENTACAO', '0') == '1'
+# Arquivo JSON lines com um registro por execução (rastro + contadores); vazio = não grava
+ARQUIVO_LOG_METRICAS = os.environ.get('FUTALGORITHM_LOG_METRICAS', '')
+MAXIMO_EXECUCOES = 50
+
+# Totais do processo: {etapa: [execuções, segundos]} e {(contador, rótulos): valor}
+DURACOES = {}
+CONTADORES = {}
+# Resumo das últimas execuções, da mais antiga para a mais recente
+EXECUCOES = deque(maxlen=MAXIMO_EXECUCOES)
+
+_trava = threading.Lock()
+_local = threading.local()
+_NADA = nullcontext()
+
+
+def iniciar_execucao(nome='execucao'):
+    """Abre o rastro da execução atual nesta thread (o anterior, se houver, é descartado)"""
+    if not INSTRUMENTACAO_ATIVA:
+        return None
+    _local.rastro = {'nome': nome, 'inicio': time.perf_counter(), 'iniciado_em': datetime.now(),
+                     'etapas': [], 'contadores': {}, 'nivel': 0}
+    return _local.rastro
+
+
+def rastro_atual():
+    return getattr(_local, 'rastro', None)
+
+
+def finalizar_execucao():
+    """Fecha o rastro desta thread, guarda seu resumo e o grava no log (quando configurado)"""
+    rastro = rastro_atual()
+    if rastro is None:
+        return None
+    _local.rastro = None
+
+    registro = {
+        'nome': rastro['nome'],
+        'iniciado_em': rastro['iniciado_em'].isoformat(timespec='seconds'),
+        'segundos': round(time.perf_counter() - rastro['inicio'], 6),
+        'etapas': [dict(etapa, inicio=round(etapa['inicio'], 6), segundos=round(etapa['segundos'], 6))
+                   for etapa in rastro['etapas']],
+        'contadores': rastro['contadores'],
+    }
+    with _trava:
+        EXECUCOES.append(registro)
+    if ARQUIVO_LOG_METRICAS:
+        try:
+            with open(ARQUIVO_LOG_METRICAS, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        except OSError:
+            pass
+    return registro
+
+
+@contextmanager
+def _medir(etapa):
+    rastro = rastro_atual()
+    inicio = time.perf_counter()
+    if rastro is not None:
+        nivel = rastro['nivel']
+        rastro['nivel'] += 1
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        with _trava:
+            total = DURACOES.setdefault(etapa, [0, 0.0])
+            total[0] += 1
+            total[1] += segundos
+        if rastro is not None:
+            rastro['nivel'] = nivel
+            rastro['etapas'].append({'etapa': etapa, 'inicio': inicio - rastro['inicio'],
+                                     'segundos': segundos, 'nivel': nivel})
+
+
+def medir(etapa):
+    """Contexto que cronometra `etapa`: `with medir('leitura_excel'): ...`"""
+    if not INSTRUMENTACAO_ATIVA:
+        return _NADA
+    return _medir(etapa)
+
+
+def cronometrar(etapa, cache=None):
+    """Decorador de `medir`; com a instrumentação desligada a função fica intacta.
+
+    Com `cache`, decora por fora uma função memorizada (motor.memorizar) cujo corpo chama `contar_falta_cache(cache)`:
+    a chamada em que o corpo não rodou conta como acerto do cache em memória.
+    """
+    def decorador(funcao):
+        if not INSTRUMENTACAO_ATIVA:
+            return funcao
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            if cache is None:
+                with _medir(etapa):
+                    return funcao(*args, **kwargs)
+
+            faltas = _local.__dict__.setdefault('faltas_cache', {})
+            antes = faltas.get(cache, 0)
+            with _medir(etapa):
+                resultado = funcao(*args, **kwargs)
+            if faltas.get(cache, 0) == antes:
+                contar('cache_acertos', camada='memoria', tipo=cache)
+            return resultado
+        return medida
+    return decorador
+
+
+def contar(nome, quantidade=1, **rotulos):
+    """Soma `quantidade` ao contador `nome` (com rótulos opcionais, ex.: tipo='previsoes')"""
+    if not INSTRUMENTACAO_ATIVA:
+        return
+    chave = (nome, tuple(sorted(rotulos.items())))
+    with _trava:
+        CONTADORES[chave] = CONTADORES.get(chave, 0) + quantidade
+    rastro = rastro_atual()
+    if rastro is not None:
+        texto = nome + ''.join(f'[{valor}]' for _, valor in chave[1])
+        rastro['contadores'][texto] = rastro['contadores'].get(texto, 0) + quantidade
+
+
+def contar_falta_cache(tipo):
+    """Chamada no corpo de uma função memorizada, que só roda quando o cache em memória falha"""
+    if not INSTRUMENTACAO_ATIVA:
+        return
+    faltas = _local.__dict__.setdefault('faltas_cache', {})
+    faltas[tipo] = faltas.get(tipo, 0) + 1
+    contar('cache_faltas', camada='memoria', tipo=tipo)
+
+
+def _rotulos(rotulos):
+    if not rotulos:
+        return ''
+    pares = ','.join('{}="{}"'.format(nome, str(valor).replace('\\', '\\\\').replace('"', '\\"'))
+                     for nome, valor in rotulos)
+    return '{' + pares + '}'
+
+
+def texto_prometheus():
+    """Totais do processo no formato texto do Prometheus (0.0.4)"""
+    with _trava:
+        duracoes = sorted(DURACOES.items())
+        contadores = sorted(CONTADORES.items())
+
+    linhas = ['# HELP futalgorithm_etapa_segundos Tempo gasto em cada etapa instrumentada.',
+              '# TYPE futalgorithm_etapa_segundos summary']
+    for etapa, (execucoes, segundos) in duracoes:
+        rotulo = _rotulos([('etapa', etapa)])
+        linhas.append(f'futalgorithm_etapa_segundos_sum{rotulo} {segundos:.6f}')
+        linhas.append(f'futalgorithm_etapa_segundos_count{rotulo} {execucoes}')
+
+    ultimo = None
+    for (nome, rotulos), valor in contadores:
+        if nome != ultimo:
+            linhas.append(f'# TYPE futalgorithm_{nome}_total counter')
+            ultimo = nome
+        linhas.append(f'futalgorithm_{nome}_total{_rotulos(rotulos)} {valor}')
+    return '\n'.join(linhas) + '\n'
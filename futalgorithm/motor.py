@@ -0,0 +1,3056 @@
+"""Motor de cálculo do FutAlgorithm: ingestão, índices, modelos, previsões, dicas e rankings.
+
+Não desenha nada na tela nem importa o Streamlit; é usado pela interface (app.py), pelo lote e pela API
+(python -m futalgorithm).
+"""
+# URLs dos arquivos
+url_excel = "https://www.football-data.co.uk/mmz4281/2526/all-euro-data-2025-2026.xlsx"
+url_proximos_jogos = "https://www.football-data.co.uk/fixtures.xlsx"
+
+import pandas as pd
+import numpy as np
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import requests
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import platform
+import threading
+import unicodedata
+import html
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+import time
+import scipy
+import scipy.stats as stats
+import sklearn
+from scipy import optimize, sparse
+from sklearn.linear_model import PoissonRegressor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from futalgorithm.instrumentacao import cronometrar, medir, contar, contar_falta_cache
+
+logger = logging.getLogger(__name__)
+
+
+# INGESTÃO DA PLANILHA (APENAS AS COLUNAS USADAS PELOS MODELOS)
+# Odds usadas pela camada de valor: casa (média do mercado, Bet365, melhor odd) + sufixo do mercado
+CASAS_ODDS = ['Avg', 'B365', 'Max']
+SUFIXOS_ODDS = ['H', 'D', 'A', '>2.5', '<2.5']
+COLUNAS_ODDS = [casa + sufixo for casa in CASAS_ODDS for sufixo in SUFIXOS_ODDS]
+
+COLUNAS_PLANILHA = ['Div', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'HTHG', 'HTAG',
+                    'HS', 'AS', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR'] + COLUNAS_ODDS
+COLUNAS_CATEGORICAS = ['Div', 'HomeTeam', 'AwayTeam', 'FTR']
+TIPOS_CONTAGEM = {
+    'FTHG': 'int8', 'FTAG': 'int8', 'HTHG': 'int8', 'HTAG': 'int8',
+    'HC': 'int8', 'AC': 'int8', 'HY': 'int8', 'AY': 'int8', 'HR': 'int8', 'AR': 'int8',
+    'HS': 'int16', 'AS': 'int16', 'HST': 'int16', 'AST': 'int16', 'HF': 'int16', 'AF': 'int16'
+}
+
+
+def motor_excel():
+    """Leitor mais rápido disponível: calamine (Rust) se instalado, senão openpyxl em modo read-only"""
+    try:
+        import python_calamine  # noqa: F401
+        return 'calamine'
+    except ImportError:
+        return 'openpyxl'
+
+
+def otimizar_tipos(df_liga):
+    """Fixa tipos compactos: category para times/Div/FTR, int8/int16 para contagens, float32 para odds, datetime para datas"""
+    df_liga = df_liga[[c for c in COLUNAS_PLANILHA if c in df_liga.columns]]
+    obrigatorias = [c for c in ['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'] if c in df_liga.columns]
+    df_liga = df_liga.dropna(subset=obrigatorias).reset_index(drop=True)
+
+    colunas = {}
+    for coluna in df_liga.columns:
+        serie = df_liga[coluna]
+        if coluna in TIPOS_CONTAGEM:
+            serie = pd.to_numeric(serie, errors='coerce').fillna(0).astype(TIPOS_CONTAGEM[coluna])
+        elif coluna in COLUNAS_CATEGORICAS:
+            serie = serie.astype('category')
+        elif coluna in COLUNAS_ODDS:
+            serie = pd.to_numeric(serie, errors='coerce').astype(np.float32)
+        elif coluna == 'Date':
+            serie = pd.to_datetime(serie, errors='coerce', dayfirst=True)
+        colunas[coluna] = serie
+    return pd.DataFrame(colunas)
+
+
+@cronometrar('leitura_excel')
+def ler_planilha(conteudo):
+    """Lê todas as abas do workbook com projeção de colunas e tipos fixos"""
+    abas = pd.read_excel(BytesIO(conteudo), sheet_name=None, engine=motor_excel(),
+                         usecols=lambda coluna: coluna in COLUNAS_PLANILHA)
+    contar('linhas_lidas', sum(len(df_liga) for df_liga in abas.values()), etapa='leitura_excel')
+    return {aba: otimizar_tipos(df_liga) for aba, df_liga in abas.items()}
+
+
+# ARMAZENAMENTO LOCAL DOS DADOS (PARQUET POR LIGA)
+DIRETORIO_DADOS = os.environ.get('FUTALGORITHM_DADOS',
+                                 os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.dados'))
+ARQUIVO_METADADOS = '_metadados.json'
+VERSAO_FORMATO_STORE = 3
+CHAVES_JOGO = ['Date', 'HomeTeam', 'AwayTeam']
+
+
+def _escrever_atomico(caminho, escrever):
+    """Escreve em arquivo temporário e troca de uma vez, evitando arquivos pela metade"""
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+@contextmanager
+def travar_diretorio(diretorio, nome='_trava.lock'):
+    """Trava exclusiva entre processos do mesmo host (flock; msvcrt.locking no Windows)"""
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, nome), 'a+b') as arquivo:
+        if fcntl is not None:
+            fcntl.flock(arquivo, fcntl.LOCK_EX)
+        else:
+            arquivo.seek(0)
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(arquivo, fcntl.LOCK_UN)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def carregar_store_local(diretorio=DIRETORIO_DADOS):
+    """Lê as ligas já salvas em disco. Retorna (todas_abas, metadados)"""
+    caminho_meta = os.path.join(diretorio, ARQUIVO_METADADOS)
+    if not os.path.exists(caminho_meta):
+        return {}, {}
+
+    with open(caminho_meta, encoding='utf-8') as arquivo:
+        metadados = json.load(arquivo)
+    if metadados.get('versao_formato') != VERSAO_FORMATO_STORE:
+        return {}, {}
+
+    todas_abas = {}
+    for liga in metadados.get('ligas', []):
+        caminho = os.path.join(diretorio, f'{liga}.parquet')
+        if os.path.exists(caminho):
+            todas_abas[liga] = pd.read_parquet(caminho)
+
+    if len(todas_abas) != len(metadados.get('ligas', [])):
+        return {}, {}
+    return todas_abas, metadados
+
+
+def salvar_store_local(todas_abas, metadados, ligas_alteradas, diretorio=DIRETORIO_DADOS):
+    """Persiste as ligas alteradas e, por último, os metadados (um processo por vez)"""
+    metadados = dict(metadados, ligas=list(todas_abas), versao_formato=VERSAO_FORMATO_STORE)
+
+    def escrever_meta(caminho):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(metadados, arquivo, ensure_ascii=False, indent=2)
+
+    with travar_diretorio(diretorio):
+        for liga, df_liga in todas_abas.items():
+            caminho_liga = os.path.join(diretorio, f'{liga}.parquet')
+            if liga in ligas_alteradas or not os.path.exists(caminho_liga):
+                _escrever_atomico(caminho_liga, lambda caminho: df_liga.to_parquet(caminho, index=False))
+        _escrever_atomico(os.path.join(diretorio, ARQUIVO_METADADOS), escrever_meta)
+
+
+# CACHE DE ARTEFATOS EM DISCO (ÍNDICES, MODELOS E PREVISÕES)
+# Compartilhado entre reinícios e processos do mesmo host; desligado com FUTALGORITHM_CACHE_DISCO=0
+DIRETORIO_ARTEFATOS = os.environ.get('FUTALGORITHM_ARTEFATOS', os.path.join(DIRETORIO_DADOS, 'artefatos'))
+CACHE_DISCO_ATIVO = os.environ.get('FUTALGORITHM_CACHE_DISCO', '1') != '0'
+LIMITE_BYTES_ARTEFATOS = int(os.environ.get('FUTALGORITHM_ARTEFATOS_MB', 512)) * 1024 * 1024
+# Qualquer mudança no código do motor (ou nas bibliotecas que produzem os objetos gravados) invalida os
+# artefatos gravados por versões anteriores
+FONTES_VERSAO = ['motor.py', 'instrumentacao.py']
+VERSOES_BIBLIOTECAS = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                       'scipy': scipy.__version__, 'sklearn': sklearn.__version__}
+
+
+def _calcular_versao_codigo():
+    h = hashlib.sha1()
+    for nome in FONTES_VERSAO:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), nome), 'rb') as fonte:
+            h.update(fonte.read())
+    return h.hexdigest()[:12]
+
+
+VERSAO_CODIGO = _calcular_versao_codigo()
+
+
+def chave_artefato(tipo, *partes):
+    """Nome do arquivo de um artefato: tipo + hash do código, das bibliotecas, dos dados e dos parâmetros"""
+    h = hashlib.sha1(VERSAO_CODIGO.encode())
+    h.update(json.dumps([VERSOES_BIBLIOTECAS, tipo, *partes], sort_keys=True, default=str).encode())
+    return f'{tipo}-{h.hexdigest()[:20]}.pkl'
+
+
+def diretorio_privado(diretorio):
+    """Cria o diretório dos artefatos fechado para outros usuários (0700) e confirma que continua assim.
+
+    Os artefatos são pickles: só são lidos de um diretório do próprio usuário em que ninguém mais escreve.
+    """
+    try:
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        info = os.stat(diretorio)
+        if not hasattr(os, 'getuid'):  # Windows: vale a ACL do perfil do usuário
+            return True
+        if info.st_uid != os.getuid():
+            return False
+        if info.st_mode & 0o077:
+            os.chmod(diretorio, 0o700)
+    except OSError:
+        return False
+    return True
+
+
+def carregar_artefato(nome, diretorio=DIRETORIO_ARTEFATOS):
+    """Lê um artefato do disco, ou None quando não existe ou está corrompido.
+
+    A leitura atualiza o mtime do arquivo, que é a ordem de uso da remoção LRU.
+    """
+    if not diretorio_privado(diretorio):
+        return None
+    caminho = os.path.join(diretorio, nome)
+    try:
+        with open(caminho, 'rb') as arquivo:
+            if hasattr(os, 'getuid') and os.fstat(arquivo.fileno()).st_uid != os.getuid():
+                return None
+            artefato = pickle.load(arquivo)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+        return None
+
+    try:
+        os.utime(caminho)
+    except OSError:
+        pass
+    return artefato
+
+
+def salvar_artefato(nome, artefato, diretorio=DIRETORIO_ARTEFATOS, limite_bytes=LIMITE_BYTES_ARTEFATOS):
+    """Grava um artefato de forma atômica e remove os menos usados acima de `limite_bytes`"""
+    def escrever(caminho):
+        with open(caminho, 'wb') as arquivo:
+            pickle.dump(artefato, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+    if not diretorio_privado(diretorio):
+        raise PermissionError(f"{diretorio} não pertence ao usuário atual")
+    with travar_diretorio(diretorio):
+        _escrever_atomico(os.path.join(diretorio, nome), escrever)
+        remover_artefatos_antigos(diretorio, limite_bytes)
+
+
+def remover_artefatos_antigos(diretorio=DIRETORIO_ARTEFATOS, limite_bytes=LIMITE_BYTES_ARTEFATOS):
+    """Remove os artefatos de uso mais antigo até o total caber em `limite_bytes`"""
+    arquivos = []
+    with os.scandir(diretorio) as entradas:
+        for entrada in entradas:
+            if entrada.name.endswith('.pkl'):
+                try:
+                    info = entrada.stat()
+                except OSError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= limite_bytes:
+            break
+        try:
+            os.remove(caminho)
+            total -= tamanho
+        except OSError:
+            pass
+
+
+def obter_artefato(tipo, partes, calcular, diretorio=DIRETORIO_ARTEFATOS, gravar=None):
+    """Artefato do disco quando já calculado para as mesmas `partes`; senão calcula e grava.
+
+    `gravar(artefato)`, quando dado, decide se o artefato calculado pode ir para o disco.
+    """
+    if not CACHE_DISCO_ATIVO:
+        return calcular()
+
+    nome = chave_artefato(tipo, *partes)
+    artefato = carregar_artefato(nome, diretorio)
+    contar('cache_acertos' if artefato is not None else 'cache_faltas', camada='disco', tipo=tipo)
+    if artefato is None:
+        artefato = calcular()
+        if gravar is not None and not gravar(artefato):
+            return artefato
+        try:
+            salvar_artefato(nome, artefato, diretorio)
+        except OSError:
+            pass
+    return artefato
+
+
+# CACHE EM MEMÓRIA DO PROCESSO
+# Como no st.cache_resource, argumentos com nome iniciado por '_' não entram na chave: a versão dos dados que
+# acompanha cada chamada já identifica o conteúdo das abas e dos índices
+def memorizar(maximo=2):
+    """Decorador: guarda os `maximo` resultados usados mais recentemente, compartilhados pelas threads.
+
+    Chamadas simultâneas com a mesma chave esperam o primeiro cálculo em vez de repeti-lo.
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+        resultados = OrderedDict()
+        calculando = {}
+        trava = threading.Lock()
+
+        def buscar(chave):
+            with trava:
+                if chave in resultados:
+                    resultados.move_to_end(chave)
+                    return True, resultados[chave]
+            return False, None
+
+        @functools.wraps(funcao)
+        def memorizada(*args, **kwargs):
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chave = tuple((nome, valor) for nome, valor in argumentos.arguments.items() if not nome.startswith('_'))
+            achou, resultado = buscar(chave)
+            if achou:
+                return resultado
+
+            with trava:
+                trava_chave = calculando.setdefault(chave, threading.Lock())
+            with trava_chave:
+                achou, resultado = buscar(chave)
+                if achou:
+                    return resultado
+                try:
+                    resultado = funcao(*args, **kwargs)
+                    with trava:
+                        resultados[chave] = resultado
+                        while len(resultados) > maximo:
+                            resultados.popitem(last=False)
+                finally:
+                    with trava:
+                        calculando.pop(chave, None)
+            return resultado
+
+        def limpar():
+            with trava:
+                resultados.clear()
+
+        memorizada.limpar = limpar
+        return memorizada
+    return decorador
+
+
+def _chaves_normalizadas(df_liga, chaves):
+    chaves_df = df_liga[chaves].copy()
+    if 'Date' in chaves_df.columns:
+        chaves_df['Date'] = pd.to_datetime(chaves_df['Date'], errors='coerce', dayfirst=True)
+    return pd.MultiIndex.from_frame(chaves_df)
+
+
+def mesclar_jogos_novos(df_atual, df_novo):
+    """Acrescenta a df_atual apenas os jogos de df_novo que ainda não existem.
+
+    Retorna (df_mesclado, quantidade de linhas novas).
+    """
+    if df_atual is None or df_atual.empty:
+        return df_novo.reset_index(drop=True), len(df_novo)
+
+    chaves = [c for c in CHAVES_JOGO if c in df_atual.columns and c in df_novo.columns]
+    if len(chaves) < len(CHAVES_JOGO):
+        return df_novo.reset_index(drop=True), len(df_novo)
+
+    novos = ~_chaves_normalizadas(df_novo, chaves).isin(_chaves_normalizadas(df_atual, chaves))
+    if not novos.any():
+        return df_atual, 0
+
+    return otimizar_tipos(pd.concat([df_atual, df_novo[novos]], ignore_index=True)), int(novos.sum())
+
+
+def atualizar_dados_incremental(url, diretorio=DIRETORIO_DADOS):
+    """Atualiza o store local com requisição condicional (ETag / Last-Modified).
+
+    Quando o servidor responde 304 nada é baixado; quando a planilha mudou, só as
+    linhas novas de cada aba são mescladas e gravadas. Retorna (todas_abas, linhas_novas).
+    """
+    todas_abas, metadados = carregar_store_local(diretorio)
+
+    cabecalhos = {}
+    if todas_abas and metadados.get('url') == url:
+        if metadados.get('etag'):
+            cabecalhos['If-None-Match'] = metadados['etag']
+        if metadados.get('last_modified'):
+            cabecalhos['If-Modified-Since'] = metadados['last_modified']
+    else:
+        todas_abas = {}
+
+    with medir('download_dados'):
+        response = requests.get(url, headers=cabecalhos, timeout=60)
+    if response.status_code == 304:
+        return todas_abas, {}
+    response.raise_for_status()
+
+    abas_baixadas = ler_planilha(response.content)
+    linhas_novas = {}
+    for liga, df_novo in abas_baixadas.items():
+        todas_abas[liga], quantidade = mesclar_jogos_novos(todas_abas.get(liga), df_novo)
+        if quantidade:
+            linhas_novas[liga] = quantidade
+
+    metadados = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'atualizado_em': datetime.now().isoformat(timespec='seconds')
+    }
+    salvar_store_local(todas_abas, metadados, linhas_novas, diretorio)
+    return todas_abas, linhas_novas
+
+
+@cronometrar('download_jogos')
+def baixar_proximos_jogos(url):
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    return pd.read_excel(BytesIO(response.content))
+
+
+# ATUALIZAÇÃO EM SEGUNDO PLANO (STALE-WHILE-REVALIDATE)
+# As sessões leem o snapshot atual do processo; um worker o reconstrói fora da requisição e troca de uma vez
+INTERVALO_ATUALIZACAO = int(os.environ.get('FUTALGORITHM_INTERVALO_ATUALIZACAO', 3600))
+INTERVALO_NOVA_TENTATIVA = 300
+ARTEFATO_PROXIMOS_JOGOS = 'proximos_jogos.pkl'
+
+
+@memorizar(maximo=1)
+def estado_atualizacao():
+    """Estado compartilhado por todas as sessões do processo: snapshot atual, último erro e o worker"""
+    return {'snapshot': None, 'erro': None, 'worker': None, 'trava': threading.Lock()}
+
+
+def montar_snapshot(todas_abas, df_proximos_jogos, atualizado_em, origem):
+    return {
+        'todas_abas': todas_abas or None,
+        'abas': list(todas_abas) if todas_abas else None,
+        'df_proximos_jogos': df_proximos_jogos,
+        'versao_dados': calcular_versao_dados(todas_abas),
+        'atualizado_em': atualizado_em,
+        'origem': origem,
+    }
+
+
+def baixar_snapshot(url_dados, url_jogos, diretorio=DIRETORIO_DADOS):
+    """Baixa as planilhas (a de dados de forma incremental) e monta um snapshot novo.
+
+    Sem acesso aos próximos jogos, usa a última lista salva; falhas nos dados propagam.
+    """
+    try:
+        df_proximos_jogos = baixar_proximos_jogos(url_jogos)
+        salvar_artefato(ARTEFATO_PROXIMOS_JOGOS, df_proximos_jogos)
+    except (requests.RequestException, OSError, ValueError):
+        df_proximos_jogos = carregar_artefato(ARTEFATO_PROXIMOS_JOGOS)
+
+    todas_abas, _ = atualizar_dados_incremental(url_dados, diretorio)
+    return montar_snapshot(todas_abas, df_proximos_jogos, datetime.now(), 'download')
+
+
+def snapshot_inicial(estado, url_dados, url_jogos, diretorio=DIRETORIO_DADOS):
+    """Primeiro snapshot do processo: o que está salvo em disco (revalidado pelo worker) ou, sem ele, o download"""
+    todas_abas, metadados = carregar_store_local(diretorio)
+    df_proximos_jogos = carregar_artefato(ARTEFATO_PROXIMOS_JOGOS)
+    salvo_em = datetime.fromisoformat(metadados['atualizado_em']) if metadados.get('atualizado_em') else datetime.min
+    if todas_abas and df_proximos_jogos is not None:
+        return montar_snapshot(todas_abas, df_proximos_jogos, salvo_em, 'disco')
+
+    try:
+        return baixar_snapshot(url_dados, url_jogos, diretorio)
+    except Exception as e:
+        estado['erro'] = str(e)
+        return montar_snapshot(todas_abas, carregar_artefato(ARTEFATO_PROXIMOS_JOGOS), salvo_em, 'disco')
+
+
+def obter_snapshot(estado, url_dados, url_jogos):
+    with estado['trava']:
+        if estado['snapshot'] is None:
+            estado['snapshot'] = snapshot_inicial(estado, url_dados, url_jogos)
+    return estado['snapshot']
+
+
+def _laco_atualizacao(estado, url_dados, url_jogos, preparar):
+    while True:
+        idade = (datetime.now() - estado['snapshot']['atualizado_em']).total_seconds()
+        espera = INTERVALO_NOVA_TENTATIVA if estado['erro'] else INTERVALO_ATUALIZACAO - idade
+        if espera > 0:
+            time.sleep(espera)
+
+        try:
+            novo = baixar_snapshot(url_dados, url_jogos)
+            preparar(novo)
+        except Exception as e:
+            estado['erro'] = str(e)
+            continue
+        # Troca atômica: as próximas execuções do script já leem o snapshot novo, com os caches aquecidos
+        estado['snapshot'] = novo
+        estado['erro'] = None
+
+
+def iniciar_atualizacao(estado, url_dados, url_jogos, preparar):
+    """Inicia uma vez por processo a thread que revalida o snapshot a cada INTERVALO_ATUALIZACAO.
+
+    `preparar(snapshot)` calcula os caches das abas antes da troca, para que nenhum usuário espere por eles.
+    """
+    with estado['trava']:
+        if estado['worker'] is None or not estado['worker'].is_alive():
+            estado['worker'] = threading.Thread(target=_laco_atualizacao, args=(estado, url_dados, url_jogos, preparar),
+                                                name='futalgorithm-atualizacao', daemon=True)
+            estado['worker'].start()
+
+
+# Mapeamento de ligas
+mapeamento_ligas = {
+    'E0': 'Premier League', 'E1': 'Championship', 'E2': 'League One', 'E3': 'League Two',
+    'SC0': 'Premiership', 'SC1': 'Championship', 'SC2': 'League One', 'SC3': 'League Two',
+    'D1': 'Bundesliga', 'D2': '2. Bundesliga', 'I1': 'Serie A', 'I2': 'Serie B',
+    'SP1': 'La Liga', 'SP2': 'La Liga 2', 'F1': 'Ligue 1', 'F2': 'Ligue 2',
+    'N1': 'Eredivisie', 'B1': 'Jupiler Pro League', 'P1': 'Primeira Liga',
+    'T1': 'Super Lig', 'G1': 'Super League'
+}
+
+# CONSTANTES DO SISTEMA
+MINIMO_JOGOS_ANALISE = 5
+PESO_JOGOS_RECENTES = 1.8
+CONFIANCA_ALTA = 0.8
+CONFIANCA_MEDIA = 0.65
+CONFIANCA_BAIXA = 0.5
+
+# FATORES DE AJUSTE POR LIGA
+FATORES_LIGA = {
+    'E0': 1.1, 'D1': 1.05, 'SP1': 1.0, 'I1': 0.95, 'F1': 0.9, 'default': 1.0
+}
+
+
+# FUNÇÕES ESTATÍSTICAS
+# Limite de gols por equipe na matriz de placares; a última posição acumula a cauda (>= limite)
+MAXIMO_GOLS_PLACAR = 10
+
+
+def distribuicao_poisson_truncada(lambdas, max_gols=MAXIMO_GOLS_PLACAR):
+    """Matriz (n, max_gols + 1) com P(X = k) para k < max_gols e P(X >= max_gols) na última coluna"""
+    lambdas = np.atleast_1d(np.asarray(lambdas, dtype=np.float64))
+    k = np.arange(1, max_gols + 1)
+    razoes = np.concatenate([np.ones((len(lambdas), 1)), lambdas[:, None] / k], axis=1)
+    pmf = np.exp(-lambdas)[:, None] * np.cumprod(razoes, axis=1)
+    pmf[:, -1] = np.maximum(1.0 - pmf[:, :-1].sum(axis=1), 0.0)
+    return pmf
+
+
+def matriz_placares(lambdas_casa, lambdas_fora, max_gols=MAXIMO_GOLS_PLACAR):
+    """Tensor (n_jogos, G, G) de probabilidades de placar, com G = max_gols + 1"""
+    dist_casa = distribuicao_poisson_truncada(lambdas_casa, max_gols)
+    dist_fora = distribuicao_poisson_truncada(lambdas_fora, max_gols)
+    return dist_casa[:, :, None] * dist_fora[:, None, :]
+
+
+def corrigir_placares_baixos(matriz, lambdas_casa, lambdas_fora, rho):
+    """Correção Dixon-Coles dos placares 0x0, 0x1, 1x0 e 1x1 (preserva a soma das probabilidades)"""
+    rho = np.broadcast_to(np.asarray(rho, dtype=np.float64), lambdas_casa.shape)
+    matriz = matriz.copy()
+    matriz[:, 0, 0] *= np.maximum(1 - lambdas_casa * lambdas_fora * rho, 0.0)
+    matriz[:, 0, 1] *= np.maximum(1 + lambdas_casa * rho, 0.0)
+    matriz[:, 1, 0] *= np.maximum(1 + lambdas_fora * rho, 0.0)
+    matriz[:, 1, 1] *= np.maximum(1 - rho, 0.0)
+    return matriz
+
+
+def _mascaras_mercados(max_gols):
+    gols_casa, gols_fora = np.indices((max_gols + 1, max_gols + 1))
+    total = gols_casa + gols_fora
+    return {
+        'casa_vence': gols_casa > gols_fora,
+        'empate': gols_casa == gols_fora,
+        'fora_vence': gols_casa < gols_fora,
+        'over_05_ft': total > 0.5,
+        'over_15_ft': total > 1.5,
+        'over_25_ft': total > 2.5,
+        'over_35_ft': total > 3.5,
+        'btts_ft': (gols_casa > 0) & (gols_fora > 0),
+    }
+
+
+def mercados_placares(matriz):
+    """Lê todos os mercados do tensor de placares com uma multiplicação matricial.
+
+    Retorna {mercado: array (n_jogos,)} com probabilidades entre 0 e 1.
+    """
+    mascaras = _mascaras_mercados(matriz.shape[1] - 1)
+    pesos = np.stack([m.ravel() for m in mascaras.values()], axis=1).astype(np.float64)
+    probabilidades = matriz.reshape(len(matriz), -1) @ pesos
+    return {mercado: probabilidades[:, i] for i, mercado in enumerate(mascaras)}
+
+
+def calcular_distribuicao_poisson(lambda_val):
+    dist = distribuicao_poisson_truncada([lambda_val], 7)[0]
+    probs = {i: dist[i] for i in range(0, 7)}
+    probs['6+'] = dist[6] + dist[7]
+    return probs
+
+
+def calcular_confianca_analise(n_jogos, consistencia, media_gols):
+    if n_jogos < MINIMO_JOGOS_ANALISE:
+        return "Baixa", CONFIANCA_BAIXA
+
+    confianca_base = min(n_jogos / 15, 1.0)
+    confianca_consistencia = 0.6 + 0.4 * consistencia
+    confianca_gols = 0.7 + 0.3 * (min(media_gols, 3.0) / 3.0)
+    confianca_ajustada = confianca_base * confianca_consistencia * confianca_gols
+
+    if confianca_ajustada >= CONFIANCA_ALTA:
+        return "Alta", min(confianca_ajustada, 1.0)
+    elif confianca_ajustada >= CONFIANCA_MEDIA:
+        return "Média", confianca_ajustada
+    else:
+        return "Baixa", confianca_ajustada
+
+
+def calcular_confianca_lote(n_jogos, consistencia, media_gols):
+    """Versão vetorizada de calcular_confianca_analise. Retorna (niveis, valores)"""
+    n_jogos = np.asarray(n_jogos, dtype=np.float64)
+    confianca_ajustada = (np.minimum(n_jogos / 15, 1.0) * (0.6 + 0.4 * np.asarray(consistencia)) *
+                          (0.7 + 0.3 * (np.minimum(media_gols, 3.0) / 3.0)))
+    poucos_jogos = n_jogos < MINIMO_JOGOS_ANALISE
+
+    valores = np.where(poucos_jogos, CONFIANCA_BAIXA, np.minimum(confianca_ajustada, 1.0))
+    niveis = np.select([poucos_jogos, confianca_ajustada >= CONFIANCA_ALTA, confianca_ajustada >= CONFIANCA_MEDIA],
+                       ["Baixa", "Alta", "Média"], "Baixa")
+    return niveis, valores
+
+
+# MOTOR COLUNAR DE ESTATÍSTICAS
+# Campos na perspectiva do time analisado: (coluna quando mandante, coluna quando visitante)
+CAMPOS_PERSPECTIVA = {
+    'gols_marcados_ft': ('FTHG', 'FTAG'),
+    'gols_sofridos_ft': ('FTAG', 'FTHG'),
+    'gols_marcados_ht': ('HTHG', 'HTAG'),
+    'gols_sofridos_ht': ('HTAG', 'HTHG'),
+    'escanteios_casa': ('HC', 'AC'),
+    'escanteios_fora': ('AC', 'HC'),
+    'finalizacoes_casa': ('HF', 'AF'),
+    'finalizacoes_fora': ('AF', 'HF'),
+    'chutes_gol_casa': ('HST', 'AST'),
+    'chutes_gol_fora': ('AST', 'HST'),
+}
+
+CAMPOS_RESULTADO = ['vitorias', 'empates', 'derrotas']
+
+CAMPOS_ESTATISTICAS = CAMPOS_RESULTADO + list(CAMPOS_PERSPECTIVA) + ['cartoes_casa', 'cartoes_fora']
+
+# Colunas da planilha usadas pelo índice de times
+COLUNAS_INDICE = ['Date', 'HomeTeam', 'AwayTeam', 'FTR', 'FTHG', 'FTAG', 'HTHG', 'HTAG', 'HC', 'AC',
+                  'HF', 'AF', 'HST', 'AST', 'HY', 'AY', 'HR', 'AR']
+
+
+def _coluna_numerica(jogos, coluna):
+    """Retorna a coluna como array float (0 quando ausente ou vazia)"""
+    if coluna not in jogos.columns:
+        return np.zeros(len(jogos))
+    return pd.to_numeric(jogos[coluna], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+
+def orientar_jogos(jogos, times):
+    """Converte jogos no formato casa/fora para a perspectiva do time de cada linha"""
+    is_mandante = jogos['HomeTeam'].to_numpy() == np.asarray(times, dtype=object)
+    perspectiva = {}
+
+    for campo, (coluna_mandante, coluna_visitante) in CAMPOS_PERSPECTIVA.items():
+        perspectiva[campo] = np.where(is_mandante,
+                                      _coluna_numerica(jogos, coluna_mandante),
+                                      _coluna_numerica(jogos, coluna_visitante))
+
+    cartoes_mandante = _coluna_numerica(jogos, 'HY') + _coluna_numerica(jogos, 'HR') * 2
+    cartoes_visitante = _coluna_numerica(jogos, 'AY') + _coluna_numerica(jogos, 'AR') * 2
+    perspectiva['cartoes_casa'] = np.where(is_mandante, cartoes_mandante, cartoes_visitante)
+    perspectiva['cartoes_fora'] = np.where(is_mandante, cartoes_visitante, cartoes_mandante)
+
+    resultado = jogos['FTR'].to_numpy() if 'FTR' in jogos.columns else np.full(len(jogos), '')
+    vitoria = np.where(is_mandante, resultado == 'H', resultado == 'A')
+    empate = resultado == 'D'
+    perspectiva['vitorias'] = vitoria.astype(np.float64)
+    perspectiva['empates'] = empate.astype(np.float64)
+    perspectiva['derrotas'] = (~vitoria & ~empate).astype(np.float64)
+
+    return pd.DataFrame(perspectiva, index=jogos.index)
+
+
+# ÍNDICE DE TIMES (UMA LINHA POR TIME POR JOGO)
+def construir_indice_liga(df_liga):
+    """Monta a tabela longa de uma liga e o mapa time -> posições ordenadas por data.
+
+    Retorna {'tabela': DataFrame, 'posicoes': {cenario: {time: array de posições}}}.
+    """
+    colunas = [c for c in COLUNAS_INDICE if c in df_liga.columns]
+    base = df_liga[colunas].reset_index(drop=True)
+    n = len(base)
+    contar('linhas_lidas', n, etapa='indice')
+
+    jogos = pd.concat([base, base], ignore_index=True)
+    times = np.concatenate([base['HomeTeam'].to_numpy(dtype=object), base['AwayTeam'].to_numpy(dtype=object)])
+    adversarios = np.concatenate([base['AwayTeam'].to_numpy(dtype=object), base['HomeTeam'].to_numpy(dtype=object)])
+
+    tabela = orientar_jogos(jogos, times)
+    tabela['Time'] = times
+    tabela['Adversario'] = adversarios
+    tabela['Mandante'] = np.r_[np.ones(n, dtype=bool), np.zeros(n, dtype=bool)]
+    tabela['jogo_id'] = np.r_[np.arange(n), np.arange(n)]
+    if 'Date' in jogos.columns:
+        tabela['Date'] = pd.to_datetime(jogos['Date'], errors='coerce', dayfirst=True)
+
+    # Totais do jogo (soma casa + fora) usados em sequências e rankings
+    tabela['gols_ft_total'] = tabela['gols_marcados_ft'] + tabela['gols_sofridos_ft']
+    tabela['gols_ht_total'] = tabela['gols_marcados_ht'] + tabela['gols_sofridos_ht']
+    tabela['escanteios_total'] = tabela['escanteios_casa'] + tabela['escanteios_fora']
+    tabela['finalizacoes_total'] = tabela['finalizacoes_casa'] + tabela['finalizacoes_fora']
+    tabela['chutes_gol_total'] = tabela['chutes_gol_casa'] + tabela['chutes_gol_fora']
+    tabela['cartoes_total'] = sum(_coluna_numerica(jogos, c) for c in ['HY', 'AY', 'HR', 'AR'])
+    tabela['btts'] = (tabela['gols_marcados_ft'] > 0) & (tabela['gols_sofridos_ft'] > 0)
+
+    codigos, times_unicos = pd.factorize(tabela['Time'])
+    if 'Date' in tabela.columns:
+        datas = tabela['Date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    else:
+        datas = np.zeros(len(tabela), dtype=np.int64)
+    ordem = np.lexsort((tabela['jogo_id'].to_numpy(), datas, codigos))
+    tabela = tabela.iloc[ordem].reset_index(drop=True)
+    codigos = codigos[ordem]
+
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]]) if len(codigos) else np.array([], dtype=int)
+    fins = np.r_[inicios[1:], len(codigos)]
+    mandante = tabela['Mandante'].to_numpy()
+
+    posicoes = {'geral': {}, 'mandante': {}, 'visitante': {}}
+    for inicio, fim in zip(inicios, fins):
+        time = times_unicos[codigos[inicio]]
+        bloco = np.arange(inicio, fim)
+        posicoes['geral'][time] = bloco
+        posicoes['mandante'][time] = bloco[mandante[bloco]]
+        posicoes['visitante'][time] = bloco[~mandante[bloco]]
+
+    return {'tabela': tabela, 'posicoes': posicoes}
+
+
+def calcular_versao_dados(todas_abas):
+    """Hash do conteúdo das abas, usado como chave dos caches derivados"""
+    if not todas_abas:
+        return None
+    h = hashlib.sha1()
+    for liga in sorted(todas_abas):
+        h.update(str(liga).encode())
+        h.update(pd.util.hash_pandas_object(todas_abas[liga], index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+@cronometrar('indice', cache='indice')
+@memorizar()
+def construir_indice_times(_todas_abas, versao_dados):
+    """Índice de todas as ligas, construído uma vez por versão dos dados"""
+    contar_falta_cache('indice')
+    return obter_artefato('indice', [versao_dados], lambda: {liga: construir_indice_liga(df_liga)
+                                                            for liga, df_liga in _todas_abas.items()})
+
+
+def obter_indice_liga(indice_times, liga, df_liga):
+    """Índice pré-calculado da liga, ou construído na hora quando indisponível"""
+    if indice_times and liga in indice_times:
+        return indice_times[liga]
+    return construir_indice_liga(df_liga)
+
+
+def _posicoes_ultimos_jogos(indice_liga, time, cenario, num_jogos):
+    cenario = cenario if cenario in ('mandante', 'visitante') else 'geral'
+    posicoes = indice_liga['posicoes'][cenario].get(time)
+    if posicoes is None:
+        return np.array([], dtype=int)
+    return posicoes[-num_jogos:] if num_jogos > 0 else posicoes[:0]
+
+
+def _pesos_temporais(datas, tamanhos):
+    """Peso temporal de blocos consecutivos de jogos (um bloco por time)"""
+    if len(datas) == 0:
+        return np.ones(0)
+    datas = datas.to_numpy(dtype='datetime64[ns]')
+    dias = datas.astype('datetime64[D]').astype(np.float64)
+    dias[np.isnat(datas)] = np.nan
+    tamanhos = np.asarray(tamanhos)
+    inicios = np.r_[0, np.cumsum(tamanhos)[:-1]]
+    validos = tamanhos > 0
+    maximo = np.repeat(np.fmax.reduceat(dias, inicios[validos]), tamanhos[validos])
+    pesos = PESO_JOGOS_RECENTES ** ((maximo - dias) / 30)
+    return np.where(np.isnan(pesos), 1.0, pesos)
+
+
+def obter_ultimos_jogos_por_cenario(df_liga, time, cenario, num_jogos=10, indice_liga=None):
+    """Últimos `num_jogos` do time no cenário, em linhas do índice (perspectiva do time) com `peso_temporal`.
+
+    Em 'geral' são os últimos jogos em ordem cronológica, com qualquer mando.
+    """
+    if indice_liga is None:
+        indice_liga = construir_indice_liga(df_liga)
+
+    posicoes = _posicoes_ultimos_jogos(indice_liga, time, cenario, num_jogos)
+    jogos = indice_liga['tabela'].take(posicoes)
+
+    if not jogos.empty and 'Date' in jogos.columns:
+        jogos = jogos.assign(peso_temporal=_pesos_temporais(jogos['Date'], [len(jogos)]))
+    else:
+        jogos = jogos.assign(peso_temporal=1.0)
+
+    return jogos
+
+
+def calcular_estatisticas_lote(jogos, liga):
+    """Calcula as estatísticas ponderadas de vários times em uma única passada.
+
+    `jogos` são linhas do índice de times (coluna `Time` indica a perspectiva),
+    com `peso_temporal`. Retorna {time: (stats_dict, consistencia, media_gols)}.
+    """
+    if len(jogos) == 0:
+        return {}
+
+    if 'peso_temporal' in jogos.columns:
+        pesos = jogos['peso_temporal'].to_numpy(dtype=np.float64)
+    else:
+        pesos = np.ones(len(jogos))
+
+    fator_liga = FATORES_LIGA.get(liga, FATORES_LIGA['default'])
+    fatores = np.array([1.0 if campo in CAMPOS_RESULTADO else fator_liga for campo in CAMPOS_ESTATISTICAS])
+    gols = jogos['gols_marcados_ft'].to_numpy(dtype=np.float64)
+
+    # Matriz (jogos x colunas): somas ponderadas, peso total, contagem e momentos dos gols
+    valores = np.column_stack([
+        jogos[CAMPOS_ESTATISTICAS].to_numpy(dtype=np.float64) * (pesos[:, None] * fatores),
+        pesos, np.ones(len(jogos)), gols, gols ** 2
+    ])
+
+    codigos, times_unicos = pd.factorize(jogos['Time'])
+    ordem = np.argsort(codigos, kind='stable')
+    codigos_ordenados = codigos[ordem]
+    inicios = np.flatnonzero(np.r_[True, codigos_ordenados[1:] != codigos_ordenados[:-1]])
+    somas = np.add.reduceat(valores[ordem], inicios, axis=0)
+
+    n_campos = len(CAMPOS_ESTATISTICAS)
+    peso_total = somas[:, n_campos]
+    n_jogos = somas[:, n_campos + 1]
+    media_gols = somas[:, n_campos + 2] / n_jogos
+    std_gols = np.sqrt(np.maximum(somas[:, n_campos + 3] / n_jogos - media_gols ** 2, 0.0))
+    consistencia = 1.0 - std_gols / np.maximum(1, media_gols)
+
+    resultados = {}
+    for i, codigo in enumerate(codigos_ordenados[inicios]):
+        time = times_unicos[codigo]
+        if n_jogos[i] < MINIMO_JOGOS_ANALISE:
+            resultados[time] = (None, 0.0, 0.0)
+            continue
+
+        stats_dict = {'jogos_analisados': int(n_jogos[i]), 'peso_total': float(peso_total[i])}
+        for j, campo in enumerate(CAMPOS_ESTATISTICAS):
+            stats_dict[campo + '_ponderado'] = float(somas[i, j])
+        if peso_total[i] > 0:
+            for j, campo in enumerate(CAMPOS_ESTATISTICAS):
+                stats_dict[campo] = float(somas[i, j] / peso_total[i])
+
+        resultados[time] = (stats_dict, float(consistencia[i]), float(media_gols[i]))
+
+    return resultados
+
+
+def calcular_estatisticas_times(df_liga, times, liga, num_jogos=10, indice_liga=None):
+    """Estatísticas avançadas ('geral') de vários times de uma liga em lote"""
+    if indice_liga is None:
+        indice_liga = construir_indice_liga(df_liga)
+
+    blocos = [_posicoes_ultimos_jogos(indice_liga, time, 'geral', num_jogos) for time in dict.fromkeys(times)]
+    estatisticas = {}
+    if blocos:
+        jogos = indice_liga['tabela'].take(np.concatenate(blocos))
+        if 'Date' in jogos.columns:
+            jogos = jogos.assign(peso_temporal=_pesos_temporais(jogos['Date'], [len(b) for b in blocos]))
+        estatisticas = calcular_estatisticas_lote(jogos, liga)
+
+    for time in times:
+        estatisticas.setdefault(time, (None, 0.0, 0.0))
+    return estatisticas
+
+
+def calcular_estatisticas_avancadas(jogos, time, cenario, liga):
+    """(stats_dict, consistencia, media_gols) do time nos `jogos`.
+
+    Aceita linhas do índice (com a coluna `Time`) ou linhas da planilha no formato casa/fora, que são
+    orientadas para a perspectiva do time antes do cálculo.
+    """
+    if 'Time' not in jogos.columns and not jogos.empty:
+        perspectiva = orientar_jogos(jogos, np.full(len(jogos), time, dtype=object))
+        if 'peso_temporal' in jogos.columns:
+            perspectiva['peso_temporal'] = jogos['peso_temporal']
+        jogos = perspectiva.assign(Time=time)
+    if jogos.empty or len(jogos) < MINIMO_JOGOS_ANALISE:
+        return None, 0.0, 0.0
+
+    return calcular_estatisticas_lote(jogos, liga)[time]
+
+
+def calcular_estatisticas_esperadas(stats_equipe, stats_oponente, fator_casa=1.0, fator_fora=1.0, fator_liga=1.0):
+    fator_ataque = 0.7
+    fator_defesa = 0.3
+    fator_liga_ajustado = 0.9 + (fator_liga * 0.2)
+
+    escanteios_esp = (stats_equipe.get('escanteios_casa', 5.0) * fator_ataque * fator_casa +
+                      stats_oponente.get('escanteios_fora', 5.0) * fator_defesa * fator_fora) * fator_liga_ajustado
+
+    finalizacoes_esp = (stats_equipe.get('finalizacoes_casa', 12.0) * fator_ataque * fator_casa +
+                        stats_oponente.get('finalizacoes_fora', 12.0) * fator_defesa * fator_fora) * fator_liga_ajustado
+
+    chutes_gol_esp = (stats_equipe.get('chutes_gol_casa', 4.0) * fator_ataque * fator_casa +
+                      stats_oponente.get('chutes_gol_fora', 4.0) * fator_defesa * fator_fora) * fator_liga_ajustado
+
+    cartoes_esp = (stats_equipe.get('cartoes_casa', 1.8) * fator_ataque * fator_casa +
+                   stats_oponente.get('cartoes_fora', 1.8) * fator_defesa * fator_fora) * fator_liga_ajustado
+
+    return {
+        'escanteios': max(2.0, min(15.0, escanteios_esp)),
+        'finalizacoes': max(5.0, min(25.0, finalizacoes_esp)),
+        'chutes_gol': max(1.0, min(10.0, chutes_gol_esp)),
+        'cartoes': max(0.5, min(6.0, cartoes_esp))
+    }
+
+
+# SIMULAÇÃO MONTE CARLO DOS TOTAIS (ESCANTEIOS, FINALIZAÇÕES, CHUTES AO GOL, CARTÕES)
+# Linhas over de cada estatística: P(total > linha); 'Over 8.5 Escanteios' = 9+ escanteios no jogo
+LINHAS_TOTAIS = {
+    'escanteios': [7.5, 8.5, 9.5],
+    'finalizacoes': [19.5, 24.5],
+    'chutes_gol': [7.5, 9.5],
+    'cartoes': [2.5, 3.5, 4.5],
+}
+NOMES_TOTAIS = {
+    'escanteios': 'Escanteios',
+    'finalizacoes': 'Finalizações',
+    'chutes_gol': 'Chutes Gol',
+    'cartoes': 'Cartões',
+}
+# Com 10 mil simulações o erro padrão de cada probabilidade fica abaixo de 0,5 ponto percentual
+SIMULACOES_MONTE_CARLO = int(os.environ.get('FUTALGORITHM_SIMULACOES', 10000))
+SEMENTE_MONTE_CARLO = 2024
+# Memória máxima de cada bloco de amostras (jogos x simulações, int64, mandante + visitante)
+LIMITE_BYTES_SIMULACAO = 64 * 1024 * 1024
+
+
+def chave_total(estatistica, linha):
+    return f'{estatistica}_over_{linha}'
+
+
+def coluna_total(estatistica, linha):
+    return f'Over {linha} {NOMES_TOTAIS[estatistica]}'
+
+
+def colunas_totais(estatistica):
+    return [coluna_total(estatistica, linha) for linha in LINHAS_TOTAIS[estatistica]]
+
+
+def estimar_dispersao(observados, esperados):
+    """Parâmetro k da binomial negativa (var = mu + mu²/k) pelos resíduos de cada jogo contra a sua média.
+
+    Como cada jogo é comparado com a própria média esperada, a diferença entre jogos (times fortes x fracos)
+    não entra na dispersão. Retorna None quando não há superdispersão (a simulação usa Poisson).
+    """
+    observados = np.asarray(observados, dtype=np.float64)
+    esperados = np.asarray(esperados, dtype=np.float64)
+    validos = ~np.isnan(observados) & ~np.isnan(esperados) & (esperados > 0)
+    if validos.sum() < 2:
+        return None
+    observados, esperados = observados[validos], esperados[validos]
+    excesso = np.mean((observados - esperados) ** 2) - esperados.mean()
+    if excesso <= 0:
+        return None
+    return np.mean(esperados ** 2) / excesso
+
+
+def gerador_liga(liga, semente=SEMENTE_MONTE_CARLO):
+    """Gerador reprodutível por liga, independente da ordem em que as ligas são processadas"""
+    return np.random.default_rng([semente, int(hashlib.sha1(str(liga).encode()).hexdigest()[:8], 16)])
+
+
+def _amostrar_contagens(medias, n_simulacoes, dispersao, gerador):
+    """Contagens (jogos x simulações): binomial negativa com `dispersao`, Poisson sem ela"""
+    medias = medias[:, None]
+    if dispersao:
+        return gerador.negative_binomial(dispersao, dispersao / (dispersao + medias), (len(medias), n_simulacoes))
+    return gerador.poisson(medias, (len(medias), n_simulacoes))
+
+
+def simular_totais(medias_casa, medias_fora, linhas, n_simulacoes=SIMULACOES_MONTE_CARLO, dispersao=None,
+                   gerador=None, limite_bytes=LIMITE_BYTES_SIMULACAO):
+    """P(total > linha) de cada jogo por simulação, em uma matriz (n_jogos x n_linhas).
+
+    Sorteia as contagens do mandante e do visitante de todos os jogos de uma vez, em blocos de no máximo
+    `limite_bytes`, e compara a soma com cada linha. Todas as linhas usam as mesmas amostras; o under de
+    uma linha é 1 - over.
+    """
+    if gerador is None:
+        gerador = np.random.default_rng(SEMENTE_MONTE_CARLO)
+    medias_casa = np.maximum(np.asarray(medias_casa, dtype=np.float64), 1e-9)
+    medias_fora = np.maximum(np.asarray(medias_fora, dtype=np.float64), 1e-9)
+    linhas = np.asarray(linhas, dtype=np.float64)
+    probabilidades = np.empty((len(medias_casa), len(linhas)))
+
+    bloco = max(1, int(limite_bytes // (2 * 8 * n_simulacoes)))
+    for inicio in range(0, len(medias_casa), bloco):
+        fatia = slice(inicio, inicio + bloco)
+        totais = (_amostrar_contagens(medias_casa[fatia], n_simulacoes, dispersao, gerador) +
+                  _amostrar_contagens(medias_fora[fatia], n_simulacoes, dispersao, gerador))
+        for j, linha in enumerate(linhas):
+            probabilidades[fatia, j] = np.count_nonzero(totais > linha, axis=1)
+    probabilidades /= n_simulacoes
+    return probabilidades
+
+
+def esperados_por_lado(tabela, campo):
+    """Média esperada de `campo` de cada linha do índice: força do time x concessão do adversário, no mesmo
+    mando, sobre a média da liga naquele mando (médias da temporada inteira)"""
+    esperados = np.full(len(tabela), np.nan)
+    for mandante in (True, False):
+        linhas = tabela['Mandante'].to_numpy() == mandante
+        lado = tabela.loc[linhas, ['Time', 'Adversario', campo]]
+        media_liga = lado[campo].mean()
+        if not media_liga > 0:
+            continue
+        ataque = lado.groupby('Time', observed=True)[campo].transform('mean').to_numpy()
+        concessao = lado.groupby('Adversario', observed=True)[campo].transform('mean').to_numpy()
+        esperados[linhas] = ataque * concessao / media_liga
+    return esperados
+
+
+def dispersoes_liga(indice_liga):
+    """k da binomial negativa de cada estatística, pelos resíduos da contagem de cada lado contra a média
+    esperada daquele lado no jogo.
+
+    As médias esperadas usam a temporada inteira, incluindo o próprio jogo; isso encolhe um pouco os
+    resíduos, então o k sai levemente maior (dispersão menor) do que o verdadeiro.
+    """
+    if indice_liga is None:
+        return {}
+    tabela = indice_liga['tabela']
+    dispersoes = {}
+    for estatistica in LINHAS_TOTAIS:
+        campo = f'{estatistica}_casa'
+        if campo in tabela.columns:
+            dispersoes[estatistica] = estimar_dispersao(tabela[campo].to_numpy(dtype=np.float64),
+                                                        esperados_por_lado(tabela, campo))
+    return dispersoes
+
+
+def probabilidades_totais(medias, liga, indice_liga=None, n_simulacoes=SIMULACOES_MONTE_CARLO):
+    """Probabilidades over (%) das linhas de LINHAS_TOTAIS para os jogos de uma liga.
+
+    `medias`: {estatistica: (array esperado do mandante, array esperado do visitante)}.
+    Retorna {chave_total(estatistica, linha): array}.
+    """
+    gerador = gerador_liga(liga)
+    dispersoes = dispersoes_liga(indice_liga)
+    saida = {}
+    for estatistica, linhas in LINHAS_TOTAIS.items():
+        medias_casa, medias_fora = medias[estatistica]
+        probabilidades = simular_totais(medias_casa, medias_fora, linhas, n_simulacoes,
+                                        dispersoes.get(estatistica), gerador)
+        for j, linha in enumerate(linhas):
+            saida[chave_total(estatistica, linha)] = probabilidades[:, j] * 100
+    return saida
+
+
+# MODELO DE FORÇA DOS TIMES (ATAQUE x DEFESA x MANDO)
+# Fonte dos lambdas de gols por liga: 'ponderada' (médias dos últimos jogos), 'poisson' (regressão ajustada)
+# ou 'dixon_coles' (ajuste com decaimento temporal e correção de placares baixos)
+FONTES_LAMBDAS = ('ponderada', 'poisson', 'dixon_coles')
+ALPHA_POISSON = 1e-3
+
+
+def ler_fontes_lambdas(texto):
+    """Fontes por liga de FUTALGORITHM_LAMBDAS: 'poisson' (todas), 'E0=dixon_coles,SC0=poisson' ou
+    'poisson,E0=dixon_coles' (padrão + exceções). Ligas sem entrada usam o padrão ('ponderada' se omitido)"""
+    fontes = {'default': 'ponderada'}
+    for entrada in texto.split(','):
+        liga, _, fonte = entrada.strip().rpartition('=')
+        if not fonte:
+            continue
+        if fonte.strip() not in FONTES_LAMBDAS:
+            raise ValueError(f"FUTALGORITHM_LAMBDAS: fonte '{fonte.strip()}' inválida; use {', '.join(FONTES_LAMBDAS)}")
+        fontes[liga.strip() or 'default'] = fonte.strip()
+    return fontes
+
+
+FONTE_LAMBDAS = ler_fontes_lambdas(os.environ.get('FUTALGORITHM_LAMBDAS', ''))
+
+# Último modelo ajustado por liga; seus coeficientes são o ponto de partida (warm start) do próximo ajuste
+MODELOS_AJUSTADOS = {}
+
+
+def fonte_lambdas_liga(liga):
+    return FONTE_LAMBDAS.get(liga, FONTE_LAMBDAS['default'])
+
+
+def montar_matriz_poisson(df_liga):
+    """Matriz esparsa de desenho com duas linhas por jogo (gols do mandante e gols do visitante).
+
+    Colunas: ataque de cada time, defesa de cada time e o indicador de mando.
+    Retorna (X, gols, times).
+    """
+    jogos = df_liga.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+    mandantes = jogos['HomeTeam'].astype(str).to_numpy()
+    visitantes = jogos['AwayTeam'].astype(str).to_numpy()
+    times = sorted(set(mandantes) | set(visitantes))
+    posicao = {time: i for i, time in enumerate(times)}
+
+    n_jogos, n_times = len(jogos), len(times)
+    casa = np.array([posicao[time] for time in mandantes], dtype=np.int64)
+    fora = np.array([posicao[time] for time in visitantes], dtype=np.int64)
+    linhas = np.arange(2 * n_jogos)
+
+    X = sparse.csr_matrix(
+        (np.ones(4 * n_jogos + n_jogos),
+         (np.r_[linhas, linhas, linhas[:n_jogos]],
+          np.r_[casa, fora, n_times + fora, n_times + casa, np.full(n_jogos, 2 * n_times)])),
+        shape=(2 * n_jogos, 2 * n_times + 1))
+    gols = np.r_[jogos['FTHG'].to_numpy(dtype=np.float64), jogos['FTAG'].to_numpy(dtype=np.float64)]
+    return X, gols, times
+
+
+def _coeficientes_iniciais(anterior, times):
+    """Coeficientes do ajuste anterior na ordem atual de times (times novos começam em zero)"""
+    ataque = np.array([anterior['ataque'][anterior['times'][t]] if t in anterior['times'] else 0.0 for t in times])
+    defesa = np.array([anterior['defesa'][anterior['times'][t]] if t in anterior['times'] else 0.0 for t in times])
+    return np.r_[ataque, defesa, anterior['casa']]
+
+
+def ajustar_modelo_poisson(df_liga, anterior=None):
+    """Regressão de Poisson ataque/defesa/mando sobre todos os jogos da liga.
+
+    Com `anterior`, o otimizador parte dos coeficientes do último ajuste e converge em poucas iterações.
+    """
+    X, gols, times = montar_matriz_poisson(df_liga)
+    if len(times) < 2:
+        return None
+
+    estimador = PoissonRegressor(alpha=ALPHA_POISSON, max_iter=300, warm_start=True)
+    if anterior is not None and anterior.get('tipo') == 'poisson':
+        estimador.coef_ = _coeficientes_iniciais(anterior, times)
+        estimador.intercept_ = anterior['intercepto']
+    estimador.fit(X, gols)
+
+    n_times = len(times)
+    return {
+        'tipo': 'poisson',
+        'times': {time: i for i, time in enumerate(times)},
+        'ataque': estimador.coef_[:n_times],
+        'defesa': estimador.coef_[n_times:2 * n_times],
+        'casa': float(estimador.coef_[-1]),
+        'intercepto': float(estimador.intercept_),
+        'rho': 0.0,
+        'jogos': X.shape[0] // 2,
+        'iteracoes': int(estimador.n_iter_)
+    }
+
+
+# DIXON-COLES (DECAIMENTO TEMPORAL + CORRELAÇÃO DE PLACARES BAIXOS)
+# Decaimento por dia do peso de cada jogo na verossimilhança (meia-vida de ~1 ano)
+XI_DIXON_COLES = 0.0019
+PENALIDADE_DIXON_COLES = 1e-3
+LIMITE_RHO = 0.2
+ARQUIVO_DIXON_COLES = '_dixon_coles.json'
+
+
+def preparar_jogos_dixon_coles(df_liga):
+    """Arrays do ajuste: índices de mandante/visitante, gols e pesos temporais. Retorna (dados, times)"""
+    jogos = df_liga.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+    mandantes = jogos['HomeTeam'].astype(str).to_numpy()
+    visitantes = jogos['AwayTeam'].astype(str).to_numpy()
+    times = sorted(set(mandantes) | set(visitantes))
+    posicao = {time: i for i, time in enumerate(times)}
+
+    datas = pd.to_datetime(jogos['Date'], errors='coerce', dayfirst=True) if 'Date' in jogos else pd.Series(pd.NaT, index=jogos.index)
+    dias = (datas.max() - datas).dt.days.to_numpy(dtype=np.float64) if datas.notna().any() else np.zeros(len(jogos))
+    dados = {
+        'casa': np.array([posicao[time] for time in mandantes], dtype=np.int64),
+        'fora': np.array([posicao[time] for time in visitantes], dtype=np.int64),
+        'gols_casa': jogos['FTHG'].to_numpy(dtype=np.float64),
+        'gols_fora': jogos['FTAG'].to_numpy(dtype=np.float64),
+        'pesos': np.exp(-XI_DIXON_COLES * np.nan_to_num(dias, nan=np.nanmax(dias, initial=0.0)))
+    }
+    return dados, times
+
+
+def verossimilhanca_dixon_coles(parametros, dados, n_times):
+    """Log-verossimilhança ponderada negativa e seu gradiente, vetorizados sobre todos os jogos.
+
+    parametros = [ataque (n_times), defesa (n_times), intercepto, mando, rho]
+    """
+    ataque, defesa = parametros[:n_times], parametros[n_times:2 * n_times]
+    intercepto, mando, rho = parametros[2 * n_times:]
+    casa, fora, x, y, w = dados['casa'], dados['fora'], dados['gols_casa'], dados['gols_fora'], dados['pesos']
+
+    lam = np.exp(intercepto + mando + ataque[casa] + defesa[fora])
+    mu = np.exp(intercepto + ataque[fora] + defesa[casa])
+
+    # Correção tau e suas derivadas (em relação a log lam, log mu e rho) nos placares 0x0, 0x1, 1x0 e 1x1
+    zero_zero, zero_um = (x == 0) & (y == 0), (x == 0) & (y == 1)
+    um_zero, um_um = (x == 1) & (y == 0), (x == 1) & (y == 1)
+    tau = np.select([zero_zero, zero_um, um_zero, um_um], [1 - lam * mu * rho, 1 + lam * rho, 1 + mu * rho, 1 - rho], 1.0)
+    tau = np.maximum(tau, 1e-10)
+    dtau_lam = np.select([zero_zero, zero_um], [-lam * mu * rho, lam * rho], 0.0) / tau
+    dtau_mu = np.select([zero_zero, um_zero], [-lam * mu * rho, mu * rho], 0.0) / tau
+    dtau_rho = np.select([zero_zero, zero_um, um_zero, um_um], [-lam * mu, lam, mu, -1.0], 0.0) / tau
+
+    log_vero = np.sum(w * (x * np.log(lam) - lam + y * np.log(mu) - mu + np.log(tau)))
+    penalidade = PENALIDADE_DIXON_COLES * (ataque @ ataque + defesa @ defesa)
+
+    g_casa = w * (x - lam + dtau_lam)
+    g_fora = w * (y - mu + dtau_mu)
+    gradiente = np.concatenate([
+        np.bincount(casa, g_casa, n_times) + np.bincount(fora, g_fora, n_times),
+        np.bincount(fora, g_casa, n_times) + np.bincount(casa, g_fora, n_times),
+        [g_casa.sum() + g_fora.sum(), g_casa.sum(), np.sum(w * dtau_rho)]
+    ])
+    gradiente[:2 * n_times] -= 2 * PENALIDADE_DIXON_COLES * parametros[:2 * n_times]
+    return -(log_vero - penalidade), -gradiente
+
+
+def ajustar_modelo_dixon_coles(df_liga, anterior=None):
+    """Ajuste Dixon-Coles por L-BFGS-B; parte do ajuste anterior e o reaproveita se os dados não mudaram"""
+    versao = calcular_versao_dados({'liga': df_liga})
+    if anterior is not None and anterior.get('tipo') == 'dixon_coles' and anterior.get('versao') == versao:
+        return anterior
+
+    dados, times = preparar_jogos_dixon_coles(df_liga)
+    n_times = len(times)
+    if n_times < 2:
+        return None
+
+    if anterior is not None and anterior.get('tipo') == 'dixon_coles':
+        inicial = np.r_[_coeficientes_iniciais(anterior, times)[:-1], anterior['intercepto'], anterior['casa'],
+                        anterior['rho']]
+    else:
+        media = max(np.average(dados['gols_fora'], weights=dados['pesos']), 0.1)
+        inicial = np.r_[np.zeros(2 * n_times), np.log(media), 0.2, 0.0]
+
+    limites = [(None, None)] * (2 * n_times + 2) + [(-LIMITE_RHO, LIMITE_RHO)]
+    resultado = optimize.minimize(verossimilhanca_dixon_coles, inicial, args=(dados, n_times), jac=True,
+                                  method='L-BFGS-B', bounds=limites)
+    parametros = resultado.x
+
+    return {
+        'tipo': 'dixon_coles',
+        'times': {time: i for i, time in enumerate(times)},
+        'ataque': parametros[:n_times],
+        'defesa': parametros[n_times:2 * n_times],
+        'casa': float(parametros[2 * n_times + 1]),
+        'intercepto': float(parametros[2 * n_times]),
+        'rho': float(parametros[-1]),
+        'jogos': len(dados['casa']),
+        'iteracoes': int(resultado.nit),
+        'versao': versao
+    }
+
+
+def carregar_parametros_dixon_coles(diretorio=DIRETORIO_DADOS):
+    """Parâmetros Dixon-Coles salvos em disco, para que a partida a frio pule o otimizador"""
+    caminho = os.path.join(diretorio, ARQUIVO_DIXON_COLES)
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            salvos = json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+    return {liga: dict(modelo, ataque=np.asarray(modelo['ataque']), defesa=np.asarray(modelo['defesa']))
+            for liga, modelo in salvos.items()}
+
+
+def salvar_parametros_dixon_coles(modelos, diretorio=DIRETORIO_DADOS):
+    salvos = carregar_parametros_dixon_coles(diretorio)
+    salvos.update({liga: modelo for liga, modelo in modelos.items() if modelo.get('tipo') == 'dixon_coles'})
+    serializavel = {liga: dict(modelo, ataque=np.asarray(modelo['ataque']).tolist(),
+                               defesa=np.asarray(modelo['defesa']).tolist())
+                    for liga, modelo in salvos.items()}
+
+    def escrever(caminho):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(serializavel, arquivo, ensure_ascii=False)
+
+    os.makedirs(diretorio, exist_ok=True)
+    _escrever_atomico(os.path.join(diretorio, ARQUIVO_DIXON_COLES), escrever)
+
+
+# Fonte de lambdas -> função de ajuste (df_liga, anterior) -> modelo
+AJUSTES_MODELO = {
+    'poisson': ajustar_modelo_poisson,
+    'dixon_coles': ajustar_modelo_dixon_coles,
+}
+
+
+def _ajustar_modelo_liga(df_liga, fonte, anterior):
+    return AJUSTES_MODELO[fonte](df_liga, anterior)
+
+
+@cronometrar('modelos', cache='modelos')
+@memorizar()
+def ajustar_modelos_lambdas(_todas_abas, versao_dados):
+    """Ajusta uma vez por versão dos dados os modelos das ligas que não usam a média ponderada"""
+    contar_falta_cache('modelos')
+    fontes = {liga: fonte_lambdas_liga(liga) for liga in _todas_abas}
+    fontes = {liga: fonte for liga, fonte in fontes.items() if fonte in AJUSTES_MODELO}
+    if not fontes:
+        return {}
+
+    def ajustar():
+        salvos = carregar_parametros_dixon_coles() if 'dixon_coles' in fontes.values() else {}
+        tarefas = {liga: (_todas_abas[liga], fonte, MODELOS_AJUSTADOS.get(liga) or salvos.get(liga))
+                   for liga, fonte in fontes.items()}
+        ajustados, _ = executar_por_liga(_ajustar_modelo_liga, tarefas, etapa='modelos')
+        ajustados = {liga: modelo for liga, modelo in ajustados.items() if modelo is not None}
+
+        if any(modelo['tipo'] == 'dixon_coles' for modelo in ajustados.values()):
+            try:
+                salvar_parametros_dixon_coles(ajustados)
+            except OSError:
+                pass
+        return ajustados
+
+    modelos = obter_artefato('modelos', [versao_dados, fontes], ajustar)
+    MODELOS_AJUSTADOS.update(modelos)
+    return modelos
+
+
+def lambdas_modelo(modelo, confrontos):
+    """Lambdas (casa, fora) lidos direto dos coeficientes, mais a máscara de times conhecidos pelo modelo"""
+    posicoes = modelo['times']
+    i_casa = np.array([posicoes.get(mandante, -1) for mandante, _ in confrontos], dtype=np.int64)
+    i_fora = np.array([posicoes.get(visitante, -1) for _, visitante in confrontos], dtype=np.int64)
+    conhecidos = (i_casa >= 0) & (i_fora >= 0)
+
+    ataque, defesa = modelo['ataque'], modelo['defesa']
+    lambda_casa = np.exp(modelo['intercepto'] + modelo['casa'] + ataque[i_casa] + defesa[i_fora])
+    lambda_fora = np.exp(modelo['intercepto'] + ataque[i_fora] + defesa[i_casa])
+    return lambda_casa, lambda_fora, conhecidos
+
+
+# Médias padrão de cada lado do confronto quando o time não tem peso acumulado
+PADROES_MEDIAS = {
+    'casa': {'gols_marcados_ft': 1.0, 'gols_sofridos_ft': 1.2, 'gols_marcados_ht': 0.5, 'gols_sofridos_ht': 0.6},
+    'fora': {'gols_marcados_ft': 0.8, 'gols_sofridos_ft': 1.0, 'gols_marcados_ht': 0.4, 'gols_sofridos_ht': 0.5},
+}
+
+
+def medias_lado(estatisticas, lado):
+    """Médias ponderadas de gols de uma lista de estatísticas de times, como {campo: array}"""
+    return {campo: np.array([stats_time.get(campo, padrao) for stats_time in estatisticas], dtype=np.float64)
+            for campo, padrao in PADROES_MEDIAS[lado].items()}
+
+
+def lambdas_ponderados(casa, fora, fator_liga):
+    """Lambdas de gols a partir das médias ponderadas dos dois times do confronto.
+
+    `casa` e `fora`: {campo: array} com gols_marcados/sofridos_ft/ht de cada lado.
+    Retorna (lambda_casa, lambda_fora, gols_ht_casa, gols_ht_fora).
+    """
+    lambda_casa = np.maximum(0.1, (casa['gols_marcados_ft'] * 0.7 + fora['gols_sofridos_ft'] * 0.3) * 1.1 * fator_liga)
+    lambda_fora = np.maximum(0.1, (fora['gols_marcados_ft'] * 0.7 + casa['gols_sofridos_ft'] * 0.3) * 0.9 * fator_liga)
+
+    gols_ht_casa = np.maximum(0.1, (casa['gols_marcados_ht'] * 0.7 + fora['gols_sofridos_ht'] * 0.3) * 1.1 * fator_liga)
+    gols_ht_fora = np.maximum(0.1, (fora['gols_marcados_ht'] * 0.7 + casa['gols_sofridos_ht'] * 0.3) * 0.9 * fator_liga)
+    return lambda_casa, lambda_fora, gols_ht_casa, gols_ht_fora
+
+
+def calcular_probabilidades_lote(df_liga, confrontos, liga, estatisticas=None, indice_liga=None,
+                                 max_gols=MAXIMO_GOLS_PLACAR, modelo=None, n_simulacoes=SIMULACOES_MONTE_CARLO):
+    """Probabilidades completas de vários confrontos (mandante, visitante) de uma liga.
+
+    Os mercados de gols saem de um único tensor de placares para todos os confrontos, e os totais de
+    LINHAS_TOTAIS de uma única simulação de todos eles (`n_simulacoes=0` dispensa os totais).
+    Com `modelo` (ver ajustar_modelos_lambdas), os lambdas de gols FT vêm dos coeficientes ajustados
+    e, no Dixon-Coles, os placares baixos recebem a correção rho.
+    Retorna uma lista de (resultados, valor_confianca), na ordem de `confrontos`.
+    """
+    confrontos = list(confrontos)
+    contar('jogos_modelados', len(confrontos))
+    if estatisticas is None:
+        times = [time for confronto in confrontos for time in confronto]
+        estatisticas = calcular_estatisticas_times(df_liga, times, liga, 10, indice_liga)
+
+    saida = [(None, 0.0)] * len(confrontos)
+    validos = []
+    for i, (mandante, visitante) in enumerate(confrontos):
+        stats_mandante, consistencia_mandante, media_gols_mandante = estatisticas.get(mandante, (None, 0.0, 0.0))
+        stats_visitante, consistencia_visitante, media_gols_visitante = estatisticas.get(visitante, (None, 0.0, 0.0))
+        if stats_mandante and stats_visitante:
+            validos.append((i, stats_mandante, consistencia_mandante, media_gols_mandante,
+                            stats_visitante, consistencia_visitante, media_gols_visitante))
+
+    if not validos:
+        return saida
+
+    fator_liga = FATORES_LIGA.get(liga, FATORES_LIGA['default'])
+    medias_casa = medias_lado([jogo[1] for jogo in validos], 'casa')
+    medias_fora = medias_lado([jogo[4] for jogo in validos], 'fora')
+    lambda_casa, lambda_fora, gols_ht_casa, gols_ht_fora = lambdas_ponderados(medias_casa, medias_fora, fator_liga)
+
+    rho = np.zeros(len(validos))
+    if modelo is not None:
+        modelo_casa, modelo_fora, conhecidos = lambdas_modelo(modelo, [confrontos[jogo[0]] for jogo in validos])
+        lambda_casa = np.where(conhecidos, modelo_casa, lambda_casa)
+        lambda_fora = np.where(conhecidos, modelo_fora, lambda_fora)
+        rho = np.where(conhecidos, modelo.get('rho', 0.0), 0.0)
+
+    placares = matriz_placares(lambda_casa, lambda_fora, max_gols)
+    if rho.any():
+        placares = corrigir_placares_baixos(placares, lambda_casa, lambda_fora, rho)
+    mercados = mercados_placares(placares)
+    prob_over_05_ht = 1 - np.exp(-(gols_ht_casa + gols_ht_fora))
+
+    esperadas = [(calcular_estatisticas_esperadas(jogo[1], jogo[4], fator_casa=1.1, fator_fora=0.9,
+                                                  fator_liga=fator_liga),
+                  calcular_estatisticas_esperadas(jogo[4], jogo[1], fator_casa=0.9, fator_fora=1.1,
+                                                  fator_liga=fator_liga))
+                 for jogo in validos]
+    totais = {}
+    if n_simulacoes:
+        totais = probabilidades_totais({estatistica: (np.array([casa[estatistica] for casa, _ in esperadas]),
+                                                      np.array([fora[estatistica] for _, fora in esperadas]))
+                                        for estatistica in LINHAS_TOTAIS}, liga, indice_liga, n_simulacoes)
+
+    for k, (i, stats_mandante, consistencia_mandante, media_gols_mandante,
+            stats_visitante, consistencia_visitante, media_gols_visitante) in enumerate(validos):
+        stats_casa_esp, stats_fora_esp = esperadas[k]
+
+        n_jogos_total = stats_mandante['jogos_analisados'] + stats_visitante['jogos_analisados']
+        media_gols_total = (media_gols_mandante + media_gols_visitante) / 2
+        consistencia_media = (consistencia_mandante + consistencia_visitante) / 2
+        nivel_confianca, valor_confianca = calcular_confianca_analise(n_jogos_total, consistencia_media,
+                                                                      media_gols_total)
+
+        resultados = {
+            'casa_vence': mercados['casa_vence'][k] * 100,
+            'empate': mercados['empate'][k] * 100,
+            'fora_vence': mercados['fora_vence'][k] * 100,
+            'gols_casa_esperados': lambda_casa[k],
+            'gols_fora_esperados': lambda_fora[k],
+            'gols_total_esperado': lambda_casa[k] + lambda_fora[k],
+            'gols_ht_total': (gols_ht_casa[k] + gols_ht_fora[k]),
+            'over_05_ht': prob_over_05_ht[k] * 100,
+            'over_05_ft': mercados['over_05_ft'][k] * 100,
+            'over_15_ft': mercados['over_15_ft'][k] * 100,
+            'over_25_ft': mercados['over_25_ft'][k] * 100,
+            'over_35_ft': mercados['over_35_ft'][k] * 100,
+            'btts_ft': mercados['btts_ft'][k] * 100,
+            'escanteios_casa_esp': stats_casa_esp['escanteios'],
+            'escanteios_fora_esp': stats_fora_esp['escanteios'],
+            'escanteios_total_esp': stats_casa_esp['escanteios'] + stats_fora_esp['escanteios'],
+            'finalizacoes_casa_esp': stats_casa_esp['finalizacoes'],
+            'finalizacoes_fora_esp': stats_fora_esp['finalizacoes'],
+            'finalizacoes_total_esp': stats_casa_esp['finalizacoes'] + stats_fora_esp['finalizacoes'],
+            'chutes_gol_casa_esp': stats_casa_esp['chutes_gol'],
+            'chutes_gol_fora_esp': stats_fora_esp['chutes_gol'],
+            'chutes_gol_total_esp': stats_casa_esp['chutes_gol'] + stats_fora_esp['chutes_gol'],
+            'cartoes_casa_esp': stats_casa_esp['cartoes'],
+            'cartoes_fora_esp': stats_fora_esp['cartoes'],
+            'cartoes_total_esp': stats_casa_esp['cartoes'] + stats_fora_esp['cartoes'],
+            'confianca': nivel_confianca,
+            'valor_confianca': valor_confianca,
+            'jogos_analisados': n_jogos_total,
+            'fator_liga': fator_liga
+        }
+        resultados.update({chave: probabilidades[k] for chave, probabilidades in totais.items()})
+        saida[i] = (resultados, valor_confianca)
+
+    return saida
+
+
+def calcular_probabilidades_completas(df_liga, mandante, visitante, liga, estatisticas=None, indice_liga=None,
+                                      modelo=None, n_simulacoes=0):
+    """Preço de um confronto avulso. Os totais simulados ficam de fora por padrão: simulá-los jogo a jogo
+    custaria uma simulação inteira por chamada; o quadro de previsões os simula por liga, de uma vez"""
+    return calcular_probabilidades_lote(df_liga, [(mandante, visitante)], liga, estatisticas, indice_liga,
+                                        modelo=modelo, n_simulacoes=n_simulacoes)[0]
+
+
+# RENDERIZAÇÃO DA TABELA DO SIMULADOR
+# Limites (alto, médio) das cores por tipo de coluna
+LIMITES_CORES = {
+    'resultado': (65, 55),
+    'over_under': (75, 60),
+    'btts': (70, 60),
+    'gols': (2.5, 1.5),
+    'escanteios': (10, 7),
+    'finalizacoes': (15, 10),
+    'chutes': (6, 4),
+    'cartoes': (4, 2.5),
+    'edge': (5, 0),
+}
+
+TAMANHOS_PAGINA = [25, 50, 100, 200]
+
+
+def _sem_acentos(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+def classificar_coluna(coluna):
+    """Tipo de cor de uma coluna, calculado uma vez por coluna (não por célula)"""
+    nome = _sem_acentos(coluna).lower()
+    if any(x in nome for x in ['vence', 'empate']):
+        return 'resultado'
+    for chave, tipo in [('over', 'over_under'), ('btts', 'btts'), ('gols', 'gols'), ('escanteios', 'escanteios'),
+                        ('finalizacoes', 'finalizacoes'), ('chutes', 'chutes'), ('cartoes', 'cartoes'),
+                        ('edge', 'edge')]:
+        if chave in nome:
+            return tipo
+    return ''
+
+
+def classes_css_coluna(valores, tipo):
+    """Classe CSS de todas as células de uma coluna com np.select"""
+    valores = pd.Series(valores)
+    if tipo not in LIMITES_CORES or valores.empty:
+        return np.full(len(valores), '', dtype=object)
+
+    if pd.api.types.is_numeric_dtype(valores):
+        numeros = valores.to_numpy(dtype=np.float64)
+    else:
+        numeros = pd.to_numeric(valores.astype(str).str.rstrip('%'), errors='coerce').to_numpy(dtype=np.float64)
+
+    alto, medio = LIMITES_CORES[tipo]
+    return np.select([numeros >= alto, numeros >= medio, ~np.isnan(numeros)],
+                     ['value-high', 'value-medium', 'value-low'], default='').astype(object)
+
+
+def aplicar_cores_valor(valor, tipo):
+    return classes_css_coluna([valor], tipo)[0]
+
+
+@cronometrar('tabela_html')
+def renderizar_tabela_html(df, colunas, inicio=0, fim=None):
+    """HTML da tabela do simulador apenas para as linhas [inicio, fim).
+
+    Tipos e cores são calculados por coluna; o HTML é montado por junção de partes.
+    """
+    pagina = df.iloc[inicio:fim]
+    contar('linhas_renderizadas', len(pagina))
+    celulas = []
+    for coluna in colunas:
+        classes = classes_css_coluna(pagina[coluna], classificar_coluna(coluna))
+        textos = formatar_coluna(pagina[coluna], coluna).map(html.escape).to_numpy()
+        celulas.append([f'<td class="{classe}">{texto}</td>' for classe, texto in zip(classes, textos)])
+
+    def partes():
+        yield '<div class="dataframe-container"><table class="dataframe-table"><thead><tr>'
+        yield ''.join(f'<th>{html.escape(coluna)}</th>' for coluna in colunas)
+        yield '</tr></thead><tbody>'
+        for linha in zip(*celulas):
+            yield '<tr>' + ''.join(linha) + '</tr>'
+        yield '</tbody></table></div>'
+
+    return ''.join(partes())
+
+
+# EXECUÇÃO PARALELA POR LIGA
+# 'thread' (padrão), 'processo' ou 'serial'; as abas de cada liga são independentes entre si
+MODO_EXECUCAO = os.environ.get('FUTALGORITHM_EXECUCAO', 'thread')
+MAXIMO_WORKERS = int(os.environ.get('FUTALGORITHM_WORKERS', 0)) or (os.cpu_count() or 1)
+
+# Tempo de cada liga na última execução de cada etapa: {etapa: {liga: {'segundos', 'worker'}}}
+TEMPOS_POR_LIGA = {}
+
+
+def _executar_cronometrado(funcao, argumentos):
+    inicio = time.perf_counter()
+    resultado = funcao(*argumentos)
+    worker = f"{os.getpid()}/{threading.current_thread().name}"
+    return resultado, time.perf_counter() - inicio, worker
+
+
+def _criar_executor(modo, max_workers):
+    if modo == 'processo' and 'fork' in multiprocessing.get_all_start_methods():
+        # fork: os workers herdam o módulo já carregado, sem reexecutar a interface
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork'))
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='liga')
+
+
+def executar_por_liga(funcao, tarefas, etapa=None, modo=None, max_workers=None):
+    """Executa funcao(*argumentos) para cada liga de `tarefas` ({liga: argumentos}).
+
+    Os resultados voltam na ordem de `tarefas`, independente da ordem de término.
+    Retorna ({liga: resultado}, {liga: {'segundos': float, 'worker': str}}).
+    """
+    modo = modo or MODO_EXECUCAO
+    max_workers = min(max_workers or MAXIMO_WORKERS, max(len(tarefas), 1))
+
+    if modo == 'serial' or max_workers <= 1 or len(tarefas) <= 1:
+        saidas = {liga: _executar_cronometrado(funcao, argumentos) for liga, argumentos in tarefas.items()}
+    else:
+        with _criar_executor(modo, max_workers) as executor:
+            futuros = {liga: executor.submit(_executar_cronometrado, funcao, argumentos)
+                       for liga, argumentos in tarefas.items()}
+            saidas = {liga: futuro.result() for liga, futuro in futuros.items()}
+
+    resultados = {liga: saida[0] for liga, saida in saidas.items()}
+    tempos = {liga: {'segundos': saida[1], 'worker': saida[2]} for liga, saida in saidas.items()}
+    if etapa:
+        TEMPOS_POR_LIGA[etapa] = tempos
+    return resultados, tempos
+
+
+# CACHE DE PREVISÕES (COMPARTILHADO ENTRE AS ABAS)
+def listar_confrontos(todas_abas, df_proximos_jogos):
+    """Confrontos (liga, mandante, visitante) dos próximos jogos que podem ser modelados"""
+    if df_proximos_jogos is None or df_proximos_jogos.empty or not todas_abas:
+        return ()
+
+    colunas = [c for c in ['Div', 'HomeTeam', 'AwayTeam'] if c in df_proximos_jogos.columns]
+    if len(colunas) < 3:
+        return ()
+
+    confrontos = set()
+    for liga, mandante, visitante in df_proximos_jogos[colunas].itertuples(index=False):
+        if liga in todas_abas and pd.notna(mandante) and pd.notna(visitante) and mandante and visitante:
+            confrontos.add((liga, mandante, visitante))
+    return tuple(sorted(confrontos))
+
+
+# Erros de dados de um jogo (coluna faltando, valor inválido); os demais são bugs e propagam
+ERROS_PREVISAO = (ArithmeticError, LookupError, TypeError, ValueError)
+
+
+def _prever_liga(df_liga, pares, liga, indice_liga, modelo=None):
+    """Previsões dos pares de uma liga em lote. Retorna (resultados, houve_falha).
+
+    Se o lote falha, o erro é registrado e os pares são refeitos um a um: só o jogo que falhar de novo
+    fica sem previsão.
+    """
+    try:
+        return calcular_probabilidades_lote(df_liga, pares, liga, indice_liga=indice_liga, modelo=modelo), False
+    except ERROS_PREVISAO:
+        logger.exception("Previsões em lote de %s falharam; refazendo jogo a jogo", liga)
+
+    resultados = []
+    for mandante, visitante in pares:
+        try:
+            resultados.extend(calcular_probabilidades_lote(df_liga, [(mandante, visitante)], liga,
+                                                           indice_liga=indice_liga, modelo=modelo))
+        except ERROS_PREVISAO:
+            logger.exception("Previsão de %s x %s (%s) falhou", mandante, visitante, liga)
+            contar('falhas_previsao', liga=liga)
+            resultados.append((None, 0.0))
+    return resultados, True
+
+
+@cronometrar('previsoes', cache='previsoes')
+@memorizar()
+def calcular_previsoes_jogos(_todas_abas, _indice_times, confrontos, versao_dados, _modelos=None):
+    """Modela cada confronto uma única vez por versão dos dados.
+
+    Retorna {(liga, mandante, visitante): resultados de calcular_probabilidades_completas ou None}.
+    """
+    contar_falta_cache('previsoes')
+    pares_por_liga = {}
+    for liga, mandante, visitante in confrontos:
+        pares_por_liga.setdefault(liga, []).append((mandante, visitante))
+
+    ligas_com_falha = set()
+
+    def prever():
+        modelos = _modelos or {}
+        tarefas = {liga: (_todas_abas[liga], pares, liga,
+                          obter_indice_liga(_indice_times, liga, _todas_abas[liga]), modelos.get(liga))
+                   for liga, pares in pares_por_liga.items()}
+        resultados_por_liga, _ = executar_por_liga(_prever_liga, tarefas, etapa='previsoes')
+
+        previsoes = {}
+        for liga, pares in pares_por_liga.items():
+            resultados, houve_falha = resultados_por_liga[liga]
+            if houve_falha:
+                ligas_com_falha.add(liga)
+            for (mandante, visitante), (prob, _) in zip(pares, resultados):
+                previsoes[(liga, mandante, visitante)] = prob
+        return previsoes
+
+    parametros = {liga: fonte_lambdas_liga(liga) for liga in pares_por_liga}
+    # Previsões que passaram pelo caminho de erro não vão para o disco: seriam servidas até os dados mudarem
+    return obter_artefato('previsoes', [versao_dados, confrontos, parametros, SIMULACOES_MONTE_CARLO], prever,
+                          gravar=lambda _: not ligas_com_falha)
+
+
+@cronometrar('obter_previsoes')
+def obter_previsoes(todas_abas, df_proximos_jogos, indice_times=None, versao_dados=None):
+    """Ponto único de acesso às previsões dos próximos jogos (Simulador, Dicas, CSV)"""
+    confrontos = listar_confrontos(todas_abas, df_proximos_jogos)
+    if not confrontos:
+        return {}
+    if versao_dados is None:
+        versao_dados = calcular_versao_dados(todas_abas)
+    modelos = ajustar_modelos_lambdas(todas_abas, versao_dados)
+    return calcular_previsoes_jogos(todas_abas, indice_times, confrontos, versao_dados, modelos)
+
+
+# Colunas do quadro de previsões: (chave em calcular_probabilidades_completas, formato de exibição)
+COLUNAS_PREVISAO = {
+    'Valor Confiança': ('valor_confianca', '{:.2f}'),
+    'Casa Vence': ('casa_vence', '{:.1f}%'),
+    'Empate': ('empate', '{:.1f}%'),
+    'Fora Vence': ('fora_vence', '{:.1f}%'),
+    'Gols HT': ('gols_ht_total', '{:.2f}'),
+    'Gols FT': ('gols_total_esperado', '{:.2f}'),
+    'Gols Casa Esp': ('gols_casa_esperados', '{:.2f}'),
+    'Gols Fora Esp': ('gols_fora_esperados', '{:.2f}'),
+    'Over 0.5 HT': ('over_05_ht', '{:.1f}%'),
+    'Over 0.5 FT': ('over_05_ft', '{:.1f}%'),
+    'Over 1.5 FT': ('over_15_ft', '{:.1f}%'),
+    'Over 2.5 FT': ('over_25_ft', '{:.1f}%'),
+    'Over 3.5 FT': ('over_35_ft', '{:.1f}%'),
+    'BTTS FT': ('btts_ft', '{:.1f}%'),
+    'Escanteios Casa Esp': ('escanteios_casa_esp', '{:.1f}'),
+    'Escanteios Fora Esp': ('escanteios_fora_esp', '{:.1f}'),
+    'Escanteios FT': ('escanteios_total_esp', '{:.1f}'),
+    'Finalizações Casa Esp': ('finalizacoes_casa_esp', '{:.1f}'),
+    'Finalizações Fora Esp': ('finalizacoes_fora_esp', '{:.1f}'),
+    'Finalizações FT': ('finalizacoes_total_esp', '{:.1f}'),
+    'Chutes Gol Casa Esp': ('chutes_gol_casa_esp', '{:.1f}'),
+    'Chutes Gol Fora Esp': ('chutes_gol_fora_esp', '{:.1f}'),
+    'Chutes Gol FT': ('chutes_gol_total_esp', '{:.1f}'),
+    'Cartões Casa Esp': ('cartoes_casa_esp', '{:.1f}'),
+    'Cartões Fora Esp': ('cartoes_fora_esp', '{:.1f}'),
+    'Cartões FT': ('cartoes_total_esp', '{:.1f}'),
+}
+COLUNAS_PREVISAO.update({coluna_total(estatistica, linha): (chave_total(estatistica, linha), '{:.1f}%')
+                         for estatistica, linhas in LINHAS_TOTAIS.items() for linha in linhas})
+
+
+# Colunas da camada de valor (odds) no quadro de previsões: formato de exibição
+FORMATOS_VALOR = {
+    'Edge': '{:+.1f}%',
+    'Odd Edge': '{:.2f}',
+    'Kelly': '{:.1f}%',
+}
+
+
+def formatar_coluna(serie, coluna):
+    """Texto de exibição/exportação de uma coluna numérica do quadro de previsões"""
+    if coluna in COLUNAS_PREVISAO or coluna in FORMATOS_VALOR:
+        formato = COLUNAS_PREVISAO[coluna][1] if coluna in COLUNAS_PREVISAO else FORMATOS_VALOR[coluna]
+        return serie.map(lambda valor: formato.format(valor) if pd.notna(valor) else '')
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.strftime('%d/%m/%Y').fillna('')
+    return serie.astype(str)
+
+
+def formatar_tabela(df, colunas):
+    """Cópia em texto das colunas escolhidas, para exibição ou CSV"""
+    return pd.DataFrame({coluna: formatar_coluna(df[coluna], coluna) for coluna in colunas}, index=df.index)
+
+
+@cronometrar('quadro_previsoes')
+def processar_todos_jogos_completos(todas_abas, df_proximos_jogos, indice_times=None, previsoes=None):
+    """Quadro numérico de previsões (float32, categorias, datas); a formatação fica para a exibição"""
+    linhas = []
+    posicoes = []
+
+    if df_proximos_jogos is not None and not df_proximos_jogos.empty:
+        if previsoes is None:
+            previsoes = obter_previsoes(todas_abas, df_proximos_jogos, indice_times)
+
+        for posicao, jogo in enumerate(df_proximos_jogos.to_dict('records')):
+            liga = jogo.get('Div', '')
+            mandante = jogo.get('HomeTeam', '')
+            visitante = jogo.get('AwayTeam', '')
+            prob = previsoes.get((liga, mandante, visitante))
+
+            if prob:
+                linha = {
+                    'Data': jogo.get('Date'),
+                    'Liga': mapeamento_ligas.get(liga, liga),
+                    'Casa': mandante,
+                    'Fora': visitante,
+                    'Confiança': prob['confianca'],
+                    'Jogos Analisados': prob['jogos_analisados'],
+                }
+                for coluna, (chave, _) in COLUNAS_PREVISAO.items():
+                    linha[coluna] = prob[chave]
+                linha['Score Confiança'] = prob['valor_confianca']
+                linhas.append(linha)
+                posicoes.append(posicao)
+
+    if not linhas:
+        return pd.DataFrame()
+
+    df_resultados = pd.DataFrame(linhas)
+    df_resultados['Data'] = pd.to_datetime(df_resultados['Data'], errors='coerce', dayfirst=True)
+    for coluna in ['Liga', 'Casa', 'Fora', 'Confiança']:
+        df_resultados[coluna] = df_resultados[coluna].astype('category')
+    df_resultados['Jogos Analisados'] = df_resultados['Jogos Analisados'].astype(np.int16)
+
+    # Camada de valor: odds do fixtures.xlsx contra as probabilidades do modelo
+    probabilidades = {chave: df_resultados[coluna].to_numpy(dtype=np.float64) / 100
+                      for chave, coluna in [('casa_vence', 'Casa Vence'), ('empate', 'Empate'),
+                                            ('fora_vence', 'Fora Vence'), ('over_25_ft', 'Over 2.5 FT')]}
+    probabilidades['under_25_ft'] = 1 - probabilidades['over_25_ft']
+    edge, mercado, odd, kelly = melhor_valor(probabilidades, extrair_odds(df_proximos_jogos.iloc[posicoes]))
+    df_resultados['Edge'] = edge * 100
+    df_resultados['Mercado Edge'] = pd.Categorical(mercado)
+    df_resultados['Odd Edge'] = odd
+    df_resultados['Kelly'] = kelly * 100
+
+    numericas = list(COLUNAS_PREVISAO) + list(FORMATOS_VALOR) + ['Score Confiança']
+    df_resultados[numericas] = df_resultados[numericas].astype(np.float32)
+
+    colunas = ['Data', 'Liga', 'Casa', 'Fora', 'Confiança', 'Valor Confiança', 'Jogos Analisados']
+    colunas += [c for c in df_resultados.columns if c not in colunas]
+    return (df_resultados[colunas]
+            .sort_values('Score Confiança', ascending=False, kind='stable')
+            .reset_index(drop=True))
+
+
+# Condições das sequências: chave -> (coluna do índice de times, mínimo). As '_individual' olham só o próprio time
+CONDICOES_SEQUENCIA = {
+    # ANÁLISE: SOMA DO JOGO (Over/Under, BTTS)
+    'over_05_ht': ('gols_ht_total', 1),
+    'over_15_ft': ('gols_ft_total', 2),
+    'over_25_ft': ('gols_ft_total', 3),
+    'over_35_ft': ('gols_ft_total', 4),
+    'btts': ('btts', 1),
+    'escanteios_9_mais': ('escanteios_total', 9),
+    'chutes_gol_4_mais': ('chutes_gol_total', 4),
+    'finalizacoes_10_mais': ('finalizacoes_total', 10),
+    'cartoes_3_mais': ('cartoes_total', 3),
+    # ANÁLISE: INDIVIDUAL (performance do time específico)
+    'finalizacoes_10_mais_individual': ('finalizacoes_casa', 10),
+    'chutes_gol_4_mais_individual': ('chutes_gol_casa', 4),
+    'escanteios_9_mais_individual': ('escanteios_casa', 9),
+    'cartoes_3_mais_individual': ('cartoes_casa', 3),
+}
+
+
+def analisar_sequencias_equipes(df_liga, time, num_jogos=5, indice_liga=None):
+    jogos = obter_ultimos_jogos_por_cenario(df_liga, time, 'geral', num_jogos, indice_liga)
+    if len(jogos) < num_jogos:
+        return {}
+
+    return {chave: int(np.count_nonzero(jogos[coluna].to_numpy(dtype=np.float64) >= minimo))
+            for chave, (coluna, minimo) in CONDICOES_SEQUENCIA.items()}
+
+
+# REGRAS DAS DICAS (DECLARATIVAS, AVALIADAS EM LOTE SOBRE TODOS OS JOGOS)
+# Sequência: 'mercado' de CONDICOES_SEQUENCIA analisado na 'soma' do jogo ou no time 'individual'; a dica sai
+# quando o 'lado' ('ambos', 'mandante' ou 'visitante') tem pelo menos 'acertos' nos últimos 'janela' jogos
+REGRAS_SEQUENCIA = [
+    # 🎯 OVER/UNDER GOLS (SOMA DO JOGO)
+    {'mercado': 'over_05_ht', 'analise': 'soma', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "⚽ Over 0.5 HT: Ambos times estiveram em jogos com gol no 1º tempo nos últimos 5 jogos (soma do jogo)"},
+    {'mercado': 'over_15_ft', 'analise': 'soma', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "⚽ Over 1.5 FT: Ambos times estiveram em jogos com mais de 1.5 gols totais nos últimos 5 jogos (soma do jogo)"},
+    {'mercado': 'over_25_ft', 'analise': 'soma', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "⚽ Over 2.5 FT: Ambos times estiveram em jogos com mais de 2.5 gols totais nos últimos 5 jogos (soma do jogo)"},
+    # 🎯 BTTS (SOMA DO JOGO)
+    {'mercado': 'btts', 'analise': 'soma', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🎯 BTTS: Ambos times estiveram em jogos onde as duas equipes marcaram nos últimos 5 jogos (soma do jogo)"},
+    # 🎯 FINALIZAÇÕES
+    {'mercado': 'finalizacoes_10_mais', 'analise': 'soma', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🎯 10+ Finalizações: Ambos times estiveram em jogos com 10+ finalizações totais (casa + fora) nos últimos 5 jogos"},
+    {'mercado': 'finalizacoes_10_mais', 'analise': 'individual', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🔥 Finalizações Individuais: Cada time individualmente fez 10+ finalizações em seus últimos 5 jogos"},
+    # 🎯 CHUTES AO GOL
+    {'mercado': 'chutes_gol_4_mais', 'analise': 'soma', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🥅 4+ Chutes no Gol: Ambos times estiveram em jogos com 4+ chutes no gol totais nos últimos 5 jogos"},
+    {'mercado': 'chutes_gol_4_mais', 'analise': 'individual', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🔥 Chutes Individuais: Cada time individualmente fez 4+ chutes no gol em seus últimos 5 jogos"},
+    # 🎯 ESCANTEIOS
+    {'mercado': 'escanteios_9_mais', 'analise': 'soma', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🔄 9+ Escanteios: Ambos times estiveram em jogos com 9+ escanteios totais nos últimos 5 jogos"},
+    {'mercado': 'escanteios_9_mais', 'analise': 'individual', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🔥 Escanteios Individuais: Cada time individualmente fez 9+ escanteios em seus últimos 5 jogos"},
+    # 🎯 CARTÕES
+    {'mercado': 'cartoes_3_mais', 'analise': 'soma', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🟨 3+ Cartões: Ambos times estiveram em jogos com 3+ cartões totais nos últimos 5 jogos"},
+    {'mercado': 'cartoes_3_mais', 'analise': 'individual', 'janela': 5, 'acertos': 5, 'lado': 'ambos',
+     'dica': "🔥 Cartões Individuais: Cada time individualmente recebeu 3+ cartões em seus últimos 5 jogos"},
+]
+
+# Probabilidade: previsão do 'mercado' acima do 'limiar' (%) em jogos com confiança acima de CONFIANCA_BAIXA.
+# A dica pode usar {mandante}, {visitante} e {valor}
+REGRAS_PROBABILIDADE = [
+    {'mercado': 'casa_vence', 'limiar': 65, 'dica': "💪 {mandante} tem {valor:.1f}% de chance de vitória"},
+    {'mercado': 'fora_vence', 'limiar': 65, 'dica': "💪 {visitante} tem {valor:.1f}% de chance de vitória"},
+    {'mercado': 'over_25_ft', 'limiar': 70, 'dica': "⚽ Over 2.5 Gols: {valor:.1f}% de probabilidade"},
+    {'mercado': 'btts_ft', 'limiar': 65, 'dica': "🎯 BTTS: {valor:.1f}% de probabilidade"},
+]
+
+
+def compilar_regras_sequencia(regras):
+    """Regras de sequência como arrays paralelos (uma posição por regra), prontos para avaliação em lote"""
+    condicoes = [CONDICOES_SEQUENCIA[regra['mercado'] + ('_individual' if regra['analise'] == 'individual' else '')]
+                 for regra in regras]
+    return {
+        'colunas': [coluna for coluna, _ in condicoes],
+        'minimos': np.array([minimo for _, minimo in condicoes], dtype=np.float64),
+        'janelas': np.array([regra['janela'] for regra in regras], dtype=np.int64),
+        'acertos': np.array([regra['acertos'] for regra in regras], dtype=np.float64),
+        'casa': np.array([regra['lado'] in ('ambos', 'mandante') for regra in regras]),
+        'fora': np.array([regra['lado'] in ('ambos', 'visitante') for regra in regras]),
+        'dicas': [regra['dica'] for regra in regras],
+        'tipos': [f"Sequência {regra['acertos']}/{regra['janela']}" for regra in regras],
+    }
+
+
+def contagens_sequencia(indice_liga, times, compiladas):
+    """Matriz (times x regras) com quantos dos últimos `janela` jogos de cada time cumprem a condição da regra.
+
+    NaN quando o time ainda não tem `janela` jogos.
+    """
+    tabela = indice_liga['tabela']
+    contagens = np.full((len(times), len(compiladas['colunas'])), np.nan)
+    for janela in np.unique(compiladas['janelas']):
+        regras = np.flatnonzero(compiladas['janelas'] == janela)
+        blocos = [_posicoes_ultimos_jogos(indice_liga, time, 'geral', janela) for time in times]
+        completos = np.array([len(bloco) == janela for bloco in blocos], dtype=bool)
+        if not completos.any():
+            continue
+
+        linhas = np.concatenate([bloco for bloco, completo in zip(blocos, completos) if completo])
+        cumpridas = np.column_stack([tabela[compiladas['colunas'][r]].to_numpy(dtype=np.float64)[linhas]
+                                     >= compiladas['minimos'][r] for r in regras])
+        contagens[np.ix_(completos, regras)] = cumpridas.reshape(-1, janela, len(regras)).sum(axis=1)
+    return contagens
+
+
+def avaliar_regras_sequencia(contagens_casa, contagens_fora, compiladas):
+    """Matriz booleana (jogos x regras): a regra dispara quando os lados exigidos atingem os acertos"""
+    with np.errstate(invalid='ignore'):
+        casa = contagens_casa >= compiladas['acertos']
+        fora = contagens_fora >= compiladas['acertos']
+    return (casa | ~compiladas['casa']) & (fora | ~compiladas['fora'])
+
+
+def _descrever_jogos(jogos):
+    """Data formatada, 'Mandante x Visitante' e nome da liga de cada jogo"""
+    datas = jogos['Date'] if 'Date' in jogos.columns else [''] * len(jogos)
+    return (
+        [data.strftime('%d/%m/%Y') if hasattr(data, 'strftime') else str(data) for data in datas],
+        [f"{mandante} x {visitante}" for mandante, visitante in zip(jogos['HomeTeam'], jogos['AwayTeam'])],
+        [mapeamento_ligas.get(liga, liga) for liga in jogos['Div']],
+    )
+
+
+@cronometrar('dicas_probabilidade')
+def gerar_dicas_inteligentes(df_proximos_jogos, todas_abas, indice_times=None, previsoes=None,
+                             regras=REGRAS_PROBABILIDADE):
+    """Dicas de probabilidade: todas as regras avaliadas de uma vez sobre a matriz jogos x mercados"""
+    if df_proximos_jogos is None or todas_abas is None:
+        return []
+    jogos = df_proximos_jogos.reset_index(drop=True)
+    if jogos.empty or not {'Div', 'HomeTeam', 'AwayTeam'} <= set(jogos.columns):
+        return []
+
+    if previsoes is None:
+        previsoes = obter_previsoes(todas_abas, df_proximos_jogos, indice_times)
+
+    mercados = [regra['mercado'] for regra in regras]
+    vazio = [np.nan] * len(mercados)
+    probs = [previsoes.get((liga, mandante, visitante)) if liga in todas_abas else None
+             for liga, mandante, visitante in zip(jogos['Div'], jogos['HomeTeam'], jogos['AwayTeam'])]
+    valores = np.array([[prob.get(mercado, np.nan) for mercado in mercados] if prob else vazio for prob in probs],
+                       dtype=np.float64).reshape(len(jogos), len(mercados))
+    confianca = np.array([prob['valor_confianca'] if prob else np.nan for prob in probs], dtype=np.float64)
+
+    with np.errstate(invalid='ignore'):
+        disparos = (valores > np.array([regra['limiar'] for regra in regras], dtype=np.float64)) & \
+                   (confianca > CONFIANCA_BAIXA)[:, None]
+
+    datas, confrontos, ligas = _descrever_jogos(jogos)
+    dicas_todas = []
+    for i, r in zip(*np.nonzero(disparos)):
+        dicas_todas.append({
+            'Data': datas[i],
+            'Jogo': confrontos[i],
+            'Liga': ligas[i],
+            'Dica': regras[r]['dica'].format(mandante=jogos['HomeTeam'].iat[i], visitante=jogos['AwayTeam'].iat[i],
+                                             valor=valores[i, r]),
+            'Confiança': probs[i]['confianca'],
+            'Tipo': 'Probabilidade'
+        })
+    return dicas_todas
+
+
+def _dicas_sequencias_liga(jogos_liga, df_liga, indice_liga, regras=REGRAS_SEQUENCIA):
+    """Dicas de sequência dos jogos de uma liga, como (posição original do jogo, dica)"""
+    compiladas = compilar_regras_sequencia(regras)
+    mandantes, visitantes = jogos_liga['HomeTeam'].to_numpy(dtype=object), jogos_liga['AwayTeam'].to_numpy(dtype=object)
+    times = list(dict.fromkeys(np.r_[mandantes, visitantes]))
+    linha = {time: i for i, time in enumerate(times)}
+
+    # Última linha toda NaN: times sem índice (ou sem nome) nunca disparam regras
+    contagens = np.vstack([contagens_sequencia(indice_liga, times, compiladas),
+                           np.full((1, len(regras)), np.nan)])
+    casa = np.array([linha.get(time, -1) for time in mandantes], dtype=np.int64)
+    fora = np.array([linha.get(time, -1) for time in visitantes], dtype=np.int64)
+    disparos = avaliar_regras_sequencia(contagens[casa], contagens[fora], compiladas)
+
+    datas, confrontos, ligas = _descrever_jogos(jogos_liga)
+    posicoes = jogos_liga.index
+    return [(posicoes[i], {
+        'Data': datas[i],
+        'Jogo': confrontos[i],
+        'Liga': ligas[i],
+        'Dica': compiladas['dicas'][r],
+        'Tipo': compiladas['tipos'][r],
+        'Confiança': 'Alta'
+    }) for i, r in zip(*np.nonzero(disparos))]
+
+
+@cronometrar('dicas_sequencias')
+def gerar_dicas_sequencias(df_proximos_jogos, todas_abas, indice_times=None):
+    dicas_sequencias = []
+
+    if df_proximos_jogos is None or todas_abas is None:
+        return dicas_sequencias
+
+    jogos = df_proximos_jogos.reset_index(drop=True)
+    tarefas = {}
+    for liga, jogos_liga in jogos.groupby(jogos.get('Div', pd.Series('', index=jogos.index)), sort=False):
+        if liga in todas_abas:
+            tarefas[liga] = (jogos_liga, todas_abas[liga], obter_indice_liga(indice_times, liga, todas_abas[liga]))
+
+    resultados, _ = executar_por_liga(_dicas_sequencias_liga, tarefas, etapa='dicas_sequencias')
+    dicas_ordenadas = sorted((item for dicas in resultados.values() for item in dicas), key=lambda item: item[0])
+    return [dica for _, dica in dicas_ordenadas]
+
+
+# VALOR ESPERADO E ROI (ODDS DAS PLANILHAS X PROBABILIDADES DO MODELO)
+# Mercado -> (chave da probabilidade, sufixo da coluna de odd)
+MERCADOS_ODDS = {
+    'Casa': ('casa_vence', 'H'),
+    'Empate': ('empate', 'D'),
+    'Fora': ('fora_vence', 'A'),
+    'Over 2.5': ('over_25_ft', '>2.5'),
+    'Under 2.5': ('under_25_ft', '<2.5'),
+}
+FRACAO_KELLY = 0.25
+EDGE_MINIMO = 0.05
+
+
+def extrair_odds(df, casas=CASAS_ODDS):
+    """Odd de cada mercado pela primeira casa disponível na ordem de preferência.
+
+    Retorna {chave da probabilidade: array} com NaN quando nenhuma casa tem odd válida.
+    """
+    odds = {}
+    for chave, sufixo in MERCADOS_ODDS.values():
+        valores = np.full(len(df), np.nan)
+        for coluna in reversed([casa + sufixo for casa in casas if casa + sufixo in df.columns]):
+            atual = pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype=np.float64)
+            valores = np.where(atual > 1, atual, valores)
+        odds[chave] = valores
+    return odds
+
+
+def calcular_edge(probabilidades, odds):
+    """Valor esperado por unidade apostada (probabilidades entre 0 e 1)"""
+    return probabilidades * odds - 1
+
+
+def calcular_kelly(probabilidades, odds, fracao=FRACAO_KELLY):
+    """Fração da banca pelo critério de Kelly fracionado; zero quando não há valor"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kelly = (probabilidades * odds - 1) / (odds - 1)
+    return np.clip(np.nan_to_num(kelly, nan=0.0), 0.0, 1.0) * fracao
+
+
+def melhor_valor(probabilidades, odds):
+    """Mercado de maior edge de cada jogo.
+
+    `probabilidades` e `odds`: {chave: array}, probabilidades entre 0 e 1.
+    Retorna (edge, mercado, odd, kelly); edge NaN e mercado '-' quando o jogo não tem odds.
+    """
+    chaves = [chave for chave, _ in MERCADOS_ODDS.values()]
+    p = np.column_stack([probabilidades[chave] for chave in chaves])
+    o = np.column_stack([odds[chave] for chave in chaves])
+    edges = np.where(np.isnan(o) | np.isnan(p), -np.inf, calcular_edge(p, o))
+
+    melhor = edges.argmax(axis=1)
+    linhas = np.arange(len(edges))
+    com_odds = np.isfinite(edges[linhas, melhor])
+    edge = np.where(com_odds, edges[linhas, melhor], np.nan)
+    mercado = np.where(com_odds, np.array(list(MERCADOS_ODDS), dtype=object)[melhor], '-')
+    odd = np.where(com_odds, o[linhas, melhor], np.nan)
+    return edge, mercado, odd, calcular_kelly(p[linhas, melhor], odd)
+
+
+def simular_roi(probabilidades, odds, acertos, confianca, limiares_confianca, edge_minimo=EDGE_MINIMO):
+    """Yield de stake fixo para vários limiares de confiança com um único produto matricial.
+
+    Aposta quando há odd, edge >= edge_minimo e confiança >= limiar. Probabilidades entre 0 e 1.
+    Retorna um DataFrame com uma linha por limiar.
+    """
+    limiares = np.atleast_1d(np.asarray(limiares_confianca, dtype=np.float64))
+    com_odds = ~np.isnan(odds) & ~np.isnan(probabilidades)
+    candidatas = com_odds & (np.where(com_odds, calcular_edge(probabilidades, odds), -np.inf) >= edge_minimo)
+    retorno = np.where(candidatas, np.where(acertos, odds - 1, -1.0), 0.0)
+
+    apostas = candidatas[None, :] & (np.nan_to_num(confianca, nan=-1.0)[None, :] >= limiares[:, None])
+    n_apostas = apostas.sum(axis=1)
+    lucro = apostas @ retorno
+    return pd.DataFrame({
+        'Confiança Mínima': limiares,
+        'Apostas': n_apostas,
+        'Acertos': apostas @ np.asarray(acertos, dtype=np.int64),
+        'Lucro': lucro,
+        'ROI': np.where(n_apostas > 0, lucro / np.maximum(n_apostas, 1) * 100, np.nan),
+    })
+
+
+# BACKTEST WALK-FORWARD (CADA JOGO PREVISTO SÓ COM OS JOGOS ANTERIORES)
+# Mercado -> (chave da probabilidade, limiar em % a partir do qual o sistema indica a aposta)
+MERCADOS_BACKTEST = {
+    'Vitória Casa': ('casa_vence', 65),
+    'Vitória Fora': ('fora_vence', 65),
+    '1X (Casa/Empate)': ('casa_ou_empate', 75),
+    'X2 (Fora/Empate)': ('fora_ou_empate', 75),
+    'Over 0.5 HT': ('over_05_ht', 75),
+    'Over 0.5 FT': ('over_05_ft', 75),
+    'Over 1.5 FT': ('over_15_ft', 75),
+    'Over 2.5 FT': ('over_25_ft', 70),
+    'Over 3.5 FT': ('over_35_ft', 75),
+    'BTTS FT': ('btts_ft', 65),
+}
+# Nas ligas com modelo ajustado (poisson, dixon_coles), o backtest o reajusta a cada tantos dias
+DIAS_REAJUSTE_BACKTEST = 7
+
+
+def lambdas_walk_forward(df_liga, jogo_ids, fonte, dias_reajuste=DIAS_REAJUSTE_BACKTEST):
+    """Lambdas do modelo `fonte` para os jogos `jogo_ids` (posições na aba), cada um vindo de um ajuste que
+    só viu jogos de datas anteriores. Cada reajuste parte do anterior (warm start).
+
+    Retorna (lambda_casa, lambda_fora, rho, conhecidos); fora de `conhecidos` vale a média ponderada.
+    """
+    df_liga = df_liga.reset_index(drop=True)
+    datas = pd.to_datetime(df_liga['Date'], errors='coerce', dayfirst=True).to_numpy(dtype='datetime64[ns]')
+    alvo = datas[jogo_ids]
+    lambda_casa, lambda_fora = np.full(len(jogo_ids), np.nan), np.full(len(jogo_ids), np.nan)
+    rho, conhecidos = np.zeros(len(jogo_ids)), np.zeros(len(jogo_ids), dtype=bool)
+    if np.isnat(alvo).all():
+        return lambda_casa, lambda_fora, rho, conhecidos
+
+    passo = np.timedelta64(dias_reajuste, 'D')
+    corte, ultimo = np.nanmin(alvo), np.nanmax(alvo)
+    anterior = None
+    while corte <= ultimo:
+        bloco = np.flatnonzero((alvo >= corte) & (alvo < corte + passo))
+        treino = df_liga[datas < corte]
+        if len(bloco) and len(treino):
+            modelo = AJUSTES_MODELO[fonte](treino, anterior)
+            if modelo is not None:
+                anterior = modelo
+                confrontos = [(str(mandante), str(visitante)) for mandante, visitante in
+                              df_liga[['HomeTeam', 'AwayTeam']].to_numpy()[jogo_ids[bloco]]]
+                lambda_casa[bloco], lambda_fora[bloco], conhecidos[bloco] = lambdas_modelo(modelo, confrontos)
+                rho[bloco] = modelo.get('rho', 0.0)
+        corte = corte + passo
+    return lambda_casa, lambda_fora, rho, conhecidos & ~np.isnan(lambda_casa)
+
+
+def backtest_liga(indice_liga, liga, num_jogos=10, df_liga=None, fonte='ponderada'):
+    """Replay walk-forward de uma liga na ordem das datas.
+
+    Cada jogo é previsto só com os jogos anteriores de cada time, como em calcular_probabilidades_lote.
+    As janelas saem de somas acumuladas por time, então o custo é linear no número de jogos. Com uma
+    `fonte` de modelo ajustado (e `df_liga`), os lambdas FT vêm de lambdas_walk_forward, como no Simulador.
+    Retorna um DataFrame com uma linha por jogo: probabilidades (%), resultados observados, dicas 5/5
+    e, com `df_liga`, as odds de cada mercado.
+    """
+    tabela = indice_liga['tabela']
+    if tabela.empty:
+        return pd.DataFrame()
+
+    n = len(tabela)
+    linhas = np.arange(n)
+    times = tabela['Time'].to_numpy()
+    inicios = np.flatnonzero(np.r_[True, times[1:] != times[:-1]])
+    inicio_linha = np.repeat(inicios, np.diff(np.r_[inicios, n]))
+
+    def janela_anterior(valores, tamanho):
+        """Somas de `valores` nas `tamanho` linhas anteriores do mesmo time (sem a linha atual)"""
+        acumulado = np.concatenate([np.zeros((1,) + valores.shape[1:]), np.cumsum(valores, axis=0)])
+        return acumulado[linhas] - acumulado[np.maximum(linhas - tamanho, inicio_linha)]
+
+    # Peso temporal relativo à data mais recente da liga: na média ponderada o fator comum se cancela
+    if 'Date' in tabela.columns:
+        dias = tabela['Date'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.float64)
+        dias[np.isnat(tabela['Date'].to_numpy(dtype='datetime64[ns]'))] = np.nan
+        pesos = PESO_JOGOS_RECENTES ** ((np.nanmax(dias, initial=0.0) - dias) / 30)
+        pesos = np.where(np.isnan(pesos), 1.0, pesos)
+    else:
+        pesos = np.ones(n)
+
+    fator_liga = FATORES_LIGA.get(liga, FATORES_LIGA['default'])
+    campos = ['gols_marcados_ft', 'gols_sofridos_ft', 'gols_marcados_ht', 'gols_sofridos_ht']
+    valores = tabela[campos].to_numpy(dtype=np.float64)
+    gols = valores[:, 0]
+    somas = janela_anterior(np.column_stack([valores * pesos[:, None], pesos, np.ones(n), gols, gols ** 2]), num_jogos)
+
+    peso_total, n_jogos = somas[:, 4], somas[:, 5]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        medias = somas[:, :4] / peso_total[:, None] * fator_liga
+        media_gols = somas[:, 6] / n_jogos
+        consistencia = 1.0 - np.sqrt(np.maximum(somas[:, 7] / n_jogos - media_gols ** 2, 0.0)) / np.maximum(1, media_gols)
+
+    # Linha do mandante e do visitante de cada jogo
+    jogo_id = tabela['jogo_id'].to_numpy()
+    mandante = tabela['Mandante'].to_numpy(dtype=bool)
+    linha_casa = np.empty(jogo_id.max() + 1, dtype=np.int64)
+    linha_fora = np.empty(jogo_id.max() + 1, dtype=np.int64)
+    linha_casa[jogo_id[mandante]] = linhas[mandante]
+    linha_fora[jogo_id[~mandante]] = linhas[~mandante]
+
+    jogos = pd.DataFrame({
+        'Liga': liga,
+        'Fonte': fonte,
+        'Date': tabela['Date'].to_numpy()[linha_casa] if 'Date' in tabela.columns else pd.NaT,
+        'HomeTeam': times[linha_casa],
+        'AwayTeam': times[linha_fora],
+    })
+
+    # Previsões: só jogos em que os dois times já têm o mínimo de jogos anteriores
+    validos = (n_jogos[linha_casa] >= MINIMO_JOGOS_ANALISE) & (n_jogos[linha_fora] >= MINIMO_JOGOS_ANALISE)
+    casa, fora = linha_casa[validos], linha_fora[validos]
+    lambda_casa, lambda_fora, gols_ht_casa, gols_ht_fora = lambdas_ponderados(
+        {campo: medias[casa, j] for j, campo in enumerate(campos)},
+        {campo: medias[fora, j] for j, campo in enumerate(campos)}, fator_liga)
+
+    placares = None
+    if fonte in AJUSTES_MODELO and df_liga is not None and 'Date' in df_liga.columns:
+        modelo_casa, modelo_fora, rho, conhecidos = lambdas_walk_forward(df_liga, jogo_id[casa], fonte)
+        lambda_casa = np.where(conhecidos, modelo_casa, lambda_casa)
+        lambda_fora = np.where(conhecidos, modelo_fora, lambda_fora)
+        rho = np.where(conhecidos, rho, 0.0)
+        if rho.any():
+            placares = corrigir_placares_baixos(matriz_placares(lambda_casa, lambda_fora), lambda_casa, lambda_fora,
+                                                rho)
+    if placares is None:
+        placares = matriz_placares(lambda_casa, lambda_fora)
+
+    probabilidades = mercados_placares(placares)
+    probabilidades['over_05_ht'] = 1 - np.exp(-(gols_ht_casa + gols_ht_fora))
+    probabilidades['casa_ou_empate'] = probabilidades['casa_vence'] + probabilidades['empate']
+    probabilidades['fora_ou_empate'] = probabilidades['fora_vence'] + probabilidades['empate']
+    probabilidades['under_25_ft'] = 1 - probabilidades['over_25_ft']
+    _, valores_confianca = calcular_confianca_lote(n_jogos[casa] + n_jogos[fora],
+                                                   (consistencia[casa] + consistencia[fora]) / 2,
+                                                   (media_gols[casa] + media_gols[fora]) / 2)
+
+    jogos['valor_confianca'] = np.nan
+    jogos.loc[validos, 'valor_confianca'] = valores_confianca
+    for chave, valores_mercado in probabilidades.items():
+        jogos[f'prob_{chave}'] = np.nan
+        jogos.loc[validos, f'prob_{chave}'] = valores_mercado * 100
+
+    # Resultados observados, na perspectiva do mandante
+    gols_casa = tabela['gols_marcados_ft'].to_numpy()[linha_casa]
+    gols_fora = tabela['gols_sofridos_ft'].to_numpy()[linha_casa]
+    total = gols_casa + gols_fora
+    jogos['resultado_casa_vence'] = gols_casa > gols_fora
+    jogos['resultado_empate'] = gols_casa == gols_fora
+    jogos['resultado_fora_vence'] = gols_casa < gols_fora
+    jogos['resultado_casa_ou_empate'] = gols_casa >= gols_fora
+    jogos['resultado_fora_ou_empate'] = gols_casa <= gols_fora
+    jogos['resultado_over_05_ht'] = tabela['gols_ht_total'].to_numpy()[linha_casa] > 0.5
+    for limite in ['05', '15', '25', '35']:
+        jogos[f'resultado_over_{limite}_ft'] = total > int(limite) / 10
+    jogos['resultado_under_25_ft'] = total < 2.5
+    jogos['resultado_btts_ft'] = (gols_casa > 0) & (gols_fora > 0)
+
+    # Odds da planilha: jogo_id é a posição da linha na aba
+    if df_liga is not None:
+        for chave, valores in extrair_odds(df_liga.reset_index(drop=True)).items():
+            jogos[f'odd_{chave}'] = valores
+
+    # Dicas de sequência: as regras avaliadas com os jogos anteriores (janela completa); acerta se a condição
+    # se cumprir neste jogo para os lados exigidos
+    compiladas = compilar_regras_sequencia(REGRAS_SEQUENCIA)
+    condicoes = np.column_stack([tabela[coluna].to_numpy(dtype=np.float64) >= minimo
+                                 for coluna, minimo in zip(compiladas['colunas'], compiladas['minimos'])])
+    contagens = np.full(condicoes.shape, np.nan)
+    for janela in np.unique(compiladas['janelas']):
+        regras = compiladas['janelas'] == janela
+        completas = janela_anterior(np.ones((n, 1)), janela)[:, 0] == janela
+        contagens[completas[:, None] & regras] = janela_anterior(condicoes[:, regras].astype(np.float64),
+                                                                 janela)[completas].ravel()
+    dicas = avaliar_regras_sequencia(contagens[linha_casa], contagens[linha_fora], compiladas)
+    acertos = (condicoes[linha_casa] | ~compiladas['casa']) & (condicoes[linha_fora] | ~compiladas['fora'])
+    jogos['dicas_5_5'] = dicas.sum(axis=1)
+    jogos['acertos_5_5'] = (dicas & acertos).sum(axis=1)
+
+    return jogos.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+@cronometrar('backtest', cache='backtest')
+@memorizar()
+def calcular_backtest(_todas_abas, _indice_times, versao_dados):
+    """Backtest de todas as ligas, em paralelo por liga, uma vez por versão dos dados, cada liga com a
+    fonte de lambdas que o Simulador usa nela"""
+    contar_falta_cache('backtest')
+    tarefas = {liga: (obter_indice_liga(_indice_times, liga, df_liga), liga, 10, df_liga, fonte_lambdas_liga(liga))
+               for liga, df_liga in _todas_abas.items()}
+    resultados, _ = executar_por_liga(backtest_liga, tarefas, etapa='backtest')
+    frames = [jogos for jogos in resultados.values() if not jogos.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def formatar_percentual(valor):
+    return '-' if pd.isna(valor) else f'{valor:.1f}%'
+
+
+def formatar_decimal(valor):
+    return '-' if pd.isna(valor) else f'{valor:.2f}'
+
+
+def resumir_backtest(jogos, confianca_minima=0.0):
+    """Acertos, erros e ROI (stake fixo, odds da planilha) por mercado das apostas que o sistema indicaria"""
+    linhas = []
+    if jogos.empty:
+        return pd.DataFrame(linhas)
+
+    filtro = jogos['valor_confianca'].to_numpy() >= confianca_minima
+    for mercado, (chave, limiar) in MERCADOS_BACKTEST.items():
+        apostas = filtro & (jogos[f'prob_{chave}'].to_numpy() >= limiar)
+        resultado = jogos[f'resultado_{chave}'].to_numpy()
+        acertos = int(np.count_nonzero(apostas & resultado))
+        roi = np.nan
+        if f'odd_{chave}' in jogos.columns:
+            odds = jogos[f'odd_{chave}'].to_numpy()
+            com_odds = apostas & ~np.isnan(odds)
+            if com_odds.any():
+                roi = np.where(resultado[com_odds], odds[com_odds] - 1, -1.0).mean() * 100
+        linhas.append({'Mercado': mercado, 'Apostas': int(apostas.sum()), 'Acertos': acertos,
+                       'Erros': int(apostas.sum()) - acertos,
+                       'Prob. Média': float(jogos.loc[apostas, f'prob_{chave}'].mean()) if apostas.any() else np.nan,
+                       'ROI': roi})
+
+    dicas = int(jogos['dicas_5_5'].sum())
+    acertos = int(jogos['acertos_5_5'].sum())
+    linhas.append({'Mercado': 'Sequências 5/5', 'Apostas': dicas, 'Acertos': acertos, 'Erros': dicas - acertos,
+                   'Prob. Média': np.nan, 'ROI': np.nan})
+
+    resumo = pd.DataFrame(linhas)
+    resumo['Taxa Acerto'] = np.where(resumo['Apostas'] > 0, resumo['Acertos'] / resumo['Apostas'].clip(lower=1) * 100, np.nan)
+    return resumo
+
+
+def curva_roi_confianca(jogos, limiares=np.round(np.arange(0.5, 0.96, 0.05), 2), edge_minimo=EDGE_MINIMO):
+    """ROI das apostas de valor de todos os mercados juntos, para cada limiar de confiança"""
+    chaves = [chave for chave, _ in MERCADOS_ODDS.values() if f'odd_{chave}' in jogos.columns]
+    if jogos.empty or not chaves:
+        return pd.DataFrame()
+
+    def empilhar(prefixo):
+        return np.concatenate([jogos[f'{prefixo}_{chave}'].to_numpy(dtype=np.float64) for chave in chaves])
+
+    return simular_roi(empilhar('prob') / 100, empilhar('odd'), empilhar('resultado').astype(bool),
+                       np.tile(jogos['valor_confianca'].to_numpy(dtype=np.float64), len(chaves)),
+                       limiares, edge_minimo)
+
+
+def resumir_valor(jogos, edge_minimo=EDGE_MINIMO, confianca_minima=0.0):
+    """Apostas de valor do backtest por mercado: stake fixo (ROI) e stake de Kelly (crescimento da banca)"""
+    linhas = []
+    if jogos.empty or not any(f'odd_{chave}' in jogos.columns for chave, _ in MERCADOS_ODDS.values()):
+        return pd.DataFrame(linhas)
+
+    confianca = jogos['valor_confianca'].to_numpy()
+    for mercado, (chave, _) in MERCADOS_ODDS.items():
+        probabilidades = jogos[f'prob_{chave}'].to_numpy() / 100
+        odds = jogos[f'odd_{chave}'].to_numpy()
+        acertos = jogos[f'resultado_{chave}'].to_numpy()
+        roi = simular_roi(probabilidades, odds, acertos, confianca, confianca_minima, edge_minimo).iloc[0]
+
+        apostas = ~np.isnan(odds) & (np.nan_to_num(confianca, nan=-1.0) >= confianca_minima)
+        apostas &= np.nan_to_num(calcular_edge(probabilidades, odds), nan=-np.inf) >= edge_minimo
+        stakes = calcular_kelly(probabilidades[apostas], odds[apostas])
+        linhas.append({
+            'Mercado': mercado,
+            'Apostas': int(roi['Apostas']),
+            'Acertos': int(roi['Acertos']),
+            'Odd Média': float(odds[apostas].mean()) if apostas.any() else np.nan,
+            'Edge Médio': float(calcular_edge(probabilidades[apostas], odds[apostas]).mean() * 100) if apostas.any() else np.nan,
+            'ROI': roi['ROI'],
+            'Lucro Kelly': float(stakes @ np.where(acertos[apostas], odds[apostas] - 1, -1.0) * 100),
+        })
+    return pd.DataFrame(linhas)
+
+
+# CALIBRAÇÃO DAS PROBABILIDADES (BRIER, LOG-LOSS, RPS E CONFIABILIDADE)
+# Coluna do Simulador -> chave da probabilidade e do resultado no backtest
+MERCADOS_CALIBRACAO = {
+    'Casa Vence': 'casa_vence',
+    'Empate': 'empate',
+    'Fora Vence': 'fora_vence',
+    'Over 0.5 HT': 'over_05_ht',
+    'Over 0.5 FT': 'over_05_ft',
+    'Over 1.5 FT': 'over_15_ft',
+    'Over 2.5 FT': 'over_25_ft',
+    'Over 3.5 FT': 'over_35_ft',
+    'BTTS FT': 'btts_ft',
+}
+BINS_CONFIABILIDADE = 10
+
+
+def _somar_por_celula(indice, valores, tamanho):
+    return np.bincount(indice, valores.ravel(), tamanho)
+
+
+def metricas_calibracao(p, y, grupos, n_grupos):
+    """Brier, log-loss e frequência observada por (grupo, mercado) com bincount.
+
+    `p` e `y`: matrizes (jogos x mercados), probabilidades entre 0 e 1 e resultados 0/1.
+    Retorna arrays (n_grupos x n_mercados): (n, brier, log_loss, frequencia).
+    """
+    n_mercados = p.shape[1]
+    indice = (grupos[:, None] * n_mercados + np.arange(n_mercados)).ravel()
+    tamanho = n_grupos * n_mercados
+
+    def somar(valores):
+        return _somar_por_celula(indice, valores, tamanho).reshape(n_grupos, n_mercados)
+
+    p_limitada = np.clip(p, 1e-12, 1 - 1e-12)
+    n = somar(np.ones_like(p))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        brier = somar((p - y) ** 2) / n
+        log_loss = somar(-(y * np.log(p_limitada) + (1 - y) * np.log(1 - p_limitada))) / n
+        frequencia = somar(y) / n
+    return n, brier, log_loss, frequencia
+
+
+def tabela_confiabilidade(p, y, grupos, n_grupos, n_bins=BINS_CONFIABILIDADE):
+    """Diagrama de confiabilidade: por (grupo, mercado, faixa de probabilidade) a previsão média e a frequência real"""
+    n_mercados = p.shape[1]
+    faixas = np.minimum((p * n_bins).astype(np.int64), n_bins - 1)
+    indice = ((grupos[:, None] * n_mercados + np.arange(n_mercados)) * n_bins + faixas).ravel()
+    tamanho = n_grupos * n_mercados * n_bins
+
+    n = _somar_por_celula(indice, np.ones_like(p), tamanho)
+    ocupadas = np.flatnonzero(n)
+    grupo, resto = np.divmod(ocupadas, n_mercados * n_bins)
+    mercado, faixa = np.divmod(resto, n_bins)
+    return pd.DataFrame({
+        'grupo': grupo,
+        'Mercado': np.array(list(MERCADOS_CALIBRACAO), dtype=object)[mercado],
+        'Faixa': faixa,
+        'Jogos': n[ocupadas].astype(np.int64),
+        'Prob. Prevista': _somar_por_celula(indice, p, tamanho)[ocupadas] / n[ocupadas] * 100,
+        'Frequência Real': _somar_por_celula(indice, y, tamanho)[ocupadas] / n[ocupadas] * 100,
+    })
+
+
+def calcular_rps(p_casa, p_empate, y_casa, y_empate):
+    """Ranked probability score do 1X2 (ordem casa, empate, fora) de cada jogo"""
+    return ((p_casa - y_casa) ** 2 + (p_casa + p_empate - y_casa - y_empate) ** 2) / 2
+
+
+def _resumo_metricas(p, y, rps, grupos, n_grupos, nomes_grupos, coluna_grupo):
+    n, brier, log_loss, frequencia = metricas_calibracao(p, y, grupos, n_grupos)
+    # Referência: prever sempre a frequência observada do grupo
+    brier_referencia = frequencia * (1 - frequencia)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        habilidade = 1 - brier / brier_referencia
+    n_mercados = p.shape[1]
+    metricas = pd.DataFrame({
+        coluna_grupo: np.repeat(nomes_grupos, n_mercados),
+        'Mercado': np.tile(list(MERCADOS_CALIBRACAO), n_grupos),
+        'Jogos': n.ravel().astype(np.int64),
+        'Brier': brier.ravel(),
+        'Log-Loss': log_loss.ravel(),
+        'Brier Skill': habilidade.ravel(),
+        'Frequência Real': frequencia.ravel() * 100,
+    })
+    jogos_grupo = np.bincount(grupos, minlength=n_grupos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rps_grupo = np.bincount(grupos, rps, n_grupos) / jogos_grupo
+    return metricas[metricas['Jogos'] > 0].reset_index(drop=True), pd.DataFrame(
+        {coluna_grupo: nomes_grupos, 'Jogos': jogos_grupo, 'RPS 1X2': rps_grupo})
+
+
+def faixas_cores_calibracao(p, y):
+    """Valida os limites de LIMITES_CORES: acerto real das células verdes, amarelas e vermelhas de cada mercado"""
+    linhas = []
+    for j, mercado in enumerate(MERCADOS_CALIBRACAO):
+        alto, medio = LIMITES_CORES[classificar_coluna(mercado)]
+        faixa = np.select([p[:, j] * 100 >= alto, p[:, j] * 100 >= medio], [0, 1], 2)
+        n = np.bincount(faixa, minlength=3)
+        soma_p = np.bincount(faixa, p[:, j], 3)
+        soma_y = np.bincount(faixa, y[:, j], 3)
+        for k, cor in enumerate([f'🟢 ≥ {alto}%', f'🟡 {medio}-{alto}%', f'🔴 < {medio}%']):
+            if n[k]:
+                linhas.append({'Mercado': mercado, 'Faixa': cor, 'Jogos': int(n[k]),
+                               'Prob. Prevista': soma_p[k] / n[k] * 100, 'Frequência Real': soma_y[k] / n[k] * 100})
+    return pd.DataFrame(linhas)
+
+
+@cronometrar('calibracao', cache='calibracao')
+@memorizar()
+def calcular_relatorio_calibracao(_backtest, versao_dados):
+    """Relatório de calibração das previsões do backtest, uma vez por versão dos dados.
+
+    Retorna {nome: DataFrame}: mercados, ligas, rps, rps_ligas, confiabilidade, faixas e confianca.
+    """
+    contar_falta_cache('calibracao')
+    previstos = _backtest[_backtest['valor_confianca'].notna()] if not _backtest.empty else _backtest
+    if previstos.empty:
+        return {}
+
+    chaves = list(MERCADOS_CALIBRACAO.values())
+    p = np.clip(np.column_stack([previstos[f'prob_{c}'].to_numpy(dtype=np.float64) for c in chaves]) / 100, 0, 1)
+    y = np.column_stack([previstos[f'resultado_{c}'].to_numpy(dtype=np.float64) for c in chaves])
+    rps = calcular_rps(p[:, 0], p[:, 1], y[:, 0], y[:, 1])
+
+    todos = np.zeros(len(previstos), dtype=np.int64)
+    codigos_liga, ligas = pd.factorize(previstos['Liga'])
+    nomes_ligas = [mapeamento_ligas.get(liga, liga) for liga in ligas]
+
+    mercados, rps_geral = _resumo_metricas(p, y, rps, todos, 1, ['Todas as ligas'], 'Liga')
+    por_liga, rps_ligas = _resumo_metricas(p, y, rps, codigos_liga, len(ligas), nomes_ligas, 'Liga')
+
+    confiabilidade = pd.concat([
+        tabela_confiabilidade(p, y, todos, 1).assign(Liga='Todas as ligas'),
+        tabela_confiabilidade(p, y, codigos_liga, len(ligas)).assign(
+            Liga=lambda df: np.array(nomes_ligas, dtype=object)[df['grupo']])
+    ], ignore_index=True).drop(columns='grupo')
+
+    # Níveis de confiança: a pontuação acompanha o erro real das previsões?
+    valores = previstos['valor_confianca'].to_numpy(dtype=np.float64)
+    nivel = np.select([valores >= CONFIANCA_ALTA, valores >= CONFIANCA_MEDIA], [0, 1], 2)
+    _, rps_niveis = _resumo_metricas(p, y, rps, nivel, 3, ['Alta', 'Média', 'Baixa'], 'Confiança')
+    brier_niveis = np.bincount(nivel, ((p - y) ** 2).mean(axis=1), 3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rps_niveis['Brier Médio'] = brier_niveis / rps_niveis['Jogos'].to_numpy()
+
+    return {
+        'mercados': mercados.drop(columns='Liga'),
+        'ligas': por_liga,
+        'rps': rps_geral,
+        'rps_ligas': rps_ligas,
+        'confiabilidade': confiabilidade,
+        'faixas': faixas_cores_calibracao(p, y),
+        'confianca': rps_niveis[rps_niveis['Jogos'] > 0].reset_index(drop=True),
+    }
+
+
+# SIMULAÇÃO DA TEMPORADA (TABELA DE CLASSIFICAÇÃO)
+SIMULACOES_TEMPORADA = int(os.environ.get('FUTALGORITHM_SIMULACOES_TEMPORADA', 10000))
+VAGAS_TOPO = 4
+# Rebaixados diretos por liga (os playoffs não entram na conta)
+REBAIXADOS_LIGA = {
+    'D1': 2, 'D2': 2, 'F1': 2, 'F2': 2, 'E2': 4, 'E3': 2, 'N1': 2, 'P1': 2,
+    'SC0': 1, 'SC1': 1, 'SC2': 1, 'SC3': 1, 'default': 3
+}
+# Formato da temporada regular: 'confrontos' de cada par de times (metade com cada mando) e se, depois dela,
+# uma fase final ('divisao' em grupos ou 'playoffs') decide título e rebaixamento. Ligas com fase final ou
+# número ímpar de confrontos ficam fora da projeção: a tabela da fase regular não responde essas perguntas
+FORMATOS_LIGA = {
+    'SC0': {'confrontos': 3, 'fase_final': 'divisao'},  # 33 rodadas e divisão em dois grupos de 6
+    'SC1': {'confrontos': 4}, 'SC2': {'confrontos': 4}, 'SC3': {'confrontos': 4},
+    'B1': {'confrontos': 2, 'fase_final': 'playoffs'},
+    'G1': {'confrontos': 2, 'fase_final': 'playoffs'},
+    'default': {'confrontos': 2},
+}
+
+
+def indices_por_time(casa, fora, n_times, n_simulacoes=1):
+    """Posições (simulação, time) de mandantes e visitantes de cada jogo, para somar com np.bincount"""
+    base = np.arange(n_simulacoes)[:, None] * n_times
+    return np.concatenate([(base + casa).ravel(), (base + fora).ravel()])
+
+
+def somar_por_time(indices, valores_casa, valores_fora, forma):
+    """Soma os valores de mandantes e visitantes por time; `forma` = (n_simulacoes, n_times)"""
+    pesos = np.concatenate([np.ravel(valores_casa), np.ravel(valores_fora)])
+    return np.bincount(indices, pesos, forma[0] * forma[1]).reshape(forma)
+
+
+def pontos_jogos(gols_casa, gols_fora):
+    """Pontos de mandante e visitante de cada jogo (vitória 3, empate 1)"""
+    empate = gols_casa == gols_fora
+    return np.where(gols_casa > gols_fora, 3, empate), np.where(gols_fora > gols_casa, 3, empate)
+
+
+def amostrar_gols(lambdas, n_simulacoes, gerador, max_gols=MAXIMO_GOLS_PLACAR):
+    """Gols (simulações x jogos) por transformação inversa da Poisson, limitados a max_gols"""
+    acumuladas = stats.poisson.cdf(np.arange(max_gols), np.asarray(lambdas, dtype=np.float64)[:, None])
+    acumuladas = acumuladas.astype(np.float32)
+    uniformes = gerador.random((n_simulacoes, len(acumuladas)), dtype=np.float32)
+    gols = np.zeros(uniformes.shape, dtype=np.int8)
+    for k in range(max_gols):
+        gols += uniformes > acumuladas[:, k]
+    return gols
+
+
+def formato_liga(liga):
+    return FORMATOS_LIGA.get(liga, FORMATOS_LIGA['default'])
+
+
+def liga_projetavel(liga):
+    """Se a tabela final da liga sai só da temporada regular, com o mesmo número de jogos em cada mando"""
+    formato = formato_liga(liga)
+    return not formato.get('fase_final') and formato['confrontos'] % 2 == 0
+
+
+def jogos_restantes(jogados_casa, jogados_fora, n_times, confrontos=2):
+    """Pares (mandante, visitante) que ainda faltam, com `confrontos` jogos por par (metade com cada mando);
+    um par que ainda joga duas vezes no mesmo mando aparece repetido"""
+    casa, fora = np.divmod(np.arange(n_times * n_times), n_times)
+    disputados = np.bincount(jogados_casa * n_times + jogados_fora, minlength=n_times * n_times)
+    faltam = np.where(casa != fora, np.maximum(confrontos // 2 - disputados, 0), 0)
+    return np.repeat(casa, faltam), np.repeat(fora, faltam)
+
+
+def simular_temporada_liga(df_liga, liga, indice_liga=None, modelo=None, n_simulacoes=SIMULACOES_TEMPORADA):
+    """Projeção da tabela final de uma liga, simulando os jogos restantes da temporada.
+
+    Os jogos restantes saem do formato da liga (FORMATOS_LIGA); os gols de cada um são Poisson com os
+    mesmos lambdas das previsões (médias ponderadas ou o modelo da liga), e a classificação desempata por
+    pontos, saldo, gols pró e sorteio.
+    Retorna um DataFrame por time com a tabela atual, a projeção e as probabilidades de título,
+    top 4 e rebaixamento (%); vazio para as ligas fora de liga_projetavel.
+    """
+    jogos = df_liga.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+    if jogos.empty or not liga_projetavel(liga):
+        return pd.DataFrame()
+
+    codigos, times = pd.factorize(pd.concat([jogos['HomeTeam'], jogos['AwayTeam']], ignore_index=True).astype(str))
+    n_times, n_jogados = len(times), len(jogos)
+    jogados_casa, jogados_fora = codigos[:n_jogados], codigos[n_jogados:]
+    gols_casa = jogos['FTHG'].to_numpy(dtype=np.int64)
+    gols_fora = jogos['FTAG'].to_numpy(dtype=np.int64)
+
+    indices, forma = indices_por_time(jogados_casa, jogados_fora, n_times), (1, n_times)
+    pontos_casa, pontos_fora = pontos_jogos(gols_casa, gols_fora)
+    pontos = somar_por_time(indices, pontos_casa, pontos_fora, forma)[0]
+    saldo = somar_por_time(indices, gols_casa - gols_fora, gols_fora - gols_casa, forma)[0]
+    gols_pro = somar_por_time(indices, gols_casa, gols_fora, forma)[0]
+    disputados = np.bincount(np.r_[jogados_casa, jogados_fora], minlength=n_times)
+
+    casa, fora = jogos_restantes(jogados_casa, jogados_fora, n_times, formato_liga(liga)['confrontos'])
+    restantes = np.bincount(np.r_[casa, fora], minlength=n_times)
+    gerador = gerador_liga(liga)
+    if len(casa):
+        confrontos = list(zip(times[casa], times[fora]))
+        estatisticas = calcular_estatisticas_times(df_liga, list(times), liga, 10, indice_liga)
+        perfis = {time: (estatisticas.get(time, (None,))[0] or {}) for time in times}
+        fator_liga = FATORES_LIGA.get(liga, FATORES_LIGA['default'])
+        lambda_casa, lambda_fora, _, _ = lambdas_ponderados(medias_lado([perfis[m] for m, _ in confrontos], 'casa'),
+                                                            medias_lado([perfis[v] for _, v in confrontos], 'fora'),
+                                                            fator_liga)
+        if modelo is not None:
+            modelo_casa, modelo_fora, conhecidos = lambdas_modelo(modelo, confrontos)
+            lambda_casa = np.where(conhecidos, modelo_casa, lambda_casa)
+            lambda_fora = np.where(conhecidos, modelo_fora, lambda_fora)
+
+        simulados_casa = amostrar_gols(lambda_casa, n_simulacoes, gerador)
+        simulados_fora = amostrar_gols(lambda_fora, n_simulacoes, gerador)
+        indices, forma = indices_por_time(casa, fora, n_times, n_simulacoes), (n_simulacoes, n_times)
+        pontos_sim_casa, pontos_sim_fora = pontos_jogos(simulados_casa, simulados_fora)
+        pontos_finais = pontos + somar_por_time(indices, pontos_sim_casa, pontos_sim_fora, forma)
+        diferenca = simulados_casa.astype(np.int16) - simulados_fora
+        saldo_final = saldo + somar_por_time(indices, diferenca, -diferenca, forma)
+        gols_pro_final = gols_pro + somar_por_time(indices, simulados_casa, simulados_fora, forma)
+    else:
+        pontos_finais, saldo_final, gols_pro_final = pontos[None, :], saldo[None, :], gols_pro[None, :]
+
+    # Critérios de desempate compostos em uma única chave (|saldo| < 500 e gols pró < 1000)
+    chave = (pontos_finais * 1e6 + (saldo_final + 500) * 1e3 + gols_pro_final
+             + gerador.random(pontos_finais.shape))
+    ordem = np.argsort(-chave, axis=1)
+    colocacao = np.empty_like(ordem)
+    np.put_along_axis(colocacao, ordem, np.arange(n_times), axis=1)
+    distribuicao = np.bincount((np.arange(n_times) * n_times + colocacao).ravel(),
+                               minlength=n_times * n_times).reshape(n_times, n_times) / len(colocacao)
+
+    rebaixados = REBAIXADOS_LIGA.get(liga, REBAIXADOS_LIGA['default'])
+    tabela = pd.DataFrame({
+        'Time': times,
+        'J': disputados,
+        'Restam': restantes,
+        'Pts': pontos.astype(np.int64),
+        'SG': saldo.astype(np.int64),
+        'GP': gols_pro.astype(np.int64),
+        'Pts Projetados': pontos_finais.mean(axis=0),
+        'Posição Média': colocacao.mean(axis=0) + 1,
+        'Título': distribuicao[:, 0] * 100,
+        f'Top {VAGAS_TOPO}': distribuicao[:, :VAGAS_TOPO].sum(axis=1) * 100,
+        'Rebaixamento': distribuicao[:, n_times - rebaixados:].sum(axis=1) * 100,
+    })
+    tabela = tabela.sort_values(['Pts Projetados', 'Pts', 'SG'], ascending=False, ignore_index=True)
+    tabela.insert(0, 'Pos', np.arange(1, n_times + 1))
+    return tabela
+
+
+@cronometrar('temporada', cache='temporada')
+@memorizar()
+def calcular_tabelas_temporada(_todas_abas, _indice_times, versao_dados, _modelos=None):
+    """Projeção da temporada de todas as ligas, em paralelo por liga, uma vez por versão dos dados"""
+    contar_falta_cache('temporada')
+    modelos = _modelos or {}
+    tarefas = {liga: (df_liga, liga, obter_indice_liga(_indice_times, liga, df_liga), modelos.get(liga))
+               for liga, df_liga in _todas_abas.items() if liga_projetavel(liga)}
+    resultados, _ = executar_por_liga(simular_temporada_liga, tarefas, etapa='temporada')
+    return {liga: tabela for liga, tabela in resultados.items() if not tabela.empty}
+
+
+# NOVAS FUNÇÕES PARA A ABA TOP RANKINGS
+def obter_todos_times_liga(df_liga):
+    """Obtém todos os times únicos de uma liga"""
+    times_casa = df_liga['HomeTeam'].unique()
+    times_fora = df_liga['AwayTeam'].unique()
+    return list(set(times_casa) | set(times_fora))
+
+
+# MOTOR DE SEQUÊNCIAS DO RANKING
+# Mercado -> (coluna do índice de times, mínimo para contar acerto)
+MERCADOS_RANKING = {
+    'Jogos 0.5 HT': ('gols_ht_total', 1),
+    'Jogos 1.5 FT': ('gols_ft_total', 2),
+    'Jogos 2.5 FT': ('gols_ft_total', 3),
+    'Jogos BTTS': ('btts', 1),
+    'Vitoria': ('vitorias', 1),
+    'Derrota': ('derrotas', 1),
+    'Jogos 8+ Escanteios': ('escanteios_total', 8),
+    'Jogos 9+ Escanteios': ('escanteios_total', 9),
+    'Jogos 10+ Escanteios': ('escanteios_total', 10),
+}
+
+JOGOS_SEQUENCIA = 5
+
+# Janelas do slider "Máximo de Jogos Analisados" pré-computadas no cubo
+JANELAS_RANKING = range(5, 21)
+
+# Máscara de bits dos últimos 5 jogos (bit 0 = mais recente) -> emojis, do mais recente ao mais antigo
+EMOJIS_ULTIMOS_5 = [' '.join('✅' if mascara >> k & 1 else '🔴' for k in range(JOGOS_SEQUENCIA))
+                    for mascara in range(2 ** JOGOS_SEQUENCIA)]
+
+
+def calcular_acertos_mercados(tabela):
+    """Matriz booleana (linhas do índice x mercados do ranking)"""
+    return np.column_stack([tabela[coluna].to_numpy(dtype=np.float64) >= minimo
+                            for coluna, minimo in MERCADOS_RANKING.values()])
+
+
+def calcular_cubo_liga(indice_liga, janelas=JANELAS_RANKING):
+    """Acertos, sequência atual e últimos 5 de todos os times, mercados e janelas de uma vez.
+
+    Retorna um DataFrame longo com uma linha por (Time, Mercado, Janela).
+    """
+    tabela = indice_liga['tabela']
+    colunas = ['Time', 'Mercado', 'Janela', 'Acertos', 'Total Jogos', 'Porcentagem',
+               'Sequencia Atual', 'Mascara Ultimos 5']
+    if tabela.empty:
+        return pd.DataFrame(columns=colunas)
+    contar('linhas_lidas', len(tabela), etapa='rankings')
+
+    janelas = np.asarray(list(janelas))
+    times = tabela['Time'].to_numpy()
+    inicios = np.flatnonzero(np.r_[True, times[1:] != times[:-1]])
+    tamanhos = np.diff(np.r_[inicios, len(times)])
+    # Posição contada a partir do jogo mais recente de cada time (0 = último jogo)
+    desde_o_fim = np.repeat(inicios + tamanhos - 1, tamanhos) - np.arange(len(times))
+
+    acertos = calcular_acertos_mercados(tabela)
+    n_times, n_mercados, n_janelas = len(inicios), acertos.shape[1], len(janelas)
+
+    # Acertos por distância do fim; a soma acumulada dá todas as janelas de uma vez
+    maior_janela = janelas.max()
+    recentes = desde_o_fim < maior_janela
+    por_posicao = np.zeros((n_times, maior_janela, n_mercados), dtype=np.int64)
+    np.add.at(por_posicao, (np.repeat(np.arange(n_times), tamanhos)[recentes], desde_o_fim[recentes]),
+              acertos[recentes])
+    acertos_janela = np.cumsum(por_posicao, axis=1)[:, janelas - 1, :].transpose(0, 2, 1)
+    total_jogos = np.broadcast_to(np.minimum(tamanhos[:, None], janelas)[:, None, :], acertos_janela.shape)
+
+    nos_ultimos_5 = (desde_o_fim < JOGOS_SEQUENCIA)[:, None]
+    bits = np.where(acertos & nos_ultimos_5, 1 << np.minimum(desde_o_fim, JOGOS_SEQUENCIA)[:, None], 0)
+    mascaras = np.add.reduceat(bits, inicios, axis=0)
+    # Sequência atual: distância até o erro mais recente, limitada aos últimos 5 jogos
+    erros = np.where(~acertos, desde_o_fim[:, None], JOGOS_SEQUENCIA)
+    sequencias = np.minimum(np.minimum.reduceat(erros, inicios, axis=0), np.minimum(tamanhos, JOGOS_SEQUENCIA)[:, None])
+
+    return pd.DataFrame({
+        'Time': np.repeat(times[inicios], n_mercados * n_janelas),
+        'Mercado': np.tile(np.repeat(list(MERCADOS_RANKING), n_janelas), n_times),
+        'Janela': np.tile(janelas, n_times * n_mercados),
+        'Acertos': acertos_janela.ravel(),
+        'Total Jogos': total_jogos.ravel(),
+        'Porcentagem': acertos_janela.ravel() / total_jogos.ravel() * 100,
+        'Sequencia Atual': np.repeat(sequencias.ravel(), n_janelas),
+        'Mascara Ultimos 5': np.repeat(mascaras.ravel(), n_janelas),
+    })
+
+
+def calcular_sequencias_liga(indice_liga, max_jogos=10):
+    """Acertos, sequência atual e últimos 5 de todos os times em todos os mercados, para uma janela"""
+    return calcular_cubo_liga(indice_liga, [max_jogos]).drop(columns='Janela')
+
+
+def ordenar_cubo_liga(cubo_liga):
+    """Deixa o cubo pronto para recorte: cada (mercado, janela) vira um bloco contíguo já ordenado"""
+    elegiveis = cubo_liga[cubo_liga['Total Jogos'] >= 5]
+    ordem_mercado = elegiveis['Mercado'].map({mercado: i for i, mercado in enumerate(MERCADOS_RANKING)})
+    # Ordenar por porcentagem (decrescente) e depois por número de jogos (decrescente) dentro de cada bloco
+    ordem = np.lexsort((-elegiveis['Total Jogos'].to_numpy(), -elegiveis['Porcentagem'].to_numpy(),
+                        elegiveis['Janela'].to_numpy(), ordem_mercado.to_numpy()))
+    tabela = elegiveis.iloc[ordem].reset_index(drop=True)
+
+    chaves = list(zip(tabela['Mercado'], tabela['Janela']))
+    posicoes = {}
+    for posicao, chave in enumerate(chaves):
+        inicio, _ = posicoes.get(chave, (posicao, posicao))
+        posicoes[chave] = (inicio, posicao + 1)
+
+    return {'tabela': tabela, 'posicoes': posicoes}
+
+
+@cronometrar('cubo_rankings', cache='cubo_rankings')
+@memorizar()
+def construir_cubo_rankings(_todas_abas, _indice_times, versao_dados):
+    """Cubo liga x time x mercado x janela, construído uma vez por versão dos dados"""
+    contar_falta_cache('cubo_rankings')
+    tarefas = {codigo_liga: (obter_indice_liga(_indice_times, codigo_liga, df_liga),)
+               for codigo_liga, df_liga in _todas_abas.items()}
+    cubo, _ = executar_por_liga(calcular_cubo_liga, tarefas, etapa='rankings')
+    return {codigo_liga: ordenar_cubo_liga(cubo_liga) for codigo_liga, cubo_liga in cubo.items()}
+
+
+def fatiar_ranking(cubo_liga, liga_nome, mercado, max_jogos=10):
+    """Top 10 de um mercado e janela, recortado do cubo ordenado da liga"""
+    inicio, fim = cubo_liga['posicoes'].get((mercado, max_jogos), (0, 0))
+    selecao = cubo_liga['tabela'].iloc[inicio:min(fim, inicio + 10)]  # Top 10
+
+    return [{
+        'Time': linha['Time'],
+        'Liga': liga_nome,
+        'Jogos Analisados': f"{linha['Acertos']}/{linha['Total Jogos']}",
+        'Porcentagem': linha['Porcentagem'],
+        'Sequencia Atual': int(linha['Sequencia Atual']),
+        'Ultimos 5 Jogos': EMOJIS_ULTIMOS_5[linha['Mascara Ultimos 5']],
+        'Acertos': int(linha['Acertos']),
+        'Total Jogos': int(linha['Total Jogos'])
+    } for linha in selecao.to_dict('records')]
+
+
+def gerar_ranking_liga(df_liga, liga_nome, mercado, max_jogos=10, indice_liga=None, cubo_liga=None):
+    """Gera o ranking para uma liga específica"""
+    if cubo_liga is None or max_jogos not in JANELAS_RANKING:
+        if indice_liga is None:
+            indice_liga = construir_indice_liga(df_liga)
+        cubo_liga = ordenar_cubo_liga(calcular_cubo_liga(indice_liga, [max_jogos]))
+
+    return fatiar_ranking(cubo_liga, liga_nome, mercado, max_jogos)
+
+
+@cronometrar('rankings')
+def gerar_todos_rankings(todas_abas, mercado, max_jogos=10, indice_times=None, cubo=None):
+    """Gera rankings para todas as ligas"""
+    todos_rankings = []
+
+    if cubo is not None and max_jogos in JANELAS_RANKING:
+        # Com o cubo pronto, trocar filtros é só recorte e ordenação
+        rankings_por_liga = {codigo_liga: fatiar_ranking(cubo[codigo_liga], mapeamento_ligas.get(codigo_liga, codigo_liga),
+                                                         mercado, max_jogos)
+                             for codigo_liga in todas_abas if codigo_liga in cubo}
+    else:
+        tarefas = {codigo_liga: (df_liga, mapeamento_ligas.get(codigo_liga, codigo_liga), mercado, max_jogos,
+                                 obter_indice_liga(indice_times, codigo_liga, df_liga))
+                   for codigo_liga, df_liga in todas_abas.items()}
+        rankings_por_liga, _ = executar_por_liga(gerar_ranking_liga, tarefas, etapa='rankings')
+
+    for ranking_liga in rankings_por_liga.values():
+        todos_rankings.extend(ranking_liga)
+
+    return todos_rankings
+
+
+def preparar_snapshot(snapshot):
+    """Aquece os caches (memória e disco) que as abas leem de um snapshot, fora da requisição"""
+    todas_abas, versao = snapshot['todas_abas'], snapshot['versao_dados']
+    if not todas_abas:
+        return
+    indice = construir_indice_times(todas_abas, versao)
+    construir_cubo_rankings(todas_abas, indice, versao)
+    modelos = ajustar_modelos_lambdas(todas_abas, versao)
+    if snapshot['df_proximos_jogos'] is not None:
+        obter_previsoes(todas_abas, snapshot['df_proximos_jogos'], indice, versao)
+    calcular_relatorio_calibracao(calcular_backtest(todas_abas, indice, versao), versao)
+    calcular_tabelas_temporada(todas_abas, indice, versao, modelos)
+
+
+# RESULTADOS PRÉ-CALCULADOS (LOTE: python -m futalgorithm predict)
+# A interface usa a pasta de FUTALGORITHM_PRECALCULADO quando o manifesto é da mesma versão dos dados
+ARQUIVO_MANIFESTO = 'manifesto.json'
+TABELAS_LOTE = ('previsoes', 'dicas', 'rankings')
+FORMATOS_LOTE = ('parquet', 'csv', 'json')
+COLUNAS_DICAS = ['Data', 'Jogo', 'Liga', 'Dica', 'Confiança', 'Tipo']
+
+
+def _eh_url(origem):
+    return str(origem).startswith(('http://', 'https://'))
+
+
+def carregar_dados_origem(origem):
+    """Abas das ligas de uma URL (store local incremental), de uma pasta de store ou de uma planilha em disco"""
+    if _eh_url(origem):
+        todas_abas, _ = atualizar_dados_incremental(origem)
+        return todas_abas
+    if os.path.isdir(origem):
+        todas_abas, _ = carregar_store_local(origem)
+        return todas_abas
+    with open(origem, 'rb') as arquivo:
+        return ler_planilha(arquivo.read())
+
+
+def carregar_jogos_origem(origem):
+    """Próximos jogos de uma URL ou de um arquivo .xlsx, .csv ou .parquet"""
+    if _eh_url(origem):
+        return baixar_proximos_jogos(origem)
+    extensao = os.path.splitext(origem)[1].lower()
+    if extensao == '.csv':
+        return pd.read_csv(origem)
+    if extensao == '.parquet':
+        return pd.read_parquet(origem)
+    return pd.read_excel(origem)
+
+
+def tabela_rankings(cubo):
+    """Cubo de rankings como uma tabela longa, com a liga (código) na primeira coluna"""
+    tabelas = [cubo_liga['tabela'].assign(Liga=liga) for liga, cubo_liga in cubo.items()]
+    if not tabelas:
+        return pd.DataFrame(columns=['Liga'])
+    tabela = pd.concat(tabelas, ignore_index=True)
+    return tabela[['Liga'] + [c for c in tabela.columns if c != 'Liga']]
+
+
+def executar_lote(todas_abas, df_proximos_jogos):
+    """Previsões, dicas e rankings de uma carga de dados, sem interface.
+
+    Retorna ({tabela: DataFrame}, versao_dados, {etapa: segundos}).
+    """
+    tempos = {}
+
+    def etapa(nome, funcao, *argumentos):
+        inicio = time.perf_counter()
+        resultado = funcao(*argumentos)
+        tempos[nome] = time.perf_counter() - inicio
+        return resultado
+
+    versao = etapa('versao_dados', calcular_versao_dados, todas_abas)
+    indice = etapa('indice', construir_indice_times, todas_abas, versao)
+    etapa('modelos', ajustar_modelos_lambdas, todas_abas, versao)
+    previsoes = etapa('previsoes', obter_previsoes, todas_abas, df_proximos_jogos, indice, versao)
+    df_previsoes = etapa('quadro', processar_todos_jogos_completos, todas_abas, df_proximos_jogos, indice, previsoes)
+    dicas = etapa('dicas', gerar_dicas_inteligentes, df_proximos_jogos, todas_abas, indice, previsoes)
+    dicas += etapa('dicas_sequencias', gerar_dicas_sequencias, df_proximos_jogos, todas_abas, indice)
+    cubo = etapa('rankings', construir_cubo_rankings, todas_abas, indice, versao)
+
+    tabelas = {
+        'previsoes': df_previsoes,
+        'dicas': pd.DataFrame(dicas, columns=COLUNAS_DICAS),
+        'rankings': tabela_rankings(cubo),
+    }
+    return tabelas, versao, tempos
+
+
+def salvar_resultados(diretorio, tabelas, manifesto, formatos=FORMATOS_LOTE):
+    """Grava cada tabela nos formatos pedidos e, por último, o manifesto (quem lê nunca vê uma carga pela metade)"""
+    escritores = {
+        'parquet': lambda df, caminho: df.to_parquet(caminho, index=False),
+        'csv': lambda df, caminho: df.to_csv(caminho, index=False),
+        'json': lambda df, caminho: df.to_json(caminho, orient='records', date_format='iso', force_ascii=False),
+    }
+    arquivos = []
+    with travar_diretorio(diretorio):
+        for nome, df in tabelas.items():
+            for formato in formatos:
+                arquivo = f'{nome}.{formato}'
+                _escrever_atomico(os.path.join(diretorio, arquivo),
+                                  lambda caminho, df=df, formato=formato: escritores[formato](df, caminho))
+                arquivos.append(arquivo)
+
+        manifesto = dict(manifesto, arquivos=arquivos)
+
+        def escrever_manifesto(caminho):
+            with open(caminho, 'w', encoding='utf-8') as arquivo:
+                json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+
+        _escrever_atomico(os.path.join(diretorio, ARQUIVO_MANIFESTO), escrever_manifesto)
+    return manifesto
+
+
+def ler_manifesto(diretorio):
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_MANIFESTO), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+@memorizar()
+def _ler_precalculado(diretorio, versao_dados, gerado_em):
+    tabelas = {nome: pd.read_parquet(os.path.join(diretorio, f'{nome}.parquet')) for nome in TABELAS_LOTE}
+    rankings = tabelas['rankings']
+    tabelas['cubo'] = {liga: ordenar_cubo_liga(cubo_liga.drop(columns='Liga').reset_index(drop=True))
+                       for liga, cubo_liga in rankings.groupby('Liga', sort=False)} if 'Time' in rankings else {}
+    return tabelas
+
+
+@cronometrar('precalculado')
+def carregar_precalculado(diretorio, versao_dados):
+    """Tabelas do lote ({'previsoes', 'dicas', 'rankings', 'cubo', 'manifesto'}) da versão `versao_dados`.
+
+    Retorna None quando a pasta não tem os Parquet ou foi gerada para outra versão dos dados.
+    """
+    manifesto = ler_manifesto(diretorio)
+    if not manifesto or manifesto.get('versao_dados') != versao_dados:
+        return None
+    if not all(f'{nome}.parquet' in manifesto.get('arquivos', []) for nome in TABELAS_LOTE):
+        return None
+    try:
+        tabelas = _ler_precalculado(diretorio, versao_dados, manifesto.get('gerado_em'))
+    except (OSError, ValueError):
+        return None
+    return dict(tabelas, manifesto=manifesto)
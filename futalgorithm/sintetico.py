@@ -0,0 +1,147 @@
+"""Temporadas sintéticas no formato das planilhas do football-data.co.uk, para benchmarks sem rede.
+
+Cada liga tem times com força de ataque/defesa própria; os jogos seguem um turno e returno (método do
+círculo) com gols Poisson e mando de campo, gols HT como fração dos gols FT e finalizações, chutes ao gol,
+escanteios, faltas e cartões com médias próximas às das ligas europeias. As odds saem das probabilidades
+do próprio modelo gerador, com margem da casa.
+"""
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from futalgorithm.motor import mapeamento_ligas
+
+# Tamanho "1x": as 22 abas da planilha atual, com ~28 rodadas disputadas
+PERFIL_PADRAO = {'ligas': 22, 'times': 20, 'rodadas': 28}
+INICIO_TEMPORADA = pd.Timestamp('2025-08-09')
+
+MEDIA_GOLS_LOG = 0.12
+VANTAGEM_MANDO = 0.25
+FRACAO_GOLS_HT = 0.44
+MARGEM_CASA = 0.05
+DISPERSAO_FINALIZACOES = 12.0
+
+
+def codigos_ligas(n_ligas):
+    """Códigos reais das ligas, repetidos com sufixo quando o perfil pede mais ligas que a planilha tem"""
+    base = list(mapeamento_ligas)
+    return [base[i % len(base)] + (f'_{i // len(base)}' if i >= len(base) else '') for i in range(n_ligas)]
+
+
+def tabela_rodadas(n_times):
+    """Turno e returno pelo método do círculo: array (rodadas, jogos por rodada, 2) de (mandante, visitante)"""
+    ordem = np.arange(n_times)
+    rodadas = []
+    for rodada in range(n_times - 1):
+        pares = np.column_stack([ordem[:n_times // 2], ordem[::-1][:n_times // 2]])
+        rodadas.append(pares[:, ::-1] if rodada % 2 else pares)
+        ordem = np.r_[ordem[0], ordem[-1], ordem[1:-1]]
+    turno = np.array(rodadas)
+    return np.concatenate([turno, turno[:, :, ::-1]])
+
+
+def _odds(probabilidades, gerador):
+    """Odd decimal com margem da casa e um pouco de ruído entre casas"""
+    justa = 1 / np.clip(probabilidades, 0.01, 0.99)
+    return np.round(justa / (1 + MARGEM_CASA) * gerador.uniform(0.97, 1.03, probabilidades.shape), 2)
+
+
+def _colunas_odds(lambda_casa, lambda_fora, gerador):
+    """Odds Avg/B365/Max dos mercados 1X2 e over/under 2.5, como nas planilhas"""
+    gols = np.arange(11)
+    p_casa = stats.poisson.pmf(gols[None, :], lambda_casa[:, None])
+    p_fora = stats.poisson.pmf(gols[None, :], lambda_fora[:, None])
+    placares = p_casa[:, :, None] * p_fora[:, None, :]
+    diferenca = gols[:, None] - gols[None, :]
+    total = gols[:, None] + gols[None, :]
+    probabilidades = {
+        'H': placares[:, diferenca > 0].sum(axis=1),
+        'D': placares[:, diferenca == 0].sum(axis=1),
+        'A': placares[:, diferenca < 0].sum(axis=1),
+        '>2.5': placares[:, total > 2].sum(axis=1),
+    }
+    probabilidades['<2.5'] = 1 - probabilidades['>2.5']
+
+    colunas = {}
+    for sufixo, p in probabilidades.items():
+        media = _odds(p, gerador)
+        colunas['Avg' + sufixo] = media
+        colunas['B365' + sufixo] = np.round(media * gerador.uniform(0.96, 1.02, len(media)), 2)
+        colunas['Max' + sufixo] = np.round(media * gerador.uniform(1.03, 1.10, len(media)), 2)
+    return colunas
+
+
+def _contagens(media, gerador, dispersao=None):
+    """Contagens Poisson, ou binomial negativa (superdispersa) quando há `dispersao`"""
+    if dispersao is None:
+        return gerador.poisson(media)
+    return gerador.negative_binomial(dispersao, dispersao / (dispersao + media))
+
+
+def gerar_liga(div, n_times, rodadas, gerador):
+    """(jogos disputados, próxima rodada) de uma liga sintética"""
+    times = np.array([f'{div} FC {i:02d}' for i in range(n_times)], dtype=object)
+    ataque = gerador.normal(0, 0.22, n_times)
+    defesa = gerador.normal(0, 0.18, n_times)
+
+    calendario = tabela_rodadas(n_times)
+    rodadas = min(rodadas, len(calendario) - 1)
+    pares = calendario[:rodadas].reshape(-1, 2)
+    casa, fora = pares[:, 0], pares[:, 1]
+    datas = INICIO_TEMPORADA + pd.to_timedelta(np.repeat(np.arange(rodadas) * 7, n_times // 2), unit='D')
+
+    lambda_casa = np.exp(MEDIA_GOLS_LOG + VANTAGEM_MANDO + ataque[casa] - defesa[fora])
+    lambda_fora = np.exp(MEDIA_GOLS_LOG + ataque[fora] - defesa[casa])
+    fthg, ftag = gerador.poisson(lambda_casa), gerador.poisson(lambda_fora)
+    # Volume ofensivo acompanha o lambda de gols do time no jogo
+    hs = _contagens(9.0 + 2.6 * lambda_casa, gerador, DISPERSAO_FINALIZACOES)
+    as_ = _contagens(8.0 + 2.6 * lambda_fora, gerador, DISPERSAO_FINALIZACOES)
+    hst = np.maximum(gerador.binomial(hs, 0.35), fthg)
+    ast = np.maximum(gerador.binomial(as_, 0.34), ftag)
+
+    jogos = pd.DataFrame({
+        'Div': div,
+        'Date': datas,
+        'Time': '15:00',
+        'HomeTeam': times[casa],
+        'AwayTeam': times[fora],
+        'FTHG': fthg,
+        'FTAG': ftag,
+        'FTR': np.where(fthg > ftag, 'H', np.where(fthg < ftag, 'A', 'D')),
+        'HTHG': gerador.binomial(fthg, FRACAO_GOLS_HT),
+        'HTAG': gerador.binomial(ftag, FRACAO_GOLS_HT),
+        'HS': hs, 'AS': as_, 'HST': hst, 'AST': ast,
+        'HF': gerador.poisson(11.2, len(casa)), 'AF': gerador.poisson(11.8, len(casa)),
+        'HC': gerador.poisson(3.2 + 1.5 * lambda_casa), 'AC': gerador.poisson(2.9 + 1.5 * lambda_fora),
+        'HY': gerador.poisson(1.7, len(casa)), 'AY': gerador.poisson(2.0, len(casa)),
+        'HR': gerador.binomial(1, 0.05, len(casa)), 'AR': gerador.binomial(1, 0.06, len(casa)),
+        **_colunas_odds(lambda_casa, lambda_fora, gerador),
+    })
+    jogos['HTR'] = np.where(jogos['HTHG'] > jogos['HTAG'], 'H', np.where(jogos['HTHG'] < jogos['HTAG'], 'A', 'D'))
+
+    proximos = calendario[rodadas]
+    casa, fora = proximos[:, 0], proximos[:, 1]
+    proxima_rodada = pd.DataFrame({
+        'Div': div,
+        'Date': INICIO_TEMPORADA + pd.Timedelta(days=7 * rodadas),
+        'Time': '15:00',
+        'HomeTeam': times[casa],
+        'AwayTeam': times[fora],
+        **_colunas_odds(np.exp(MEDIA_GOLS_LOG + VANTAGEM_MANDO + ataque[casa] - defesa[fora]),
+                        np.exp(MEDIA_GOLS_LOG + ataque[fora] - defesa[casa]), gerador),
+    })
+    return jogos, proxima_rodada
+
+
+def gerar_temporada(ligas=PERFIL_PADRAO['ligas'], times=PERFIL_PADRAO['times'], rodadas=PERFIL_PADRAO['rodadas'],
+                    semente=2024):
+    """Abas das ligas (como a planilha de dados) e o quadro dos próximos jogos (como o fixtures.xlsx).
+
+    A mesma semente gera sempre os mesmos dados.
+    """
+    gerador = np.random.default_rng(semente)
+    abas, proximos = {}, []
+    for div in codigos_ligas(ligas):
+        abas[div], proxima_rodada = gerar_liga(div, times, rodadas, gerador)
+        proximos.append(proxima_rodada)
+    return abas, pd.concat(proximos, ignore_index=True)
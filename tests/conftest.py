@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Store, artefatos e parâmetros gravados pelos testes ficam fora da pasta de dados do usuário
+os.environ['FUTALGORITHM_DADOS'] = tempfile.mkdtemp(prefix='futalgorithm-testes-')
+os.environ.pop('FUTALGORITHM_ARTEFATOS', None)
+
+from futalgorithm import motor, sintetico  # noqa: E402
+
+
+@pytest.fixture(autouse=True, scope='session')
+def sem_cache_disco():
+    # Os testes não leem nem gravam artefatos do usuário
+    motor.CACHE_DISCO_ATIVO = False
+
+
+@pytest.fixture(scope='session')
+def temporada():
+    """Duas ligas sintéticas de 10 times (abas já tipadas, próximos jogos)"""
+    abas, proximos = sintetico.gerar_temporada(2, 10, 12, semente=7)
+    return {liga: motor.otimizar_tipos(df) for liga, df in abas.items()}, proximos
+
+
+@pytest.fixture(scope='session')
+def lote(temporada, tmp_path_factory):
+    """Pasta de saída do predict sobre a temporada sintética"""
+    todas_abas, proximos = temporada
+    tabelas, versao_dados, _ = motor.executar_lote(todas_abas, proximos)
+    diretorio = str(tmp_path_factory.mktemp('lote'))
+    motor.salvar_resultados(diretorio, tabelas, {'versao_dados': versao_dados, 'gerado_em': '2026-01-01T00:00:00',
+                                                 'linhas': {nome: len(df) for nome, df in tabelas.items()}},
+                            ['parquet'])
+    return diretorio
@@ -0,0 +1,78 @@
+import asyncio
+import gzip
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+from futalgorithm import api
+
+
+def chamar(app, caminho, parametros=None, cabecalhos=None):
+    """(status, {cabeçalho: valor}, corpo) de um GET direto na aplicação ASGI"""
+    scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': caminho,
+             'raw_path': caminho.encode(), 'query_string': urlencode(parametros or {}).encode(),
+             'root_path': '', 'server': ('teste', 80), 'client': ('teste', 1),
+             'headers': [(nome.lower().encode(), valor.encode()) for nome, valor in (cabecalhos or {}).items()]}
+    mensagens = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    asyncio.run(app(scope, receive, send))
+    inicio = mensagens[0]
+    cabecalhos_resposta = {nome.decode(): valor.decode() for nome, valor in inicio['headers']}
+    corpo = b''.join(m.get('body', b'') for m in mensagens[1:])
+    return inicio['status'], cabecalhos_resposta, corpo
+
+
+@pytest.fixture
+def app(lote):
+    return api.criar_app(lote)
+
+
+def test_etag_e_304(app):
+    status, cabecalhos, corpo = chamar(app, '/predictions')
+    assert status == 200
+    assert json.loads(corpo)['total'] > 0
+
+    status, revalidado, corpo = chamar(app, '/predictions', cabecalhos={'If-None-Match': cabecalhos['etag']})
+    assert status == 304
+    assert corpo == b''
+    assert revalidado['etag'] == cabecalhos['etag']
+
+
+def test_gzip(app):
+    _, _, corpo = chamar(app, '/tips')
+    status, cabecalhos, comprimido = chamar(app, '/tips', cabecalhos={'Accept-Encoding': 'gzip'})
+    assert status == 200
+    assert cabecalhos['content-encoding'] == 'gzip'
+    assert gzip.decompress(comprimido) == corpo
+
+
+def test_consultas_equivalentes_usam_a_mesma_chave(lote):
+    estado = api.criar_estado(lote)
+    primeira = api.obter_resposta(estado, 'predictions', {'league': 'E0', 'min_confidence': '0.5'})
+    segunda = api.obter_resposta(estado, 'predictions', {'league': ' e0 ', 'min_confidence': '0.50'})
+    assert segunda is primeira
+    assert len(estado['respostas']) == 1
+
+
+def test_acerto_renova_a_posicao_no_lru(lote, monkeypatch):
+    monkeypatch.setattr(api, 'MAXIMO_RESPOSTAS_API', 2)
+    estado = api.criar_estado(lote)
+    api.obter_resposta(estado, 'tips', {'league': 'E0'})
+    api.obter_resposta(estado, 'tips', {'league': 'E1'})
+    api.obter_resposta(estado, 'tips', {'league': 'E0'})
+    api.obter_resposta(estado, 'tips', {'type': 'over'})
+    assert [dict(parametros) for _, parametros in estado['respostas']] == [{'league': 'e0'}, {'type': 'over'}]
+
+
+@pytest.mark.parametrize('parametros', [{'date': 'ontem'}, {'min_confidence': 'alta'}])
+def test_parametro_invalido_responde_400(app, parametros):
+    status, _, corpo = chamar(app, '/predictions', parametros)
+    assert status == 400
+    assert 'erro' in json.loads(corpo)
@@ -0,0 +1,144 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from futalgorithm import motor, sintetico
+from futalgorithm.benchmark import planilha_xlsx
+
+
+class Servidor:
+    """Stand-in local das planilhas: responde ETag, 304 para If-None-Match e o status configurado"""
+
+    def __init__(self):
+        self.arquivos = {}
+        self.status = 200
+        self.respostas = []
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                conteudo = servidor.arquivos.get(self.path)
+                if servidor.status != 200 or conteudo is None:
+                    codigo = servidor.status if conteudo is not None else 404
+                    servidor.respostas.append(codigo)
+                    self.send_error(codigo)
+                    return
+                etag = '"%s"' % hashlib.sha1(conteudo).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    servidor.respostas.append(304)
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                servidor.respostas.append(200)
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(conteudo)))
+                self.end_headers()
+                self.wfile.write(conteudo)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(('127.0.0.1', 0), Manipulador)
+        self.thread = threading.Thread(target=self.http.serve_forever, daemon=True)
+
+    def url(self, caminho):
+        return f'http://127.0.0.1:{self.http.server_address[1]}{caminho}'
+
+
+@pytest.fixture
+def servidor():
+    servidor = Servidor()
+    servidor.thread.start()
+    yield servidor
+    servidor.http.shutdown()
+    servidor.http.server_close()
+
+
+@pytest.fixture
+def planilhas():
+    """Workbook da temporada até a rodada 6 e o mesmo workbook depois de mais duas rodadas"""
+    abas, _ = sintetico.gerar_temporada(2, 6, 8, semente=11)
+    parcial = {liga: df_liga.iloc[:len(df_liga) * 6 // 8] for liga, df_liga in abas.items()}
+    return planilha_xlsx(parcial), planilha_xlsx(abas), abas
+
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """Quantas vezes o workbook foi lido (a leitura em si segue a original)"""
+    chamadas = []
+    original = motor.ler_planilha
+
+    def ler_planilha(conteudo):
+        chamadas.append(len(conteudo))
+        return original(conteudo)
+    monkeypatch.setattr(motor, 'ler_planilha', ler_planilha)
+    return chamadas
+
+
+def test_primeira_carga_grava_o_store(servidor, planilhas, leituras, tmp_path):
+    parcial, _, abas = planilhas
+    servidor.arquivos['/dados.xlsx'] = parcial
+    todas_abas, linhas_novas = motor.atualizar_dados_incremental(servidor.url('/dados.xlsx'), str(tmp_path))
+
+    assert linhas_novas == {liga: len(df_liga) * 6 // 8 for liga, df_liga in abas.items()}
+    assert len(leituras) == 1
+    salvas, metadados = motor.carregar_store_local(str(tmp_path))
+    assert {liga: len(df_liga) for liga, df_liga in salvas.items()} == linhas_novas
+    assert metadados['etag']
+
+
+def test_304_reaproveita_o_store_sem_ler_a_planilha(servidor, planilhas, leituras, tmp_path):
+    parcial, _, _ = planilhas
+    servidor.arquivos['/dados.xlsx'] = parcial
+    url = servidor.url('/dados.xlsx')
+    primeira, _ = motor.atualizar_dados_incremental(url, str(tmp_path))
+    segunda, linhas_novas = motor.atualizar_dados_incremental(url, str(tmp_path))
+
+    assert servidor.respostas == [200, 304]
+    assert linhas_novas == {}
+    assert len(leituras) == 1
+    for liga, df_liga in primeira.items():
+        assert segunda[liga].equals(df_liga)
+
+
+def test_planilha_maior_mescla_so_os_jogos_novos(servidor, planilhas, tmp_path):
+    parcial, completa, abas = planilhas
+    url = servidor.url('/dados.xlsx')
+    servidor.arquivos['/dados.xlsx'] = parcial
+    anteriores, _ = motor.atualizar_dados_incremental(url, str(tmp_path))
+
+    servidor.arquivos['/dados.xlsx'] = completa
+    todas_abas, linhas_novas = motor.atualizar_dados_incremental(url, str(tmp_path))
+
+    assert linhas_novas == {liga: len(df_liga) - len(df_liga) * 6 // 8 for liga, df_liga in abas.items()}
+    for liga, df_liga in todas_abas.items():
+        assert len(df_liga) == len(abas[liga])
+        assert not df_liga.duplicated(motor.CHAVES_JOGO).any()
+        assert df_liga.iloc[:len(anteriores[liga])].equals(anteriores[liga])
+    salvas, _ = motor.carregar_store_local(str(tmp_path))
+    assert {liga: len(df_liga) for liga, df_liga in salvas.items()} == {liga: len(df) for liga, df in abas.items()}
+
+
+def test_falha_na_atualizacao_serve_o_store_salvo(servidor, planilhas, tmp_path):
+    parcial, _, _ = planilhas
+    servidor.arquivos['/dados.xlsx'] = parcial
+    servidor.arquivos['/fixtures.xlsx'] = b''
+    url, url_jogos = servidor.url('/dados.xlsx'), servidor.url('/fixtures.xlsx')
+    salvas, _ = motor.atualizar_dados_incremental(url, str(tmp_path))
+
+    servidor.status = 500
+    with pytest.raises(requests.HTTPError):
+        motor.atualizar_dados_incremental(url, str(tmp_path))
+
+    estado = {'erro': None}
+    snapshot = motor.snapshot_inicial(estado, url, url_jogos, str(tmp_path))
+    assert snapshot['origem'] == 'disco'
+    assert estado['erro']
+    assert snapshot['abas'] == list(salvas)
+    for liga, df_liga in salvas.items():
+        assert snapshot['todas_abas'][liga].equals(df_liga)
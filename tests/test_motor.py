@@ -0,0 +1,305 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import optimize, stats
+
+from futalgorithm import motor
+
+CAMPOS_BASE = {
+    'gols_marcados_ft': ('FTHG', 'FTAG'), 'gols_sofridos_ft': ('FTAG', 'FTHG'),
+    'gols_marcados_ht': ('HTHG', 'HTAG'), 'gols_sofridos_ht': ('HTAG', 'HTHG'),
+    'escanteios_casa': ('HC', 'AC'), 'escanteios_fora': ('AC', 'HC'),
+    'finalizacoes_casa': ('HF', 'AF'), 'finalizacoes_fora': ('AF', 'HF'),
+    'chutes_gol_casa': ('HST', 'AST'), 'chutes_gol_fora': ('AST', 'HST'),
+}
+
+
+def estatisticas_referencia(jogos, time, liga):
+    """Cálculo jogo a jogo da versão original (iterrows), usado como referência"""
+    fator_liga = motor.FATORES_LIGA.get(liga, motor.FATORES_LIGA['default'])
+    somas = dict.fromkeys(motor.CAMPOS_ESTATISTICAS, 0.0)
+    peso_total, gols_feitos = 0.0, []
+    for _, jogo in jogos.iterrows():
+        peso = jogo.get('peso_temporal', 1.0)
+        peso_total += peso
+        mandante = jogo['HomeTeam'] == time
+        for campo, (casa, fora) in CAMPOS_BASE.items():
+            somas[campo] += jogo[casa if mandante else fora] * peso * fator_liga
+        cartoes = {lado: jogo[f'{lado}Y'] + jogo[f'{lado}R'] * 2 for lado in 'HA'}
+        somas['cartoes_casa'] += cartoes['H' if mandante else 'A'] * peso * fator_liga
+        somas['cartoes_fora'] += cartoes['A' if mandante else 'H'] * peso * fator_liga
+        venceu = jogo['FTR'] == ('H' if mandante else 'A')
+        somas['vitorias' if venceu else 'empates' if jogo['FTR'] == 'D' else 'derrotas'] += peso
+        gols_feitos.append(jogo['FTHG'] if mandante else jogo['FTAG'])
+    media_gols = np.mean(gols_feitos)
+    consistencia = 1.0 - np.std(gols_feitos) / max(1, media_gols)
+    return {campo: soma / peso_total for campo, soma in somas.items()}, consistencia, media_gols
+
+
+@pytest.fixture(scope='module')
+def liga_e0(temporada):
+    df_liga = temporada[0]['E0']
+    return df_liga, motor.construir_indice_liga(df_liga)
+
+
+@pytest.mark.parametrize('cenario', ['mandante', 'visitante', 'geral'])
+def test_estatisticas_avancadas_iguais_a_referencia(liga_e0, cenario):
+    df_liga, indice_liga = liga_e0
+    time = 'E0 FC 03'
+    jogos = motor.obter_ultimos_jogos_por_cenario(df_liga, time, cenario, 10, indice_liga)
+    linhas_planilha = df_liga[(df_liga['HomeTeam'] == time) | (df_liga['AwayTeam'] == time)]
+    linhas_planilha = linhas_planilha.sort_values('Date', kind='stable')
+    if cenario == 'mandante':
+        linhas_planilha = linhas_planilha[linhas_planilha['HomeTeam'] == time]
+    elif cenario == 'visitante':
+        linhas_planilha = linhas_planilha[linhas_planilha['AwayTeam'] == time]
+    linhas_planilha = linhas_planilha.tail(10).assign(peso_temporal=jogos['peso_temporal'].to_numpy())
+
+    esperado, consistencia, media_gols = estatisticas_referencia(linhas_planilha, time, 'E0')
+    for entrada in (jogos, linhas_planilha):
+        stats, consistencia_obtida, media_obtida = motor.calcular_estatisticas_avancadas(entrada, time, cenario, 'E0')
+        assert {campo: stats[campo] for campo in esperado} == pytest.approx(esperado)
+        assert consistencia_obtida == pytest.approx(consistencia)
+        assert media_obtida == pytest.approx(media_gols)
+
+
+def test_janela_geral_e_cronologica(liga_e0):
+    df_liga, indice_liga = liga_e0
+    time = 'E0 FC 03'
+    jogos = motor.obter_ultimos_jogos_por_cenario(df_liga, time, 'geral', 6, indice_liga)
+    disputados = df_liga[(df_liga['HomeTeam'] == time) | (df_liga['AwayTeam'] == time)]
+    assert list(jogos['Date']) == sorted(disputados['Date'])[-6:]
+    assert jogos['Mandante'].any() and not jogos['Mandante'].all()
+
+
+def test_poucos_jogos_nao_gera_estatisticas(liga_e0):
+    df_liga, indice_liga = liga_e0
+    jogos = motor.obter_ultimos_jogos_por_cenario(df_liga, 'E0 FC 03', 'geral', 1, indice_liga)
+    assert motor.calcular_estatisticas_avancadas(jogos, 'E0 FC 03', 'geral', 'E0') == (None, 0.0, 0.0)
+
+
+def sequencia_referencia(acertos):
+    """Sequência atual e emojis dos últimos 5, jogo a jogo (acertos em ordem cronológica)"""
+    ultimos_5 = list(reversed(acertos[-motor.JOGOS_SEQUENCIA:]))
+    sequencia = 0
+    for acerto in ultimos_5:
+        if not acerto:
+            break
+        sequencia += 1
+    emojis = ['✅' if acerto else '🔴' for acerto in ultimos_5]
+    emojis += ['🔴'] * (motor.JOGOS_SEQUENCIA - len(emojis))
+    return sequencia, ' '.join(emojis)
+
+
+@pytest.mark.parametrize('janela', [5, 8, 12])
+def test_cubo_igual_a_contagem_por_time(liga_e0, janela):
+    df_liga, indice_liga = liga_e0
+    cubo = motor.calcular_cubo_liga(indice_liga, [janela]).set_index(['Time', 'Mercado'])
+    for time in motor.obter_todos_times_liga(df_liga):
+        jogos = motor.obter_ultimos_jogos_por_cenario(df_liga, time, 'geral', janela, indice_liga)
+        todos = motor.obter_ultimos_jogos_por_cenario(df_liga, time, 'geral', 100, indice_liga)
+        for mercado, (coluna, minimo) in motor.MERCADOS_RANKING.items():
+            linha = cubo.loc[(time, mercado)]
+            assert linha['Acertos'] == (jogos[coluna].astype(float) >= minimo).sum()
+            assert linha['Total Jogos'] == len(jogos)
+            sequencia, emojis = sequencia_referencia(list(todos[coluna].astype(float) >= minimo))
+            assert linha['Sequencia Atual'] == sequencia
+            assert motor.EMOJIS_ULTIMOS_5[int(linha['Mascara Ultimos 5'])] == emojis
+
+
+def test_sequencia_para_no_erro_mais_recente():
+    jogos = pd.DataFrame({
+        'Date': pd.date_range('2025-08-01', periods=6, freq='7D'),
+        'HomeTeam': ['A', 'B', 'A', 'B', 'A', 'B'],
+        'AwayTeam': ['B', 'A', 'B', 'A', 'B', 'A'],
+        'FTHG': [3, 0, 2, 1, 2, 0],
+        'FTAG': [1, 0, 0, 1, 1, 3],
+        'FTR': ['H', 'D', 'H', 'D', 'H', 'A'],
+    })
+    cubo = motor.calcular_cubo_liga(motor.construir_indice_liga(jogos), [5]).set_index(['Time', 'Mercado'])
+    # Gols no jogo, do mais antigo ao mais recente: 4, 0, 2, 2, 3, 3
+    linha = cubo.loc[('A', 'Jogos 1.5 FT')]
+    assert (linha['Sequencia Atual'], linha['Acertos']) == (4, 4)
+    assert motor.EMOJIS_ULTIMOS_5[int(linha['Mascara Ultimos 5'])] == '✅ ✅ ✅ ✅ 🔴'
+    assert cubo.loc[('A', 'Vitoria'), 'Sequencia Atual'] == 2
+    assert cubo.loc[('B', 'Derrota'), 'Sequencia Atual'] == 2
+    assert cubo.loc[('B', 'Vitoria'), 'Sequencia Atual'] == 0
+
+
+def test_mercados_de_gols_iguais_a_referencia(liga_e0):
+    df_liga, indice_liga = liga_e0
+    fator_liga = motor.FATORES_LIGA.get('E0', motor.FATORES_LIGA['default'])
+    confrontos = [('E0 FC 00', 'E0 FC 01'), ('E0 FC 05', 'E0 FC 02'), ('E0 FC 09', 'E0 FC 07')]
+    for mandante, visitante in confrontos:
+        resultados, _ = motor.calcular_probabilidades_completas(df_liga, mandante, visitante, 'E0',
+                                                                indice_liga=indice_liga)
+        casa, _, _ = motor.calcular_estatisticas_avancadas(
+            motor.obter_ultimos_jogos_por_cenario(df_liga, mandante, 'geral', 10, indice_liga), mandante, 'geral', 'E0')
+        fora, _, _ = motor.calcular_estatisticas_avancadas(
+            motor.obter_ultimos_jogos_por_cenario(df_liga, visitante, 'geral', 10, indice_liga), visitante, 'geral', 'E0')
+
+        # Fórmulas da versão original, célula a célula
+        lambda_casa = max(0.1, (casa['gols_marcados_ft'] * 0.7 + fora['gols_sofridos_ft'] * 0.3) * 1.1 * fator_liga)
+        lambda_fora = max(0.1, (fora['gols_marcados_ft'] * 0.7 + casa['gols_sofridos_ft'] * 0.3) * 0.9 * fator_liga)
+        p_casa, p_fora = stats.poisson.pmf(range(7), lambda_casa), stats.poisson.pmf(range(7), lambda_fora)
+
+        def over(linha):
+            return 1 - sum(p_casa[i] * p_fora[j] for i in range(linha + 1) for j in range(linha + 1 - i))
+
+        assert resultados['gols_casa_esperados'] == pytest.approx(lambda_casa)
+        assert resultados['gols_fora_esperados'] == pytest.approx(lambda_fora)
+        for linha, mercado in enumerate(['over_05_ft', 'over_15_ft', 'over_25_ft', 'over_35_ft']):
+            assert resultados[mercado] == pytest.approx(over(linha) * 100)
+        assert resultados['btts_ft'] == pytest.approx((1 - p_casa[0]) * (1 - p_fora[0]) * 100)
+        # A versão original cortava o 1X2 em 6 gols; a matriz atual leva a cauda e bate com a Skellam
+        assert resultados['casa_vence'] == pytest.approx(stats.skellam.sf(0, lambda_casa, lambda_fora) * 100, abs=1e-4)
+        assert resultados['empate'] == pytest.approx(stats.skellam.pmf(0, lambda_casa, lambda_fora) * 100, abs=1e-4)
+        assert resultados['casa_vence'] + resultados['empate'] + resultados['fora_vence'] == pytest.approx(100)
+
+
+def test_gradiente_dixon_coles_igual_a_diferencas_finitas(liga_e0):
+    df_liga, _ = liga_e0
+    dados, times = motor.preparar_jogos_dixon_coles(df_liga)
+    n_times = len(times)
+    gerador = np.random.default_rng(3)
+    parametros = np.r_[gerador.normal(0, 0.2, 2 * n_times), 0.1, 0.25, -0.08]
+
+    _, gradiente = motor.verossimilhanca_dixon_coles(parametros, dados, n_times)
+    numerico = optimize.approx_fprime(parametros, lambda p: motor.verossimilhanca_dixon_coles(p, dados, n_times)[0],
+                                      1e-6)
+    assert gradiente == pytest.approx(numerico, rel=1e-4, abs=1e-4)
+
+
+REGRAS_TESTE = motor.REGRAS_SEQUENCIA + [
+    {'mercado': 'over_15_ft', 'analise': 'soma', 'janela': 4, 'acertos': 3, 'lado': 'mandante', 'dica': 'casa 3/4'},
+    {'mercado': 'btts', 'analise': 'soma', 'janela': 6, 'acertos': 3, 'lado': 'visitante', 'dica': 'fora 3/6'},
+    {'mercado': 'escanteios_9_mais', 'analise': 'individual', 'janela': 5, 'acertos': 2, 'lado': 'ambos',
+     'dica': 'ambos 2/5'},
+]
+
+
+def test_regras_de_sequencia_iguais_a_contagem_por_time(temporada, liga_e0):
+    df_liga, indice_liga = liga_e0
+    jogos = temporada[1][temporada[1]['Div'] == 'E0']
+
+    def cumpre(time, regra):
+        jogos_time = motor.obter_ultimos_jogos_por_cenario(df_liga, time, 'geral', regra['janela'], indice_liga)
+        if len(jogos_time) < regra['janela']:
+            return False
+        chave = regra['mercado'] + ('_individual' if regra['analise'] == 'individual' else '')
+        coluna, minimo = motor.CONDICOES_SEQUENCIA[chave]
+        return (jogos_time[coluna].astype(float) >= minimo).sum() >= regra['acertos']
+
+    esperado = [(mandante, visitante, regra['dica']) for mandante, visitante in zip(jogos['HomeTeam'], jogos['AwayTeam'])
+                for regra in REGRAS_TESTE
+                if (regra['lado'] == 'visitante' or cumpre(mandante, regra))
+                and (regra['lado'] == 'mandante' or cumpre(visitante, regra))]
+    dicas = motor._dicas_sequencias_liga(jogos, df_liga, indice_liga, REGRAS_TESTE)
+    obtido = [(jogos.loc[posicao, 'HomeTeam'], jogos.loc[posicao, 'AwayTeam'], dica['Dica']) for posicao, dica in dicas]
+    assert sorted(obtido) == sorted(esperado)
+    assert any(dica in ('casa 3/4', 'fora 3/6', 'ambos 2/5') for _, _, dica in esperado)
+
+
+def test_regras_de_probabilidade():
+    jogos = pd.DataFrame({'Div': ['E0', 'E0', 'E1'], 'HomeTeam': ['A', 'C', 'E'], 'AwayTeam': ['B', 'D', 'F'],
+                          'Date': pd.to_datetime(['2026-03-07'] * 3)})
+    base = {'casa_vence': 50.0, 'fora_vence': 20.0, 'over_25_ft': 60.0, 'btts_ft': 50.0, 'confianca': 'Alta'}
+    previsoes = {
+        ('E0', 'A', 'B'): dict(base, casa_vence=70.0, btts_ft=66.0, valor_confianca=0.8),
+        # Acima dos limiares, mas sem confiança suficiente
+        ('E0', 'C', 'D'): dict(base, over_25_ft=90.0, valor_confianca=motor.CONFIANCA_BAIXA),
+        ('E1', 'E', 'F'): dict(base, fora_vence=66.0, over_25_ft=71.0, valor_confianca=0.9),
+    }
+    todas_abas = {'E0': pd.DataFrame(), 'E1': pd.DataFrame()}
+    dicas = motor.gerar_dicas_inteligentes(jogos, todas_abas, previsoes=previsoes)
+    assert [(dica['Jogo'], dica['Dica']) for dica in dicas] == [
+        ('A x B', '💪 A tem 70.0% de chance de vitória'),
+        ('A x B', '🎯 BTTS: 66.0% de probabilidade'),
+        ('E x F', '💪 F tem 66.0% de chance de vitória'),
+        ('E x F', '⚽ Over 2.5 Gols: 71.0% de probabilidade'),
+    ]
+
+
+def test_totais_simulados_batem_com_a_convolucao_exata():
+    medias_casa, medias_fora, linhas, k = np.array([5.5, 3.0]), np.array([4.0, 2.5]), [7.5, 9.5], 6.0
+    simuladas = motor.simular_totais(medias_casa, medias_fora, linhas, 40000, k, np.random.default_rng(1),
+                                     limite_bytes=2 * 8 * 40000)
+    contagens = np.arange(80)
+    for jogo in range(2):
+        casa = stats.nbinom.pmf(contagens, k, k / (k + medias_casa[jogo]))
+        fora = stats.nbinom.pmf(contagens, k, k / (k + medias_fora[jogo]))
+        total = np.convolve(casa, fora)
+        for j, linha in enumerate(linhas):
+            exata = total[int(linha) + 1:].sum()
+            assert simuladas[jogo, j] == pytest.approx(exata, abs=4 * np.sqrt(exata * (1 - exata) / 40000))
+
+
+def test_dispersao_estimada_pelos_residuos():
+    gerador = np.random.default_rng(5)
+    esperados = gerador.uniform(3, 12, 20000)
+    observados = gerador.negative_binomial(5.0, 5.0 / (5.0 + esperados))
+    assert motor.estimar_dispersao(observados, esperados) == pytest.approx(5.0, rel=0.1)
+    # Sem superdispersão a estimativa some (None) ou fica tão alta que a binomial negativa vira Poisson
+    poisson = motor.estimar_dispersao(gerador.poisson(esperados), esperados)
+    assert poisson is None or poisson > 50
+
+
+def test_preco_avulso_nao_simula_totais(liga_e0):
+    df_liga, indice_liga = liga_e0
+    resultados, _ = motor.calcular_probabilidades_completas(df_liga, 'E0 FC 00', 'E0 FC 01', 'E0',
+                                                            indice_liga=indice_liga)
+    assert motor.chave_total('escanteios', 8.5) not in resultados
+    resultados, _ = motor.calcular_probabilidades_completas(df_liga, 'E0 FC 00', 'E0 FC 01', 'E0',
+                                                            indice_liga=indice_liga, n_simulacoes=2000)
+    assert 0 <= resultados[motor.chave_total('escanteios', 8.5)] <= 100
+
+
+def test_falha_em_um_jogo_nao_derruba_a_liga(liga_e0, monkeypatch):
+    df_liga, indice_liga = liga_e0
+    pares = [('E0 FC 00', 'E0 FC 01'), ('E0 FC 02', 'E0 FC 03'), ('E0 FC 04', 'E0 FC 05')]
+    original = motor.calcular_probabilidades_lote
+
+    def com_falha(df_liga, confrontos, *args, **kwargs):
+        if ('E0 FC 02', 'E0 FC 03') in confrontos:
+            raise ValueError('dado inválido')
+        return original(df_liga, confrontos, *args, **kwargs)
+    monkeypatch.setattr(motor, 'calcular_probabilidades_lote', com_falha)
+
+    resultados, houve_falha = motor._prever_liga(df_liga, pares, 'E0', indice_liga)
+    assert houve_falha
+    assert [prob is not None for prob, _ in resultados] == [True, False, True]
+
+
+def test_erro_que_nao_e_de_dados_propaga(liga_e0, monkeypatch):
+    df_liga, indice_liga = liga_e0
+
+    def com_bug(*args, **kwargs):
+        raise RuntimeError('bug')
+    monkeypatch.setattr(motor, 'calcular_probabilidades_lote', com_bug)
+    with pytest.raises(RuntimeError):
+        motor._prever_liga(df_liga, [('E0 FC 00', 'E0 FC 01')], 'E0', indice_liga)
+
+
+def test_previsoes_com_falha_nao_vao_para_o_disco(temporada, monkeypatch):
+    todas_abas, _ = temporada
+    monkeypatch.setattr(motor, 'CACHE_DISCO_ATIVO', True)
+    original = motor.calcular_probabilidades_lote
+
+    def com_falha(df_liga, confrontos, *args, **kwargs):
+        if ('E0 FC 02', 'E0 FC 03') in confrontos:
+            raise ValueError('dado inválido')
+        return original(df_liga, confrontos, *args, **kwargs)
+    monkeypatch.setattr(motor, 'calcular_probabilidades_lote', com_falha)
+
+    def nome_artefato(confrontos, versao):
+        parametros = {liga: motor.fonte_lambdas_liga(liga) for liga, _, _ in confrontos}
+        return motor.chave_artefato('previsoes', versao, confrontos, parametros, motor.SIMULACOES_MONTE_CARLO)
+
+    com_erro = (('E0', 'E0 FC 02', 'E0 FC 03'), ('E0', 'E0 FC 04', 'E0 FC 05'))
+    previsoes = motor.calcular_previsoes_jogos(todas_abas, None, com_erro, 'teste-falha')
+    assert previsoes[com_erro[0]] is None and previsoes[com_erro[1]] is not None
+    assert motor.carregar_artefato(nome_artefato(com_erro, 'teste-falha')) is None
+
+    sem_erro = (('E0', 'E0 FC 04', 'E0 FC 05'),)
+    motor.calcular_previsoes_jogos(todas_abas, None, sem_erro, 'teste-ok')
+    assert motor.carregar_artefato(nome_artefato(sem_erro, 'teste-ok')) is not None